@@ -1,11 +1,78 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 from main.models import Bb, Comment
 
-class BbSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Bb
-        fields = ('id', 'title', 'content', 'price', 'created_at')
+LIST_FIELDS = ('id', 'title', 'content', 'price', 'rubric', 'author',
+               'created_at', 'image')
+
+FILTER_LOOKUPS = {
+    'rubric': 'rubric',
+    'super_rubric': 'rubric__super_rubric',
+    'author': 'author',
+    'price_min': 'price__gte',
+    'price_max': 'price__lte',
+    'created_after': 'created_at__gte',
+    'created_before': 'created_at__lt',
+}
+
+
+def check_page_limit(value):
+    max_value = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+    if value > max_value:
+        raise serializers.ValidationError(
+            'Ensure this value is less than or equal to %d.' % max_value)
+    return value
+
+
+class BbFilterSerializer(serializers.Serializer):
+    rubric = serializers.IntegerField(required=False)
+    super_rubric = serializers.IntegerField(required=False)
+    author = serializers.IntegerField(required=False)
+    price_min = serializers.IntegerField(required=False)
+    price_max = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(required=False, min_value=1)
+    fields = serializers.CharField(required=False)
+
+    def validate_limit(self, value):
+        return check_page_limit(value)
+
+    def validate_fields(self, value):
+        fields = tuple(field for field in value.split(',') if field)
+        unknown = set(fields) - set(LIST_FIELDS)
+        if unknown:
+            raise serializers.ValidationError(
+                'Unknown fields: %s' % ', '.join(sorted(unknown)))
+        return fields or LIST_FIELDS
+
+    def filter(self, queryset):
+        lookups = {FILTER_LOOKUPS[name]: value
+                   for name, value in self.validated_data.items()
+                   if name in FILTER_LOOKUPS}
+        return queryset.filter(**lookups)
+
+
+class BbListSerializer(serializers.BaseSerializer):
+    datetime_field = serializers.DateTimeField()
+
+    def to_representation(self, row):
+        data = {field: row[field] for field in self.context['fields']}
+        if 'created_at' in data:
+            data['created_at'] = \
+                self.datetime_field.to_representation(data['created_at'])
+        if 'image' in data:
+            data['image'] = self.image_url(data['image'])
+        return data
+
+    def image_url(self, name):
+        if not name:
+            return None
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 
 class BbDetailSerializer(serializers.ModelSerializer):
@@ -21,4 +88,17 @@ class BbDetailSerializer(serializers.ModelSerializer):
 class CommentSerializer(serializers.ModelSerializer):
         class Meta:
             model = Comment
-            fields = ('bb', 'author', 'content', 'created_at')
\ No newline at end of file
+            fields = ('id', 'bb', 'author', 'content', 'created_at')
+
+
+class CommentPageSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        return check_page_limit(value)
+
+
+class ModerationSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(),
+                                allow_empty=False, max_length=10000)
+    is_active = serializers.BooleanField()
\ No newline at end of file
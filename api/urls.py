@@ -1,9 +1,12 @@
 from django.urls import path
 
-from .views import bbs, BbDetailView, comments
+from .views import bbs, BbDetailView, comments, moderate, export, profiling
 
 urlpatterns = [
     path('bbs/<int:pk>/comments/', comments),
+    path('comments/moderate/', moderate),
     path('bbs/<int:pk>/', BbDetailView.as_view()),
     path('bbs/', bbs),
+    path('profiling/', profiling),
+    path('export/<str:kind>.<str:fmt>', export),
 ]
@@ -1,25 +1,77 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.generics import RetrieveAPIView
-from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.status import HTTP_201_CREATED, HTTP_204_NO_CONTENT
+from rest_framework.status import HTTP_400_BAD_REQUEST
+from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser
+from rest_framework.utils.urls import replace_query_param
 
+from main.caching import page_version
+from main.comments import active_comments, comment_snapshot, \
+                          moderate_comments, page_size
+from main.exporting import EXPORTS, FORMATS, accepts_gzip, export_stream
+from main.conditional import make_etag, not_modified, set_validators
 from main.models import Bb, Comment
-from .serializers import BbSerializer, BbDetailSerializer, CommentSerializer
+from main.pagination import encode_cursor, decode_cursor, after
+from main.profiling import profiler
+from .serializers import LIST_FIELDS, BbFilterSerializer, BbListSerializer
+from .serializers import BbDetailSerializer, CommentSerializer
+from .serializers import CommentPageSerializer, ModerationSerializer
+
+def bb_rows(filters, fields):
+    return filters.filter(Bb.objects.filter(is_active=True)) \
+                  .values(*{'id', 'created_at', *fields}) \
+                  .order_by('-created_at', '-id')
+
 
 @api_view(['GET'])
 def bbs(request):
-    if request.method == 'GET':
-        bbs = Bb.objects.filter(is_active=True)[:10]
-        serializer = BbSerializer(bbs, many=True)
-        return Response(serializer.data)
+    filters = BbFilterSerializer(data=request.query_params)
+    filters.is_valid(raise_exception=True)
+    etag = make_etag(page_version(request, ['bbs'], fresh=True))
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+    fields = filters.validated_data.get('fields', LIST_FIELDS)
+    limit = filters.validated_data.get('limit', settings.API_PAGE_SIZE)
+    rows = bb_rows(filters, fields)
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            raise ValidationError({'cursor': 'Invalid cursor'})
+        rows = rows.filter(after(*position))
+    rows = list(rows[:limit + 1])
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_url = replace_query_param(
+            request.build_absolute_uri(), 'cursor',
+            encode_cursor(rows[-1]['created_at'], rows[-1]['id']))
+    serializer = BbListSerializer(rows, many=True,
+                                  context={'request':request, 'fields':fields})
+    return set_validators(Response({'next':next_url,
+                                    'results':serializer.data}), etag)
 
 
 class BbDetailView(RetrieveAPIView):
-    queryset = Bb.objects.filter(is_active=True)
+    queryset = Bb.objects.filter(is_active=True).select_related('rubric')
     serializer_class = BbDetailSerializer
 
+    def retrieve(self, request, *args, **kwargs):
+        bb = self.get_object()
+        etag = make_etag(bb.pk, bb.updated_at.isoformat(), bb.rubric.name)
+        response = not_modified(request, etag, bb.updated_at)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(bb)
+        return set_validators(Response(serializer.data), etag, bb.updated_at)
+
 
 @api_view(['GET', 'POST'])
 @permission_classes((IsAuthenticatedOrReadOnly,))
@@ -33,6 +85,71 @@ def comments(request, pk):
             return Response(serializer.errors,
                             status=HTTP_400_BAD_REQUEST)
     else:
-        comments = Comment.objects.filter(is_active=True, bb=pk)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        page = CommentPageSerializer(data=request.query_params)
+        page.is_valid(raise_exception=True)
+        snapshot = comment_snapshot(pk)
+        etag = make_etag(pk, snapshot['version'])
+        response = not_modified(request, etag, snapshot['newest'])
+        if response is not None:
+            return response
+        limit = page.validated_data.get('limit', page_size())
+        cursor = request.query_params.get('cursor')
+        latest = snapshot['latest']
+        if not cursor and (limit <= len(latest) or
+                           snapshot['count'] == len(latest)):
+            rows = latest[:limit]
+            has_next = snapshot['count'] > limit
+        else:
+            rows = active_comments(pk)
+            if cursor:
+                position = decode_cursor(cursor)
+                if position is None:
+                    raise ValidationError({'cursor': 'Invalid cursor'})
+                rows = rows.filter(after(*position))
+            rows = list(rows[:limit + 1])
+            has_next = len(rows) > limit
+            rows = rows[:limit]
+        next_url = None
+        if has_next:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), 'cursor',
+                encode_cursor(rows[-1].created_at, rows[-1].pk))
+        serializer = CommentSerializer(rows, many=True)
+        return set_validators(Response({'count':snapshot['count'],
+                                        'next':next_url,
+                                        'results':serializer.data}),
+                              etag, snapshot['newest'])
+
+
+@api_view(['POST'])
+@permission_classes((IsAdminUser,))
+def moderate(request):
+    serializer = ModerationSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    comments = Comment.objects.filter(pk__in=serializer.validated_data['ids'])
+    updated = moderate_comments(comments,
+                                serializer.validated_data['is_active'])
+    return Response({'updated':updated})
+
+@api_view(['GET'])
+@permission_classes((IsAdminUser,))
+def export(request, kind, fmt):
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise NotFound()
+    compress = accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    response = StreamingHttpResponse(export_stream(kind, fmt, compress),
+                                     content_type=FORMATS[fmt])
+    response['Content-Disposition'] = \
+        'attachment; filename="%s.%s"' % (kind, fmt)
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+@api_view(['GET', 'DELETE'])
+@permission_classes((IsAdminUser,))
+def profiling(request):
+    if request.method == 'DELETE':
+        profiler.reset()
+        return Response(status=HTTP_204_NO_CONTENT)
+    return Response(profiler.report())
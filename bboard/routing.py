@@ -1,5 +1,17 @@
-from channels.routing import ProtocolTypeRouter
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
+from django.core.asgi import get_asgi_application
+
+django_asgi_app = get_asgi_application()
+
+from main.counters import counter_buffer
+from main.routing import websocket_urlpatterns
+
+counter_buffer.start()
 
 application = ProtocolTypeRouter({
-    # (your routes here)
-})
\ No newline at end of file
+    'http': django_asgi_app,
+    'websocket': AllowedHostsOriginValidator(
+        AuthMiddlewareStack(URLRouter(websocket_urlpatterns))),
+})
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'main.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -57,7 +58,7 @@ ROOT_URLCONF = 'bboard.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'main.profiling.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,9 +80,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'bboard.data'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 5,
+        },
     }
 }
 
+SQLITE_PRODUCTION_PROFILE = False
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -130,4 +146,63 @@ THUMBNAIL_ALIASES = {
     },
 }
 THUMBNAIL_BASEDIR = 'thumbnails'
-ASGI_APPLICATION = "bboard.routing.application"
\ No newline at end of file
+ASGI_APPLICATION = "bboard.routing.application"
+
+SEARCH_BACKEND = 'auto'
+
+BBS_PAGE_SIZE = 20
+
+COUNTER_FLUSH_INTERVAL = 10
+COUNTER_FLUSH_THRESHOLD = 100
+
+DETAIL_ETAG_VIEWS_BUCKET = 100
+
+RUBRIC_TREE_TIMEOUT = 60 * 10
+
+RECENT_BBS_COUNT = 3
+RECENT_BBS_PERSIST_INTERVAL = 60 * 5
+
+SIMILAR_BBS_COUNT = 9
+SIMILAR_BBS_MIN_SCORE = 0.1
+SIMILAR_BBS_IN_BACKGROUND = True
+
+PAGE_CACHE_TIMEOUT = 60 * 5
+SURROGATE_VERSION_TIMEOUT = 1
+
+THUMBNAIL_WORKERS = 2
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+LIVE_UPDATES_INTERVAL = 1
+
+PROFILING = False
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_SLOW_THRESHOLD = 500
+PROFILING_DUMP_DIR = os.path.join(BASE_DIR, 'profiles')
+
+FILE_CLEANUP_IN_BACKGROUND = True
+FILE_CLEANUP_GRACE = 60 * 10
+
+COMMENTS_PAGE_SIZE = 20
+COMMENTS_CACHE_TIMEOUT = 60 * 60
+
+EMAIL_ACTIVATION_LETTERS = False
+EMAIL_NEW_COMMENT_NOTIFICATIONS = False
+EMAIL_QUEUE_BATCH_SIZE = 50
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_RETRY_DELAY = 60
+EMAIL_QUEUE_MAX_RETRY_DELAY = 60 * 60
+EMAIL_QUEUE_LOCK_TIMEOUT = 60 * 10
+
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_FORMAT = 'JPEG'
+IMAGE_QUALITY = 85
+
+DEFAULT_FILE_STORAGE = 'main.storage.ShardedFileSystemStorage'
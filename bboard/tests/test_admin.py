@@ -0,0 +1,95 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, Comment
+from main.pagination import EstimatedCountPaginator
+
+
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'seller', password = 'Test1111',
+                                                email = 'seller@example.com')
+        self.admin = AdvUser.objects.create_superuser(username = 'admin', password = 'Admin1111')
+        self.bb = Bb.objects.create(title = 'машина', content = 'очень ' * 50,
+                                    author = self.user, rubric = self.rubric)
+        Bb.objects.create(title = 'велосипед', content = 'red', author = self.admin,
+                          rubric = self.rubric)
+        Comment.objects.create(bb = self.bb, author = 'Alex', content = 'nice')
+
+    def setUp(self):
+        self.client.login(username = 'admin', password = 'Admin1111')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(queries)
+
+    def test_query_count_independent_of_rows(self):
+        urls = ('/admin/main/bb/', '/admin/main/comment/')
+        before = [self.count_queries(url) for url in urls]
+        for bb_num in range(5):
+            author = AdvUser.objects.create_user(username = 'user%d' % bb_num)
+            bb = Bb.objects.create(title = 'car%d' % bb_num, content = 'red',
+                                   author = author, rubric = self.rubric)
+            Comment.objects.create(bb = bb, author = 'Alex', content = 'nice')
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_truncated_content(self):
+        resp = self.client.get('/admin/main/bb/')
+        self.assertContains(resp, 'очень очень')
+        self.assertNotContains(resp, 'очень ' * 20)
+
+    def test_search(self):
+        resp = self.client.get('/admin/main/bb/', {'q': 'машина'})
+        self.assertEqual(list(resp.context['cl'].result_list), [self.bb])
+        resp = self.client.get('/admin/main/bb/', {'q': 'seller'})
+        self.assertEqual(list(resp.context['cl'].result_list), [self.bb])
+        resp = self.client.get('/admin/main/bb/', {'q': str(self.bb.pk)})
+        self.assertEqual(list(resp.context['cl'].result_list), [self.bb])
+        resp = self.client.get('/admin/main/advuser/', {'q': 'seller@example.com'})
+        self.assertEqual(list(resp.context['cl'].result_list), [self.user])
+        resp = self.client.get('/admin/main/comment/', {'q': 'nothing'})
+        self.assertEqual(list(resp.context['cl'].result_list), [])
+        resp = self.client.get('/admin/main/comment/', {'q': str(self.bb.pk)})
+        self.assertEqual(resp.context['cl'].result_count, 1)
+
+    def test_date_hierarchy(self):
+        resp = self.client.get('/admin/main/bb/', {'created_at__year': self.bb.created_at.year})
+        self.assertEqual(resp.context['cl'].result_count, 2)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        user = AdvUser.objects.create_user(username = 'seller', password = 'Test1111')
+        for bb_num in range(12):
+            Bb.objects.create(title = 'car', content = 'red', author = user, rubric = rubric,
+                              is_active = bb_num % 2 == 0)
+
+    def paginator(self, queryset, exact_limit):
+        paginator = EstimatedCountPaginator(queryset, 5)
+        paginator.exact_limit = exact_limit
+        return paginator
+
+    def test_exact_below_limit(self):
+        self.assertEqual(self.paginator(Bb.objects.all(), 100).count, 12)
+        self.assertEqual(self.paginator(Bb.objects.filter(is_active = True), 100).count, 6)
+
+    def test_estimated_above_limit(self):
+        Bb.objects.filter(pk = Bb.objects.order_by('pk').first().pk).delete()
+        self.assertEqual(self.paginator(Bb.objects.all(), 5).count,
+                         Bb.objects.order_by('-pk').first().pk)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE main_bb')
+        self.assertEqual(self.paginator(Bb.objects.all(), 5).count, 11)
+
+    def test_filtered_count_capped(self):
+        self.assertEqual(self.paginator(Bb.objects.filter(is_active = True), 4).count, 4)
@@ -0,0 +1,120 @@
+from django.test import TestCase
+
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, SurrogateKey
+
+
+class BbListApiTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        self.superrub = SuperRubric.objects.create(name = 'sup')
+        self.other_superrub = SuperRubric.objects.create(name = 'other')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = self.superrub)
+        self.other_rubric = SubRubric.objects.create(name = 'books', super_rubric = self.other_superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser1', password = 'Test1111')
+        self.other_user = AdvUser.objects.create_user(username = 'testuser2', password = 'Test2222')
+        for bb_num in range(25):
+            Bb.objects.create(title = 'car' + str(bb_num), content = 'red', price = bb_num * 10,
+                              author = self.user, rubric = self.rubric)
+        self.book = Bb.objects.create(title = 'book', content = 'thick', price = 5,
+                                      author = self.other_user, rubric = self.other_rubric)
+        Bb.objects.create(title = 'hidden', author = self.user, rubric = self.rubric,
+                          is_active = False)
+
+    def get(self, query = '', status = 200):
+        resp = self.client.get('/api/bbs/' + query)
+        self.assertEqual(resp.status_code, status)
+        return resp.json()
+
+    def test_pages_cover_all_bbs(self):
+        data = self.get()
+        self.assertEqual(len(data['results']), 20)
+        ids = [bb['id'] for bb in data['results']]
+        data = self.client.get(data['next']).json()
+        ids += [bb['id'] for bb in data['results']]
+        self.assertIsNone(data['next'])
+        expected = Bb.objects.filter(is_active = True).order_by('-created_at', '-pk') \
+                             .values_list('id', flat = True)
+        self.assertEqual(ids, list(expected))
+
+    def test_filters(self):
+        data = self.get('?rubric=%d' % self.other_rubric.pk)
+        self.assertEqual([bb['id'] for bb in data['results']], [self.book.pk])
+        data = self.get('?super_rubric=%d' % self.other_superrub.pk)
+        self.assertEqual([bb['id'] for bb in data['results']], [self.book.pk])
+        data = self.get('?author=%d' % self.other_user.pk)
+        self.assertEqual([bb['id'] for bb in data['results']], [self.book.pk])
+        data = self.get('?price_min=100&price_max=150&limit=50')
+        self.assertEqual(sorted(bb['price'] for bb in data['results']), [100, 110, 120, 130, 140, 150])
+        data = self.get('?created_after=2000-01-01T00:00&created_before=2001-01-01T00:00')
+        self.assertEqual(data['results'], [])
+
+    def test_fields(self):
+        data = self.get('?fields=id,title&limit=1')
+        self.assertEqual(list(data['results'][0]), ['id', 'title'])
+        data = self.get('?limit=1')
+        self.assertEqual(set(data['results'][0]), {'id', 'title', 'content', 'price', 'rubric',
+                                                   'author', 'created_at', 'image'})
+        self.assertIsNone(data['results'][0]['image'])
+
+    def test_invalid_params(self):
+        self.assertIn('fields', self.get('?fields=id,password', 400))
+        self.assertIn('price_min', self.get('?price_min=cheap', 400))
+        self.assertIn('limit', self.get('?limit=1000', 400))
+        self.assertIn('cursor', self.get('?cursor=garbage', 400))
+
+    def test_max_page_size_read_per_request(self):
+        with self.settings(API_MAX_PAGE_SIZE = 1):
+            self.assertIn('limit', self.get('?limit=2', 400))
+        self.assertEqual(len(self.get('?limit=2', 200)['results']), 2)
+
+
+class ConditionalApiTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.bb = Bb.objects.create(title = 'car', content = 'red', author = self.user,
+                                    rubric = self.rubric)
+
+    def assert_revalidates(self, url, change):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        etag = resp['ETag']
+        self.assertTrue(etag.startswith('"'))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b'')
+        change()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_detail(self):
+        def change():
+            self.bb.price = 100
+            self.bb.save()
+        self.assert_revalidates('/api/bbs/%d/' % self.bb.pk, change)
+        resp = self.client.get('/api/bbs/%d/' % self.bb.pk)
+        resp = self.client.get('/api/bbs/%d/' % self.bb.pk,
+                               HTTP_IF_MODIFIED_SINCE = resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_list(self):
+        def change():
+            Bb.objects.create(title = 'bike', author = self.user, rubric = self.rubric)
+        self.assert_revalidates('/api/bbs/?limit=5', change)
+
+    def test_list_purged_by_other_worker(self):
+        def change():
+            SurrogateKey.objects.filter(key = 'bbs').update(version = 'other worker')
+        self.assert_revalidates('/api/bbs/?limit=5', change)
+
+    def test_comments(self):
+        url = '/api/bbs/%d/comments/' % self.bb.pk
+        def change():
+            self.client.login(username = 'testuser', password = 'Test1111')
+            with self.captureOnCommitCallbacks(execute = True):
+                self.client.post(url, {'bb': self.bb.pk, 'author': 'Alex', 'content': 'nice'})
+        self.assert_revalidates(url, change)
+        self.assertEqual(len(self.client.get(url).json()['results']), 1)
@@ -0,0 +1,35 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from main.benchmarks import SCENARIOS, compare, percentile, run_benchmarks, seed
+from main.models import Bb, BbSignature, Comment, SimilarBb
+
+
+class BenchmarkTest(TestCase):
+    def test_seed_and_run(self):
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT = media, PAGE_CACHE_TIMEOUT = 0):
+            dataset = seed(ads = 60, users = 10, super_rubrics = 2, sub_rubrics = 2,
+                           images = 2, batch_size = 25)
+            self.assertEqual(dataset['ads'], 60)
+            self.assertEqual(Bb.objects.count(), 60)
+            self.assertEqual(Comment.objects.count(), dataset['comments'])
+            self.assertEqual(Bb.likes.through.objects.count(), dataset['likes'])
+            self.assertEqual(BbSignature.objects.count(),
+                             Bb.objects.filter(is_active = True).count())
+            self.assertEqual(dataset['signatures'], BbSignature.objects.count())
+            self.assertTrue(SimilarBb.objects.exists())
+            results = run_benchmarks(requests = 3, warmup = 1)
+        self.assertEqual(set(results), set(SCENARIOS))
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(results['detail']['queries_per_request'], 0)
+
+    def test_percentile_and_compare(self):
+        timings = list(range(1, 101))
+        self.assertEqual(percentile(timings, 0.5), 50)
+        self.assertEqual(percentile(timings, 0.99), 99)
+        changes = compare({'index': {'p95_ms': 12}}, {'index': {'p95_ms': 10}})
+        self.assertAlmostEqual(changes['index'], 20)
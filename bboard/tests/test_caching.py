@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.caching import forget_versions
+from main.counters import counter_buffer
+from main.likes import toggle_like
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage, SurrogateKey
+
+
+class AnonymousCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        self.superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = self.superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.bb = Bb.objects.create(title = 'car', content = 'red', author = self.user,
+                                    rubric = self.rubric)
+
+    def setUp(self):
+        cache.clear()
+        forget_versions()
+        counter_buffer.reset()
+        self.detail_url = reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk,
+                                                           'pk': self.bb.pk})
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, len(ctx)
+
+    def test_cached_pages(self):
+        for url in (reverse('main:index'), self.detail_url,
+                    reverse('main:by_rubric', kwargs = {'pk': self.rubric.pk}),
+                    reverse('main:by_superrubric', kwargs = {'pk': self.superrub.pk})):
+            first, queries = self.get(url)
+            self.assertGreater(queries, 0)
+            second, queries = self.get(url)
+            self.assertEqual(queries, 0, url)
+            self.assertIsNone(second.context)
+            self.assertContains(second, 'car')
+
+    def test_query_string_in_key(self):
+        self.get(reverse('main:index'))
+        resp, queries = self.get(reverse('main:index') + '?keyword=car')
+        self.assertGreater(queries, 0)
+
+    def test_authenticated_not_cached(self):
+        self.client.login(username = 'testuser', password = 'Test1111')
+        self.get(reverse('main:index'))
+        resp, queries = self.get(reverse('main:index'))
+        self.assertIsNotNone(resp.context)
+
+    def test_bb_change_purges(self):
+        self.get(reverse('main:index'))
+        self.get(self.detail_url)
+        self.bb.title = 'bicycle'
+        self.bb.save()
+        self.assertContains(self.get(reverse('main:index'))[0], 'bicycle')
+        self.assertContains(self.get(self.detail_url)[0], 'bicycle')
+
+    @override_settings(SURROGATE_VERSION_TIMEOUT = 0)
+    def test_purge_from_other_worker(self):
+        self.get(reverse('main:index'))
+        Bb.objects.filter(pk = self.bb.pk).update(title = 'bicycle')
+        SurrogateKey.objects.filter(key = 'bbs').update(version = 'other worker')
+        self.assertContains(self.get(reverse('main:index'))[0], 'bicycle')
+
+    def test_rubric_move_purges_old_rubric(self):
+        url = reverse('main:by_rubric', kwargs = {'pk': self.rubric.pk})
+        self.assertContains(self.get(url)[0], 'car')
+        other = SubRubric.objects.create(name = 'trucks', super_rubric = self.superrub)
+        self.get(url)
+        self.bb.rubric = other
+        self.bb.save()
+        self.assertIsNotNone(self.get(url)[0].context)
+
+    def test_image_and_rubric_changes_purge(self):
+        self.get(self.detail_url)
+        AdditionalImage.objects.create(bb = self.bb, image = 'car2.jpg')
+        self.assertIsNotNone(self.get(self.detail_url)[0].context)
+        self.get(reverse('main:index'))
+        self.superrub.name = 'vehicles'
+        self.superrub.save()
+        self.assertContains(self.get(reverse('main:index'))[0], 'vehicles')
+
+    def test_counters_recorded_on_hit(self):
+        self.get(self.detail_url)
+        self.get(self.detail_url)
+        self.assertEqual(counter_buffer.pending_views(self.bb.pk), 2)
+        self.assertEqual(counter_buffer.pending_hits(self.detail_url), 2)
+
+    def test_fresh_csrf_token(self):
+        self.get(reverse('main:index'))
+        client = self.client_class(enforce_csrf_checks = True)
+        resp = client.get(reverse('main:index'))
+        token = resp.content.decode().split('name="csrfmiddlewaretoken" value="')[1] \
+                                     .split('"')[0]
+        resp = client.post(reverse('main:index'), {'csrfmiddlewaretoken': token,
+                                                   'keyword': 'car', 'rubric': self.rubric.pk})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_conditional_get(self):
+        for url in (reverse('main:index'), self.detail_url):
+            etag = self.get(url)[0]['ETag']
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH = etag)
+            self.assertEqual(resp.status_code, 304)
+        self.assertEqual(counter_buffer.pending_views(self.bb.pk), 2)
+        self.bb.save()
+        resp = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_detail_etag_follows_likes(self):
+        etag = self.get(self.detail_url)[0]['ETag']
+        toggle_like(self.bb.pk, self.user.pk)
+        resp = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['bb'].likes_count, 1)
+
+    @override_settings(PAGE_CACHE_TIMEOUT = 0, DETAIL_ETAG_VIEWS_BUCKET = 2)
+    def test_detail_etag_follows_view_buckets(self):
+        etag = self.get(self.detail_url)[0]['ETag']
+        resp = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH = etag)
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH = resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+    @override_settings(PAGE_CACHE_TIMEOUT = 0)
+    def test_conditional_detail_uncached(self):
+        resp = self.get(self.detail_url)[0]
+        self.assertNotIn('Last-Modified', resp)
+        resp = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH = resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(counter_buffer.pending_views(self.bb.pk), 2)
+        self.client.login(username = 'testuser', password = 'Test1111')
+        self.assertNotIn('ETag', self.get(self.detail_url)[0])
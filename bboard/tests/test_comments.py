@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from main.caching import forget_versions
+from main.comments import comment_snapshot, comments_key
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, Comment, SurrogateKey
+
+
+@override_settings(COMMENTS_PAGE_SIZE = 5)
+class CommentThreadTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.admin = AdvUser.objects.create_superuser(username = 'admin', password = 'Admin1111')
+        self.bb = Bb.objects.create(title = 'car', content = 'red', author = self.user,
+                                    rubric = self.rubric)
+        for comment_num in range(12):
+            Comment.objects.create(bb = self.bb, author = 'Alex',
+                                   content = 'comment %d' % comment_num)
+        Comment.objects.create(bb = self.bb, author = 'Spam', content = 'spam',
+                               is_active = False)
+
+    def setUp(self):
+        cache.clear()
+        forget_versions()
+        self.url = '/api/bbs/%d/comments/' % self.bb.pk
+
+    def test_pages_cover_all_comments(self):
+        data = self.client.get(self.url).json()
+        self.assertEqual(data['count'], 12)
+        ids = [comment['id'] for comment in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            ids += [comment['id'] for comment in data['results']]
+        expected = Comment.objects.filter(is_active = True).order_by('-created_at', '-pk') \
+                                  .values_list('id', flat = True)
+        self.assertEqual(ids, list(expected))
+
+    def test_first_page_from_snapshot(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            data = self.client.get(self.url + '?limit=3').json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNotNone(data['next'])
+
+    def test_snapshot_invalidated_on_save(self):
+        version = comment_snapshot(self.bb.pk)['version']
+        with self.captureOnCommitCallbacks(execute = True):
+            Comment.objects.create(bb = self.bb, author = 'Bob', content = 'newest')
+        snapshot = comment_snapshot(self.bb.pk)
+        self.assertNotEqual(snapshot['version'], version)
+        self.assertEqual(snapshot['count'], 13)
+        self.assertEqual(snapshot['latest'][0].content, 'newest')
+
+    def test_snapshot_kept_until_commit(self):
+        version = comment_snapshot(self.bb.pk)['version']
+        with self.captureOnCommitCallbacks() as callbacks:
+            Comment.objects.create(bb = self.bb, author = 'Bob', content = 'newest')
+            self.assertEqual(comment_snapshot(self.bb.pk)['version'], version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(comment_snapshot(self.bb.pk)['version'], version)
+
+    def test_snapshot_invalidated_by_other_worker(self):
+        version = comment_snapshot(self.bb.pk)['version']
+        Comment.objects.filter(bb = self.bb).update(is_active = False)
+        SurrogateKey.objects.update_or_create(key = comments_key(self.bb.pk),
+                                              defaults = {'version': 'other'})
+        forget_versions()
+        snapshot = comment_snapshot(self.bb.pk)
+        self.assertNotEqual(snapshot['version'], version)
+        self.assertEqual(snapshot['count'], 0)
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.client.get(self.url + '?cursor=garbage&limit=20').status_code, 400)
+
+    def test_moderation_api(self):
+        ids = list(Comment.objects.values_list('id', flat = True))
+        body = {'ids': ids, 'is_active': False}
+        url = '/api/comments/moderate/'
+        self.assertEqual(self.client.post(url, body, content_type = 'application/json')
+                             .status_code, 403)
+        self.client.login(username = 'admin', password = 'Admin1111')
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute = True):
+            resp = self.client.post(url, body, content_type = 'application/json')
+        self.assertEqual(resp.json(), {'updated': 12})
+        self.assertEqual(self.client.get(self.url).json()['count'], 0)
+        self.assertEqual(self.client.post(url, {'ids': [], 'is_active': True},
+                                          content_type = 'application/json').status_code, 400)
+
+    def test_admin_actions(self):
+        self.client.login(username = 'admin', password = 'Admin1111')
+        spam = Comment.objects.get(author = 'Spam')
+        self.client.post('/admin/main/comment/', {'action': 'show_comments',
+                                                  '_selected_action': [spam.pk]})
+        self.assertEqual(comment_snapshot(self.bb.pk)['count'], 13)
+        resp = self.client.get('/admin/main/bb/%d/change/' % self.bb.pk)
+        self.assertContains(resp, '?bb__id__exact=%d">13</a>' % self.bb.pk)
@@ -0,0 +1,93 @@
+import threading
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.counters import CounterBuffer, counter_buffer, request_flush
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, PageHit
+
+
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
+class CounterBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        user = AdvUser.objects.create_user(username = 'Alex', password = 'Test1111')
+        self.bb1 = Bb.objects.create(title = 'car', author = user, rubric = self.rubric)
+        self.bb2 = Bb.objects.create(title = 'book', author = user, rubric = self.rubric)
+
+    def setUp(self):
+        counter_buffer.reset()
+
+    def test_flush_aggregates_increments(self):
+        buffer = CounterBuffer()
+        for i in range(3):
+            buffer.record_view(self.bb1.pk)
+            buffer.record_hit('/a/')
+        buffer.record_view(self.bb2.pk)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 0)
+        self.assertEqual(buffer.pending_views(self.bb1.pk), 3)
+        self.assertEqual(buffer.flush(), 7)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 3)
+        self.assertEqual(Bb.objects.get(pk = self.bb2.pk).views, 1)
+        self.assertEqual(PageHit.objects.get(url = '/a/').count, 3)
+        buffer.record_hit('/a/')
+        buffer.flush()
+        self.assertEqual(PageHit.objects.get(url = '/a/').count, 4)
+        self.assertEqual(buffer.flush(), 0)
+
+    @override_settings(COUNTER_FLUSH_THRESHOLD = 5)
+    def test_flush_on_threshold(self):
+        buffer = CounterBuffer()
+        for i in range(4):
+            buffer.record_view(self.bb1.pk)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 0)
+        buffer.record_view(self.bb1.pk)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 5)
+
+    @override_settings(COUNTER_FLUSH_INTERVAL = 0)
+    def test_flush_on_interval(self):
+        buffer = CounterBuffer()
+        buffer.record_view(self.bb1.pk)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 1)
+
+    @override_settings(COUNTER_FLUSH_THRESHOLD = 10 ** 6, COUNTER_FLUSH_INTERVAL = 10 ** 6)
+    def test_concurrent_increments(self):
+        buffer = CounterBuffer()
+        def hit():
+            for i in range(50):
+                buffer.record_view(self.bb1.pk)
+        threads = [threading.Thread(target = hit) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(buffer.pending_views(self.bb1.pk), 400)
+
+    def test_flush_requested_through_database(self):
+        buffer = CounterBuffer()
+        self.assertFalse(buffer._flush_requested())
+        self.assertFalse(buffer._flush_requested())
+        request_flush()
+        self.assertTrue(buffer._flush_requested())
+        self.assertFalse(buffer._flush_requested())
+
+    @override_settings(COUNTER_FLUSH_THRESHOLD = 3)
+    def test_detail_count_survives_inline_flush(self):
+        url = reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk, 'pk': self.bb1.pk})
+        counter_buffer.record_view(self.bb1.pk)
+        resp = self.client.get(url)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 2)
+        self.assertEqual(resp.context['bb'].views, 2)
+
+    def test_detail_view_is_buffered(self):
+        url = reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk, 'pk': self.bb1.pk})
+        self.client.get(url)
+        resp = self.client.get(url)
+        self.assertEqual(resp.context['bb'].views, 2)
+        self.assertEqual(resp.context['count_views'], 2)
+        self.assertFalse(PageHit.objects.filter(url = url).exists())
+        counter_buffer.flush()
+        self.assertEqual(PageHit.objects.get(url = url).count, 2)
+        self.assertEqual(Bb.objects.get(pk = self.bb1.pk).views, 2)
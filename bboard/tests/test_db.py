@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+
+from main.db import apply_sqlite_pragmas, sqlite_pragmas
+
+
+class SqlitePragmasTest(TestCase):
+    def setUp(self):
+        self.connection = connections.create_connection('default')
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_profile_off_by_default(self):
+        with override_settings(SQLITE_PRAGMAS = {'busy_timeout': 1234}):
+            apply_sqlite_pragmas(self.connection)
+        self.assertNotEqual(sqlite_pragmas(self.connection)['busy_timeout'], 1234)
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE = True)
+    def test_pragmas_applied(self):
+        apply_sqlite_pragmas(self.connection)
+        pragmas = sqlite_pragmas(self.connection)
+        self.assertEqual(pragmas['synchronous'], 1)
+        self.assertEqual(pragmas['busy_timeout'], 5000)
+        self.assertEqual(pragmas['cache_size'], -64 * 1024)
+        self.assertEqual(pragmas['temp_store'], 2)
+
+    @override_settings(SQLITE_PRODUCTION_PROFILE = True,
+                       SQLITE_PRAGMAS = {'busy_timeout': 1000})
+    def test_configurable(self):
+        apply_sqlite_pragmas(self.connection)
+        self.assertEqual(sqlite_pragmas(self.connection)['busy_timeout'], 1000)
+
+    def test_health_command(self):
+        out = StringIO()
+        call_command('db_health', stdout = out)
+        self.assertIn('production_profile   off', out.getvalue())
+        self.assertNotIn('configured', out.getvalue())
+        self.assertIn('wal_size', out.getvalue())
+        with override_settings(SQLITE_PRODUCTION_PROFILE = True):
+            out = StringIO()
+            call_command('db_health', stdout = out)
+        self.assertIn('(configured: normal)', out.getvalue())
@@ -0,0 +1,136 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from main.deletion import delete_bbs, delete_users, delete_files, next_cleanup_delay
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage, \
+                        Comment, RecentBbs, DeletedFile
+from main.search import search_bbs
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT, FILE_CLEANUP_IN_BACKGROUND = False,
+                   THUMBNAIL_WORKERS = 0, SIMILAR_BBS_IN_BACKGROUND = False,
+                   FILE_CLEANUP_GRACE = 0)
+class BulkDeletionTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.seller = AdvUser.objects.create_user(username = 'seller', password = 'Test1111')
+        self.buyer = AdvUser.objects.create_user(username = 'buyer', password = 'Test1111')
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors = True)
+        super().tearDownClass()
+
+    def create_bb(self, author, title = 'машина'):
+        bb = Bb.objects.create(title = title, content = 'red', author = author,
+                               rubric = self.rubric)
+        Comment.objects.create(bb = bb, author = 'Alex', content = 'nice')
+        RecentBbs.objects.create(user = self.buyer, bb = bb)
+        bb.likes.add(self.buyer)
+        return bb
+
+    def test_delete_bbs(self):
+        bbs = [self.create_bb(self.seller) for i in range(5)]
+        kept = self.create_bb(self.buyer)
+        name = default_storage.save('bulk.jpg', ContentFile(b'data'))
+        AdditionalImage.objects.create(bb = bbs[0], image = name)
+        with self.captureOnCommitCallbacks(execute = True):
+            self.assertEqual(delete_bbs([bb.pk for bb in bbs], chunk_size = 2), 5)
+        self.assertEqual(list(Bb.objects.all()), [kept])
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(RecentBbs.objects.count(), 1)
+        self.assertEqual(AdditionalImage.objects.count(), 0)
+        self.assertEqual(list(search_bbs('машина')), [kept])
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(DeletedFile.objects.count(), 0)
+
+    def test_shared_files_kept(self):
+        name = default_storage.save('shared.jpg', ContentFile(b'data'))
+        first = self.create_bb(self.seller)
+        second = self.create_bb(self.buyer)
+        Bb.objects.filter(pk__in=[first.pk, second.pk]).update(image = name)
+        with self.captureOnCommitCallbacks(execute = True):
+            delete_bbs([first.pk])
+        self.assertTrue(default_storage.exists(name))
+
+    def test_delete_users(self):
+        self.create_bb(self.seller)
+        liked = self.create_bb(self.seller)
+        other = self.create_bb(self.buyer)
+        other.likes.add(self.seller)
+        Bb.objects.filter(pk = other.pk).update(likes_count = 2)
+        count, deleted = delete_users([self.seller.pk])
+        self.assertEqual(deleted['main.Bb'], 2)
+        self.assertEqual(deleted['main.AdvUser'], 1)
+        self.assertEqual(count, sum(deleted.values()))
+        self.assertFalse(AdvUser.objects.filter(pk = self.seller.pk).exists())
+        self.assertFalse(Bb.objects.filter(pk = liked.pk).exists())
+        other.refresh_from_db()
+        self.assertEqual(other.likes_count, 1)
+        self.assertEqual(list(other.likes.all()), [self.buyer])
+
+    def test_model_delete_returns_counts(self):
+        self.create_bb(self.seller)
+        count, deleted = self.seller.delete()
+        self.assertEqual(deleted['main.AdvUser'], 1)
+        self.assertEqual(deleted['main.Bb'], 1)
+        self.assertEqual(count, sum(deleted.values()))
+
+    def test_delete_user_view(self):
+        self.create_bb(self.seller)
+        self.client.login(username = 'seller', password = 'Test1111')
+        self.client.post('/accounts/profile/delete/')
+        self.assertFalse(AdvUser.objects.filter(username = 'seller').exists())
+        self.assertEqual(Bb.objects.count(), 0)
+
+    def test_admin_bulk_action(self):
+        bbs = [self.create_bb(self.seller) for i in range(3)]
+        AdvUser.objects.create_superuser(username = 'admin', password = 'Admin1111')
+        self.client.login(username = 'admin', password = 'Admin1111')
+        self.client.post('/admin/main/bb/', {'action': 'delete_selected', 'post': 'yes',
+                                             '_selected_action': [bb.pk for bb in bbs[:2]]})
+        self.assertEqual(list(Bb.objects.all()), [bbs[2]])
+
+    def test_cleanup_command(self):
+        name = default_storage.save('queued.jpg', ContentFile(b'data'))
+        DeletedFile.objects.create(name = name)
+        out = StringIO()
+        call_command('cleanup_files', stdout = out)
+        self.assertIn('Processed 1 queued files, deleted 1, waiting 0', out.getvalue())
+        self.assertFalse(default_storage.exists(name))
+
+    @override_settings(FILE_CLEANUP_GRACE = 60)
+    def test_grace_period(self):
+        name = default_storage.save('fresh.jpg', ContentFile(b'data'))
+        DeletedFile.objects.create(name = name)
+        self.assertEqual(delete_files(), 0)
+        self.assertTrue(default_storage.exists(name))
+        DeletedFile.objects.update(created_at = timezone.now() - timedelta(minutes = 2))
+        bb = self.create_bb(self.seller)
+        Bb.objects.filter(pk = bb.pk).update(image = name)
+        self.assertEqual(delete_files(), 0)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(DeletedFile.objects.count(), 0)
+
+    @override_settings(FILE_CLEANUP_GRACE = 600)
+    def test_next_cleanup_delay(self):
+        self.assertIsNone(next_cleanup_delay())
+        DeletedFile.objects.create(name = 'one.jpg')
+        DeletedFile.objects.filter(name = 'one.jpg') \
+                           .update(created_at = timezone.now() - timedelta(minutes = 4))
+        DeletedFile.objects.create(name = 'two.jpg')
+        self.assertAlmostEqual(next_cleanup_delay(), 360, delta = 5)
+        DeletedFile.objects.update(created_at = timezone.now() - timedelta(hours = 1))
+        self.assertEqual(next_cleanup_delay(), 0)
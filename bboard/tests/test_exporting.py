@@ -0,0 +1,78 @@
+import csv
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from main.exporting import accepts_gzip
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, Comment
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'Машины', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.admin = AdvUser.objects.create_superuser(username = 'admin', password = 'Admin1111')
+        for bb_num in range(3):
+            bb = Bb.objects.create(title = 'машина, "%d"' % bb_num, content = 'red\nfast',
+                                   author = self.user, rubric = self.rubric,
+                                   phone_number = '+79991234567')
+            Comment.objects.create(bb = bb, author = 'Alex', content = 'nice')
+
+    def read(self, resp):
+        return b''.join(resp.streaming_content)
+
+    def test_requires_admin(self):
+        self.assertEqual(self.client.get('/api/export/bbs.jsonl').status_code, 403)
+        self.client.login(username = 'testuser', password = 'Test1111')
+        self.assertEqual(self.client.get('/api/export/bbs.jsonl').status_code, 403)
+
+    def test_jsonl(self):
+        self.client.login(username = 'admin', password = 'Admin1111')
+        resp = self.client.get('/api/export/bbs.jsonl')
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(resp).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         list(Bb.objects.order_by('pk').values_list('pk', flat = True)))
+        self.assertEqual(rows[0]['title'], 'машина, "0"')
+        self.assertEqual(rows[0]['rubric__name'], 'Машины')
+        self.assertEqual(rows[0]['phone_number'], '+79991234567')
+        self.assertIn('T', rows[0]['created_at'])
+
+    def test_csv_gzip(self):
+        self.client.login(username = 'admin', password = 'Admin1111')
+        resp = self.client.get('/api/export/comments.csv', HTTP_ACCEPT_ENCODING = 'gzip, deflate')
+        self.assertEqual(resp['Content-Encoding'], 'gzip')
+        rows = list(csv.reader(StringIO(gzip.decompress(self.read(resp)).decode())))
+        self.assertEqual(rows[0], ['id', 'bb', 'author', 'content', 'is_active', 'created_at'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(self.client.get('/api/export/users.csv').status_code, 404)
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip('gzip, deflate'))
+        self.assertTrue(accepts_gzip('deflate, GZIP;q=0.5'))
+        self.assertTrue(accepts_gzip('br, *'))
+        self.assertFalse(accepts_gzip('gzip;q=0, *'))
+        self.assertFalse(accepts_gzip('gzip; q=0.0'))
+        self.assertFalse(accepts_gzip('identity'))
+        self.assertFalse(accepts_gzip(''))
+        self.client.login(username = 'admin', password = 'Admin1111')
+        resp = self.client.get('/api/export/comments.csv', HTTP_ACCEPT_ENCODING = 'gzip;q=0')
+        self.assertFalse(resp.has_header('Content-Encoding'))
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'bbs.csv.gz'
+            out = StringIO()
+            call_command('export_data', 'bbs', format = 'csv', gzip = True,
+                         output = str(path), stdout = out)
+            self.assertIn('Wrote', out.getvalue())
+            rows = list(csv.reader(StringIO(gzip.decompress(path.read_bytes()).decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][5], 'red\nfast')
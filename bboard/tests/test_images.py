@@ -0,0 +1,115 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from main.images import is_normalized, store_image
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes(size = (800, 600), mode = 'RGB', color = 'red', fmt = 'JPEG', **kwargs):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, fmt, **kwargs)
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT, THUMBNAIL_WORKERS = 0,
+                   FILE_CLEANUP_IN_BACKGROUND = False, IMAGE_MAX_SIZE = (400, 400),
+                   SIMILAR_BBS_IN_BACKGROUND = False, FILE_CLEANUP_GRACE = 0)
+class ImagePipelineTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors = True)
+        super().tearDownClass()
+
+    def create_bb(self, image):
+        return Bb.objects.create(title = 'car', author = self.user, rubric = self.rubric,
+                                 image = image)
+
+    def test_normalized_on_upload(self):
+        exif = Image.Exif()
+        exif[0x010f] = 'Phone'
+        bb = self.create_bb(SimpleUploadedFile(
+            'car.jpg', image_bytes((1600, 1200), exif = exif.tobytes())))
+        self.assertTrue(is_normalized(bb.image.name))
+        self.assertTrue(bb.image.name.endswith('.jpg'))
+        with Image.open(default_storage.open(bb.image.name)) as image:
+            self.assertEqual(image.size, (400, 300))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_alpha_stored_as_webp(self):
+        bb = self.create_bb(SimpleUploadedFile(
+            'logo.png', image_bytes(mode = 'RGBA', color = (0, 0, 0, 0), fmt = 'PNG')))
+        self.assertTrue(bb.image.name.endswith('.webp'))
+        with Image.open(default_storage.open(bb.image.name)) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_identical_uploads_deduped(self):
+        data = image_bytes(color = 'blue')
+        first = self.create_bb(SimpleUploadedFile('one.jpg', data))
+        second = self.create_bb(SimpleUploadedFile('two.jpg', data))
+        ai = AdditionalImage.objects.create(bb = second, image = SimpleUploadedFile('three.jpg', data))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ai.image.name, first.image.name)
+        self.assertEqual(store_image(ContentFile(data)), first.image.name)
+
+    def test_shared_file_kept_on_delete(self):
+        data = image_bytes(color = 'green')
+        first = self.create_bb(SimpleUploadedFile('one.jpg', data))
+        second = self.create_bb(SimpleUploadedFile('two.jpg', data))
+        name = first.image.name
+        with self.captureOnCommitCallbacks(execute = True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+        with self.captureOnCommitCallbacks(execute = True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_replaced_image_deleted(self):
+        bb = self.create_bb(SimpleUploadedFile('one.jpg', image_bytes(color = 'white')))
+        old = bb.image.name
+        bb.image = SimpleUploadedFile('two.jpg', image_bytes(color = 'black'))
+        with self.captureOnCommitCallbacks(execute = True):
+            bb.save()
+        self.assertNotEqual(bb.image.name, old)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(bb.image.name))
+
+    def test_backfill_command(self):
+        legacy = default_storage.save('legacy.jpg', ContentFile(image_bytes((1000, 500))))
+        first = self.create_bb('')
+        second = self.create_bb('')
+        Bb.objects.filter(pk__in = [first.pk, second.pk]).update(image = legacy)
+        AdditionalImage.objects.create(bb = first, image = legacy)
+        out = StringIO()
+        call_command('normalize_images', '--dry-run', stdout = out)
+        self.assertIn('Images to normalize: 1', out.getvalue())
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute = True):
+            call_command('normalize_images', stdout = out)
+        self.assertIn('Normalized 1 images into 1 files', out.getvalue())
+        first.refresh_from_db()
+        self.assertTrue(is_normalized(first.image.name))
+        names = set(Bb.objects.values_list('image', flat = True)) | \
+                set(AdditionalImage.objects.values_list('image', flat = True))
+        self.assertEqual(names, {first.image.name})
+        self.assertFalse(default_storage.exists(legacy))
+        with Image.open(default_storage.open(first.image.name)) as image:
+            self.assertEqual(image.size, (400, 200))
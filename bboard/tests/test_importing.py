@@ -0,0 +1,84 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage
+from main.search import search_bbs
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT)
+class ImportBbsTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'Машины', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'partner', password = 'Test1111')
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors = True)
+        super().tearDownClass()
+
+    def run_import(self, name, content, *args):
+        path = self.dir / name
+        path.write_text(content, encoding = 'utf-8')
+        out, err = StringIO(), StringIO()
+        call_command('import_bbs', str(path), *args, batch_size = 2, stdout = out, stderr = err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv(self):
+        content = ('title,content,price,contacts,rubric,author\n'
+                   'Красная машина,Быстрая,100,phone,машины,partner\n'
+                   'Синяя машина,Медленная,200,phone,%d,\n'
+                   'Без цены,Нет,дорого,phone,машины,partner\n'
+                   'Лодка,Плывёт,10,phone,лодки,partner\n' % self.rubric.pk)
+        out, err = self.run_import('feed.csv', content, '--author', 'partner')
+        self.assertIn('Imported 2 of 4 rows', out)
+        self.assertIn('Batch 2: 2 rows, 0 created', out)
+        self.assertIn('Line 4: price', err)
+        self.assertIn("Line 5: Unknown rubric 'лодки'", err)
+        self.assertEqual(Bb.objects.count(), 2)
+        self.assertEqual(list(search_bbs('красная')), [Bb.objects.get(title = 'Красная машина')])
+
+    def test_ids_of_deleted_bbs_not_reused(self):
+        deleted = Bb.objects.create(title = 'old', author = self.user, rubric = self.rubric)
+        Bb.objects.filter(pk = deleted.pk).delete()
+        content = ('title,content,price,contacts,rubric,author\n'
+                   'Красная машина,Быстрая,100,phone,машины,partner\n'
+                   'Синяя машина,Медленная,200,phone,машины,partner\n')
+        self.run_import('feed.csv', content)
+        pks = sorted(Bb.objects.values_list('pk', flat = True))
+        self.assertEqual(len(pks), 2)
+        self.assertGreater(pks[0], deleted.pk)
+        self.assertGreater(Bb.objects.create(title = 'new', author = self.user,
+                                             rubric = self.rubric).pk, pks[1])
+
+    def test_jsonl_with_images(self):
+        (self.dir / 'a.jpg').write_bytes(b'a')
+        (self.dir / 'b.jpg').write_bytes(b'b')
+        rows = [{'title': 'car', 'content': 'red', 'contacts': 'phone', 'rubric': 'машины',
+                 'author': 'partner', 'image': 'a.jpg', 'images': ['b.jpg']},
+                {'title': 'lost', 'content': 'red', 'contacts': 'phone', 'rubric': 'машины',
+                 'author': 'partner', 'image': 'missing.jpg'},
+                {'title': 'nobody', 'content': 'red', 'contacts': 'phone', 'rubric': 'машины',
+                 'author': 'ghost'}]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\n{broken\n'
+        out, err = self.run_import('feed.jsonl', content, '--images-dir', str(self.dir))
+        self.assertIn('Imported 1 of 4 rows', out)
+        self.assertIn('Line 2: Could not copy image', err)
+        self.assertIn("Line 3: Unknown author 'ghost'", err)
+        self.assertIn('Line 4: Malformed row', err)
+        bb = Bb.objects.get()
+        self.assertEqual(bb.image.read(), b'a')
+        self.assertEqual(AdditionalImage.objects.get(bb = bb).image.read(), b'b')
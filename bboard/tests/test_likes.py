@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from main.likes import toggle_like, drifted_likes, reconcile_likes
+from main.models import SubRubric, SuperRubric, AdvUser, Bb
+
+
+class LikeToggleTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user1 = AdvUser.objects.create_user(username = 'testuser1', password = 'Test1111')
+        self.user2 = AdvUser.objects.create_user(username = 'testuser2', password = 'Test2222')
+        self.bb = Bb.objects.create(title = 'car', author = self.user1, rubric = rubric)
+        self.other = Bb.objects.create(title = 'book', author = self.user1, rubric = rubric)
+
+    def test_toggle(self):
+        self.assertEqual(toggle_like(self.bb.pk, self.user1.pk), (True, 1))
+        self.assertEqual(toggle_like(self.bb.pk, self.user2.pk), (True, 2))
+        self.assertEqual(toggle_like(self.bb.pk, self.user1.pk), (False, 1))
+        self.assertEqual(list(self.bb.likes.all()), [self.user2])
+        self.assertEqual(Bb.objects.get(pk = self.bb.pk).likes_count, 1)
+
+    def test_missing_bb(self):
+        with self.assertRaises(Bb.DoesNotExist):
+            toggle_like(10 ** 6, self.user1.pk)
+        self.assertEqual(Bb.likes.through.objects.count(), 0)
+
+    def test_like_view(self):
+        self.client.login(username = 'testuser1', password = 'Test1111')
+        data = {'action': 'post', 'bb_id': self.bb.pk}
+        resp = self.client.post(reverse('main:like_bb'), data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.json()['liked'])
+        self.assertEqual(resp.json()['likes_count'], 1)
+        self.assertIn('В избранном', resp.json()['result'])
+        resp = self.client.post(reverse('main:like_bb'), data)
+        self.assertFalse(resp.json()['liked'])
+        self.assertEqual(resp.json()['likes_count'], 0)
+        resp = self.client.post(reverse('main:like_bb'), {'action': 'post', 'bb_id': 10 ** 6})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_reconcile(self):
+        self.bb.likes.add(self.user1, self.user2)
+        Bb.objects.filter(pk = self.other.pk).update(likes_count = 5)
+        self.assertEqual(drifted_likes().count(), 2)
+        self.assertEqual(reconcile_likes(chunk_size = 1), 2)
+        self.assertEqual(Bb.objects.get(pk = self.bb.pk).likes_count, 2)
+        self.assertEqual(Bb.objects.get(pk = self.other.pk).likes_count, 0)
+        self.assertEqual(drifted_likes().count(), 0)
+
+    def test_reconcile_command(self):
+        self.bb.likes.add(self.user1)
+        out = StringIO()
+        call_command('reconcile_likes', '--dry-run', stdout = out)
+        self.assertIn('1 ads', out.getvalue())
+        call_command('reconcile_likes', stdout = out)
+        self.assertEqual(Bb.objects.get(pk = self.bb.pk).likes_count, 1)
@@ -0,0 +1,88 @@
+import time
+
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.counters import counter_buffer
+from main.live import LiveUpdates, group_name, live_updates
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, Comment
+from main.routing import websocket_urlpatterns
+
+
+class BbConsumerTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.bb = Bb.objects.create(title = 'car', author = user, rubric = rubric)
+
+    async def test_group_fan_out(self):
+        application = URLRouter(websocket_urlpatterns)
+        first = WebsocketCommunicator(application, '/ws/bbs/%d/' % self.bb.pk)
+        second = WebsocketCommunicator(application, '/ws/bbs/%d/' % self.bb.pk)
+        self.assertTrue((await first.connect())[0])
+        self.assertTrue((await second.connect())[0])
+        await get_channel_layer().group_send(group_name(self.bb.pk),
+                                             {'type': 'bb.update', 'data': {'likes_count': 3}})
+        self.assertEqual(await first.receive_json_from(), {'likes_count': 3})
+        self.assertEqual(await second.receive_json_from(), {'likes_count': 3})
+        await first.disconnect()
+        await second.disconnect()
+
+    async def test_unknown_bb(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), '/ws/bbs/1000000/')
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+
+
+class LiveUpdatesTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.bb = Bb.objects.create(title = 'car', author = self.user, rubric = rubric)
+
+    def setUp(self):
+        live_updates.reset()
+        self.sent = []
+        self.send = live_updates.send
+        live_updates.send = lambda bb_pk, data: self.sent.append((bb_pk, data))
+
+    def tearDown(self):
+        live_updates.send = self.send
+
+    @override_settings(LIVE_UPDATES_INTERVAL = 0.05)
+    def test_coalescing(self):
+        updates = LiveUpdates(send = lambda bb_pk, data: self.sent.append((bb_pk, data)))
+        updates.publish(1, likes_count = 1)
+        updates.publish(1, likes_count = 2, comments = [{'content': 'a'}])
+        updates.publish(1, likes_count = 3, comments = [{'content': 'b'}])
+        updates.publish(2, views = 5)
+        self.assertEqual(self.sent, [(1, {'likes_count': 1}), (2, {'views': 5})])
+        time.sleep(0.2)
+        self.assertEqual(self.sent[2], (1, {'likes_count': 3,
+                                            'comments': [{'content': 'a'}, {'content': 'b'}]}))
+        self.assertEqual(len(self.sent), 3)
+
+    def test_like_publishes(self):
+        self.client.login(username = 'testuser', password = 'Test1111')
+        self.client.post(reverse('main:like_bb'), {'action': 'post', 'bb_id': self.bb.pk})
+        self.assertEqual(self.sent, [(self.bb.pk, {'likes_count': 1})])
+
+    def test_comment_publishes(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            Comment.objects.create(bb = self.bb, author = 'Alex', content = 'nice')
+            Comment.objects.create(bb = self.bb, author = 'Bob', content = 'hidden', is_active = False)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0][1]['comments'][0]['content'], 'nice')
+
+    def test_views_published_on_flush(self):
+        counter_buffer.reset()
+        counter_buffer.record_view(self.bb.pk)
+        counter_buffer.flush()
+        self.assertEqual(self.sent, [(self.bb.pk, {'views': 1})])
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from main.apps import user_registered
+from main.mailqueue import ACTIVATION, enqueue, release_stale, retry_delay, run_batch
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, Comment, EmailJob
+
+
+class CountingBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingBackend.opened += 1
+        return super().open()
+
+
+class FailingBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError('mail server is down')
+
+
+@override_settings(EMAIL_ACTIVATION_LETTERS = True, EMAIL_NEW_COMMENT_NOTIFICATIONS = True)
+class EmailQueueTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111',
+                                                email = 'test@example.com')
+        self.bb = Bb.objects.create(title = 'car', content = 'red', author = self.user,
+                                    rubric = self.rubric)
+
+    def test_registration_is_queued(self):
+        user_registered.send(AdvUser, instance = self.user)
+        self.assertEqual(len(mail.outbox), 0)
+        job = EmailJob.objects.get()
+        self.assertEqual((job.kind, job.object_id), (ACTIVATION, self.user.pk))
+        self.assertEqual(run_batch(), {'sent': 1})
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, EmailJob.SENT)
+        self.assertIsNotNone(job.sent_at)
+
+    @override_settings(EMAIL_ACTIVATION_LETTERS = False, EMAIL_NEW_COMMENT_NOTIFICATIONS = False)
+    def test_disabled_by_default(self):
+        user_registered.send(AdvUser, instance = self.user)
+        Comment.objects.create(bb = self.bb, author = 'Alex', content = 'nice')
+        self.assertFalse(EmailJob.objects.exists())
+
+    def test_new_comment_is_queued(self):
+        Comment.objects.create(bb = self.bb, author = 'Alex', content = 'nice')
+        AdvUser.objects.filter(pk = self.user.pk).update(send_messages = False)
+        Comment.objects.create(bb = self.bb, author = 'Alex', content = 'again')
+        self.assertEqual(EmailJob.objects.count(), 1)
+        run_batch()
+        self.assertEqual(mail.outbox[0].subject, 'Леч')
+
+    @override_settings(EMAIL_BACKEND = 'bboard.tests.test_mailqueue.CountingBackend')
+    def test_one_connection_per_batch(self):
+        users = [AdvUser.objects.create_user(username = 'user%d' % i, email = 'u%d@example.com' % i)
+                 for i in range(5)]
+        enqueue(ACTIVATION, [user.pk for user in users])
+        CountingBackend.opened = 0
+        self.assertEqual(run_batch(batch_size = 3), {'sent': 3})
+        self.assertEqual(run_batch(batch_size = 3), {'sent': 2})
+        self.assertEqual(CountingBackend.opened, 2)
+        self.assertEqual(len(mail.outbox), 5)
+
+    @override_settings(EMAIL_BACKEND = 'bboard.tests.test_mailqueue.FailingBackend',
+                       EMAIL_QUEUE_MAX_ATTEMPTS = 2)
+    def test_retries_with_backoff(self):
+        enqueue(ACTIVATION, [self.user.pk])
+        self.assertEqual(run_batch(), {'pending': 1})
+        job = EmailJob.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('mail server is down', job.last_error)
+        self.assertEqual(run_batch(), {})
+        EmailJob.objects.update(run_at = timezone.now())
+        self.assertEqual(run_batch(), {'failed': 1})
+        self.assertEqual(retry_delay(1), timedelta(minutes = 1))
+        self.assertEqual(retry_delay(3), timedelta(minutes = 4))
+        self.assertEqual(retry_delay(20), timedelta(hours = 1))
+
+    def test_stale_jobs_released(self):
+        enqueue(ACTIVATION, [self.user.pk])
+        EmailJob.objects.update(status = EmailJob.RUNNING,
+                                locked_at = timezone.now() - timedelta(hours = 1))
+        self.assertEqual(release_stale(), 1)
+        self.assertEqual(run_batch(), {'sent': 1})
+
+    def test_worker_command(self):
+        enqueue(ACTIVATION, [self.user.pk])
+        out = StringIO()
+        call_command('run_worker', '--once', stdout = out)
+        self.assertIn('sent: 1', out.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_admin_action(self):
+        AdvUser.objects.create_superuser(username = 'admin', password = 'Admin1111')
+        self.client.login(username = 'admin', password = 'Admin1111')
+        self.client.post('/admin/main/advuser/', {'action': 'send_activation_notifications',
+                                                  '_selected_action': [self.user.pk]})
+        self.assertEqual(EmailJob.objects.filter(object_id = self.user.pk).count(), 1)
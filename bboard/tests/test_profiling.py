@@ -0,0 +1,76 @@
+import tempfile
+from pathlib import Path
+
+from django.test import Client, TestCase, override_settings
+
+from main.models import SubRubric, SuperRubric, AdvUser, Bb
+from main.profiling import Histogram, profiler
+
+
+@override_settings(PROFILING = True, PROFILING_SAMPLE_RATE = 0,
+                   PAGE_CACHE_TIMEOUT = 0)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'Машины', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.admin = AdvUser.objects.create_superuser(username = 'admin', password = 'Admin1111')
+        self.bb = Bb.objects.create(title = 'машина', content = 'red', author = self.user,
+                                    rubric = self.rubric)
+
+    def setUp(self):
+        profiler.reset()
+
+    def test_server_timing(self):
+        resp = self.client.get('/')
+        timing = resp['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", '
+                                 r'tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertNotIn('tpl;dur=0.0,', timing)
+
+    def test_aggregates_by_view_name(self):
+        self.client.get('/')
+        self.client.get('/')
+        self.client.get('/%d/%d/' % (self.rubric.pk, self.bb.pk))
+        report = profiler.report()
+        self.assertEqual(report['main:index']['requests'], 2)
+        self.assertEqual(report['main:detail']['requests'], 1)
+        self.assertGreater(report['main:detail']['queries']['max'], 0)
+        self.assertEqual(sum(report['main:index']['wall_ms']['buckets'].values()), 2)
+
+    def test_endpoint_admin_only(self):
+        self.client.get('/')
+        self.assertEqual(self.client.get('/api/profiling/').status_code, 403)
+        self.client.login(username = 'admin', password = 'Admin1111')
+        resp = self.client.get('/api/profiling/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn('main:index', resp.json())
+        self.assertEqual(self.client.delete('/api/profiling/').status_code, 204)
+        self.assertNotIn('main:index', profiler.report())
+
+    def test_dumps_slow_profiles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(PROFILING_SAMPLE_RATE = 1,
+                                   PROFILING_SLOW_THRESHOLD = 0,
+                                   PROFILING_DUMP_DIR = directory):
+                self.client.get('/')
+            dumps = list(Path(directory).glob('main.index-*.prof'))
+            self.assertEqual(len(dumps), 1)
+
+    def test_disabled(self):
+        with override_settings(PROFILING = False):
+            resp = Client().get('/')
+        self.assertFalse(resp.has_header('Server-Timing'))
+        self.assertEqual(profiler.report(), {})
+
+
+class HistogramTest(TestCase):
+    def test_percentiles(self):
+        histogram = Histogram()
+        for ms in (1, 2, 3, 40, 3000):
+            histogram.add(ms)
+        self.assertEqual(histogram.percentile(0.5), 5)
+        self.assertEqual(histogram.percentile(0.8), 50)
+        self.assertEqual(histogram.as_dict()['max'], 3000)
+        self.assertEqual(histogram.as_dict()['buckets']['le_5000'], 1)
@@ -0,0 +1,87 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from main.counters import counter_buffer
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage, RecentBbs
+
+
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        self.superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = self.superrub)
+        SubRubric.objects.create(name = 'books', super_rubric = self.superrub)
+        self.user = AdvUser.objects.create_user(username = 'Alex', password = 'Test1111')
+        self.add_bbs(5)
+
+    @classmethod
+    def add_bbs(self, count):
+        for bb_num in range(count):
+            bb = Bb.objects.create(title = 'car' + str(bb_num), content = 'red',
+                                   author = self.user, rubric = self.rubric,
+                                   image = 'car.jpg')
+            AdditionalImage.objects.create(bb = bb, image = 'car2.jpg')
+            bb.likes.add(self.user)
+            RecentBbs.objects.create(user = self.user, bb = bb)
+
+    def setUp(self):
+        counter_buffer.reset()
+
+    def count_queries(self, url, method = 'get', data = None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = getattr(self.client, method)(url, data)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx)
+
+    def assert_flat(self, url, budget, method = 'get', data = None):
+        self.count_queries(url, method, data)
+        before = self.count_queries(url, method, data)
+        self.add_bbs(5)
+        self.count_queries(url, method, data)
+        after = self.count_queries(url, method, data)
+        self.assertEqual(before, after,
+                         '%s: query count grows with the number of ads' % url)
+        self.assertLessEqual(after, budget,
+                             '%s: %d queries, budget %d' % (url, after, budget))
+
+    def test_index(self):
+        self.assert_flat(reverse('main:index'), 1)
+
+    def test_index_logged_in(self):
+        self.client.login(username = 'Alex', password = 'Test1111')
+        self.assert_flat(reverse('main:index'), 4)
+
+    def test_search(self):
+        data = {'rubric': self.rubric.pk, 'keyword': 'car'}
+        self.assert_flat(reverse('main:index'), 2, 'post', data)
+
+    def test_by_rubric(self):
+        self.assert_flat(reverse('main:by_rubric', kwargs = {'pk': self.rubric.pk}), 2)
+
+    def test_by_superrubric(self):
+        self.assert_flat(reverse('main:by_superrubric', kwargs = {'pk': self.superrub.pk}), 2)
+
+    def test_detail(self):
+        bb = Bb.objects.first()
+        self.assert_flat(reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk,
+                                                          'pk': bb.pk}), 6)
+
+    def test_profile(self):
+        self.client.login(username = 'Alex', password = 'Test1111')
+        self.assert_flat(reverse('main:profile'), 3)
+
+    def test_profile_liked(self):
+        self.client.login(username = 'Alex', password = 'Test1111')
+        self.assert_flat(reverse('main:profile_liked'), 3)
+
+    def test_foreign_user(self):
+        self.assert_flat(reverse('main:foreign_user', kwargs = {'pk': self.user.pk}), 2)
+
+    def test_api_bbs(self):
+        self.assert_flat('/api/bbs/', 2)
+
+    def test_api_bb_detail(self):
+        self.assert_flat('/api/bbs/%d/' % Bb.objects.first().pk, 1)
@@ -0,0 +1,33 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from main.query_plans import explain, full_scans, temp_sorts
+
+
+class QueryPlansTest(TestCase):
+    def test_full_scan_detection(self):
+        self.assertEqual(full_scans('2 0 0 SCAN main_bb'), ['main_bb'])
+        self.assertEqual(full_scans('2 0 0 SCAN TABLE main_bb'), ['main_bb'])
+        self.assertEqual(full_scans(
+            '2 0 0 SCAN main_bb USING INDEX main_bb_active_created_idx'), [])
+        self.assertEqual(full_scans('3 0 0 SCAN CONSTANT ROW'), [])
+        self.assertEqual(temp_sorts('9 0 0 USE TEMP B-TREE FOR ORDER BY'),
+                         ['ORDER BY'])
+
+    def test_listing_queries_use_indexes(self):
+        self.assertIn('main_bb_active_rubric_idx', explain('by_rubric'))
+        self.assertIn('main_bb_active_created_idx', explain('api_bbs'))
+        self.assertIn('main_comment_active_bb_idx', explain('comments'))
+        self.assertIn('main_recentbbs_user_idx', explain('recent'))
+
+    def test_no_full_scans(self):
+        out = StringIO()
+        call_command('explain_queries', '--strict', stdout = out)
+        self.assertIn('0 with full scans', out.getvalue())
+
+    def test_unknown_query(self):
+        with self.assertRaises(CommandError):
+            call_command('explain_queries', 'missing', stdout = StringIO())
@@ -0,0 +1,58 @@
+from django.test import TestCase, RequestFactory
+
+from main.forms import SearchForm
+from main.middlewares import bboard_context_processor, add_superrubrics
+from main.caching import forget_versions
+from main.models import SubRubric, SuperRubric, SurrogateKey
+from main.rubrics import get_rubric_tree, invalidate_rubric_tree
+
+
+class RubricTreeTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        self.superrub = SuperRubric.objects.create(name = 'sup')
+        SuperRubric.objects.create(name = 'Все')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = self.superrub)
+
+    def setUp(self):
+        invalidate_rubric_tree()
+        self.request = RequestFactory().get('/')
+
+    def test_tree_structure(self):
+        tree = get_rubric_tree()
+        self.assertEqual([r.name for r in tree.subrubrics], ['cars'])
+        self.assertEqual([r.name for r in tree.superrubrics], ['sup'])
+        self.assertEqual(tree.children[self.superrub.pk], [self.rubric])
+
+    def test_context_processors_hit_cache(self):
+        get_rubric_tree()
+        with self.assertNumQueries(0):
+            context = bboard_context_processor(self.request)
+            context.update(add_superrubrics(self.request))
+            self.assertEqual(len(context['rubrics']), 1)
+            self.assertEqual(str(context['rubrics'][0]), 'sup - cars')
+            self.assertEqual(len(context['superrubrics']), 1)
+            self.assertIn('cars', str(SearchForm()['rubric']))
+
+    def test_invalidated_on_change(self):
+        get_rubric_tree()
+        SubRubric.objects.create(name = 'books', super_rubric = self.superrub)
+        self.assertEqual(len(get_rubric_tree().subrubrics), 2)
+        self.superrub.name = 'renamed'
+        self.superrub.save()
+        self.assertEqual(get_rubric_tree().superrubrics[0].name, 'renamed')
+        SubRubric.objects.get(name = 'books').delete()
+        self.assertEqual(len(get_rubric_tree().subrubrics), 1)
+
+    def test_invalidated_by_other_worker(self):
+        get_rubric_tree()
+        SubRubric.objects.filter(pk = self.rubric.pk).update(name = 'trucks')
+        SurrogateKey.objects.update_or_create(key = 'rubrics', defaults = {'version': 'other'})
+        self.assertEqual(get_rubric_tree().subrubrics[0].name, 'cars')
+        forget_versions()
+        self.assertEqual(get_rubric_tree().subrubrics[0].name, 'trucks')
+
+    def test_search_form_validates_against_database(self):
+        form = SearchForm({'rubric': self.rubric.pk, 'keyword': 'car'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['rubric'], self.rubric)
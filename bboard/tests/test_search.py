@@ -0,0 +1,99 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main import search
+from main.caching import forget_versions, purge
+from main.models import SubRubric, SuperRubric, AdvUser, Bb
+
+
+class StemTest(TestCase):
+    def test_russian_word_forms_share_stem(self):
+        self.assertEqual(search.stem('машина'), search.stem('машины'))
+        self.assertEqual(search.stem('книги'), search.stem('книга'))
+
+    def test_latin_words_untouched(self):
+        self.assertEqual(search.stem('car1'), 'car1')
+
+    def test_normalize_casefolds(self):
+        self.assertEqual(search.normalize('Ёлка CAR'), search.normalize('елка car'))
+
+
+class InvertedIndexTest(TestCase):
+    def test_prefix_and_intersection(self):
+        index = search.InvertedIndex()
+        index.add(1, 'red car')
+        index.add(2, 'blue car')
+        index.add(3, 'red book')
+        self.assertEqual(index.search(['ca']), {1, 2})
+        self.assertEqual(index.search(['red', 'car']), {1})
+        index.remove(1)
+        self.assertEqual(index.search(['red']), {3})
+        self.assertEqual(index.search(['missing']), set())
+
+
+class SearchBbsTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.cars = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.books = SubRubric.objects.create(name = 'books', super_rubric = superrub)
+        self.any = SubRubric.objects.create(name = search.ANY_RUBRIC, super_rubric = superrub)
+        user = AdvUser.objects.create_user(username = 'Alex', password = 'Test1111')
+        Bb.objects.create(title = 'Красная машина', content = 'почти новая',
+                          author = user, rubric = self.cars)
+        Bb.objects.create(title = 'Машины', content = 'игрушечные',
+                          author = user, rubric = self.books)
+        Bb.objects.create(title = 'Книга', content = 'про машину',
+                          author = user, rubric = self.books)
+        Bb.objects.create(title = 'Машинка', content = 'снята с продажи',
+                          author = user, rubric = self.cars, is_active = False)
+
+    def setUp(self):
+        search.reset_python_index()
+        forget_versions()
+
+    def assert_search(self):
+        self.assertEqual(len(search.search_bbs('машина')), 3)
+        self.assertEqual(len(search.search_bbs('МАШИНЫ', self.any)), 3)
+        self.assertEqual(len(search.search_bbs('машина', self.cars)), 1)
+        self.assertEqual(len(search.search_bbs('книга машину')), 1)
+        self.assertEqual(len(search.search_bbs('самолёт')), 0)
+        self.assertEqual(len(search.search_bbs('!!!')), 0)
+
+    def test_fts5_backend(self):
+        self.assertTrue(search.fts5_enabled())
+        self.assert_search()
+
+    @override_settings(SEARCH_BACKEND = 'python')
+    def test_python_backend(self):
+        self.assertFalse(search.fts5_enabled())
+        self.assert_search()
+
+    def test_index_follows_changes(self):
+        bb = Bb.objects.get(title = 'Книга')
+        bb.title = 'Самолёт'
+        bb.save()
+        self.assertEqual(len(search.search_bbs('самолет')), 1)
+        bb.delete()
+        self.assertEqual(len(search.search_bbs('самолет')), 0)
+
+    @override_settings(SEARCH_BACKEND = 'python')
+    def test_python_index_follows_changes(self):
+        self.test_index_follows_changes()
+
+    @override_settings(SEARCH_BACKEND = 'python')
+    def test_python_index_follows_other_workers(self):
+        self.assertEqual(len(search.search_bbs('самолет')), 0)
+        Bb.objects.filter(title = 'Книга').update(title = 'Самолёт')
+        purge(search.INDEX_KEY)
+        self.assertEqual(len(search.search_bbs('самолет')), 1)
+
+    def test_rebuild_index(self):
+        self.assertEqual(search.rebuild_index(), 4)
+        self.assertEqual(len(search.search_bbs('машина')), 3)
+
+    def test_index_view_uses_search(self):
+        data = {'rubric': self.any.id, 'keyword': 'машину'}
+        resp = self.client.post(reverse('main:index'), data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['bbs']), 3)
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, SimilarBb, SignatureBand
+from main.similar import signature, similar_bbs, rebuild_rubric
+
+
+@override_settings(SIMILAR_BBS_IN_BACKGROUND = False)
+class SimilarBbsTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            self.create_data()
+
+    @classmethod
+    def create_data(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.other_rubric = SubRubric.objects.create(name = 'books', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+        self.bb = Bb.objects.create(title = 'Красная машина', content = 'Продаю красную машину, пробег небольшой',
+                                    author = self.user, rubric = self.rubric)
+        self.close = Bb.objects.create(title = 'Красные машины', content = 'Продаю красные машины с небольшим пробегом',
+                                       author = self.user, rubric = self.rubric)
+        self.far = Bb.objects.create(title = 'Велосипед', content = 'Горный велосипед',
+                                     author = self.user, rubric = self.rubric)
+        self.foreign = Bb.objects.create(title = 'Красная машина', content = 'Продаю красную машину, пробег небольшой',
+                                         author = self.user, rubric = self.other_rubric)
+
+    def test_signature(self):
+        first = signature('Красная машина', 'Продаю красную машину')
+        self.assertEqual(len(first), 64)
+        self.assertTrue((first == signature('Красные машины', 'Продаю красные машины')).all())
+        self.assertLess((first == signature('Велосипед', 'Горный')).mean(), 0.1)
+
+    def test_refreshed_on_save(self):
+        self.assertEqual(list(similar_bbs(self.bb)), [self.close])
+        self.assertEqual(list(similar_bbs(self.close)), [self.bb])
+        self.assertEqual(list(similar_bbs(self.far)), [])
+
+    def save(self, bb):
+        with self.captureOnCommitCallbacks(execute = True) as callbacks:
+            bb.save()
+        return len(callbacks)
+
+    def test_neighbours_updated(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            bb = Bb.objects.create(title = 'Красная машина', content = 'Продаю красную машину, пробег небольшой',
+                                   author = self.user, rubric = self.rubric)
+        self.assertEqual(list(similar_bbs(self.bb))[0], bb)
+        bb.title = bb.content = 'Горный велосипед'
+        self.save(bb)
+        self.assertEqual(list(similar_bbs(self.bb)), [self.close])
+        self.assertEqual(list(similar_bbs(self.far)), [bb])
+        bb.is_active = False
+        self.save(bb)
+        self.assertEqual(list(similar_bbs(self.far)), [])
+        self.assertFalse(SimilarBb.objects.filter(similar = bb).exists())
+
+    def test_unchanged_text_skipped(self):
+        self.bb.views = 10
+        self.assertEqual(self.save(self.bb), 0)
+        self.bb.price = 100
+        self.bb.title = 'Красная машинка'
+        self.assertEqual(self.save(self.bb), 1)
+
+    def test_bands_stored(self):
+        self.assertEqual(SignatureBand.objects.filter(bb = self.bb).count(), 16)
+        SignatureBand.objects.filter(bb = self.close).delete()
+        self.bb.title = 'Красная машинка'
+        self.save(self.bb)
+        self.assertEqual(list(similar_bbs(self.bb)), [])
+        rebuild_rubric(self.rubric.pk)
+        self.assertEqual(SignatureBand.objects.filter(bb__rubric = self.rubric).count(), 48)
+        self.assertEqual(list(similar_bbs(self.bb)), [self.close])
+
+    def test_rebuild(self):
+        SimilarBb.objects.all().delete()
+        self.assertEqual(rebuild_rubric(self.rubric.pk), 3)
+        self.assertEqual(list(similar_bbs(self.bb)), [self.close])
+        out = StringIO()
+        call_command('rebuild_similar', rubric = [self.rubric.pk], stdout = out)
+        self.assertIn('Rubric %d: 3 ads' % self.rubric.pk, out.getvalue())
+
+    def test_detail(self):
+        url = reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk, 'pk': self.bb.pk})
+        resp = self.client.get(url)
+        self.assertEqual(list(resp.context['bbs']), [self.close])
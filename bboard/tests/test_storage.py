@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from easy_thumbnails.files import get_thumbnailer
+from PIL import Image
+
+from main.images import content_hash
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage
+from main.storage import is_sharded, shard, unique_name
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes(color = 'red'):
+    buffer = BytesIO()
+    Image.new('RGB', (200, 100), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class ShardTest(SimpleTestCase):
+    def test_shard(self):
+        self.assertEqual(shard('abcdef.jpg'), 'ab/cd/abcdef.jpg')
+        self.assertEqual(shard('ab/cd/abcdef.jpg'), 'ab/cd/abcdef.jpg')
+        self.assertEqual(shard('bench/abcdef.jpg'), 'bench/ab/cd/abcdef.jpg')
+        self.assertTrue(is_sharded(shard('1700000000.123.jpg')))
+        self.assertFalse(is_sharded('1700000000.123.jpg'))
+
+    def test_unique_name(self):
+        names = {unique_name('photo.JPG') for i in range(3)}
+        self.assertEqual(len(names), 3)
+        for name in names:
+            self.assertTrue(is_sharded(name))
+            self.assertTrue(name.endswith('.jpg'))
+
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT, THUMBNAIL_WORKERS = 0,
+                   FILE_CLEANUP_IN_BACKGROUND = False, SIMILAR_BBS_IN_BACKGROUND = False,
+                   FILE_CLEANUP_GRACE = 0)
+class ShardedStorageTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors = True)
+        super().tearDownClass()
+
+    def create_bb(self, image = ''):
+        return Bb.objects.create(title = 'car', author = self.user, rubric = self.rubric,
+                                 image = image)
+
+    def test_uploads_sharded(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            bb = self.create_bb(SimpleUploadedFile('car.jpg', image_bytes()))
+        self.assertTrue(is_sharded(bb.image.name))
+        self.assertEqual(bb.image.name.count('/'), 2)
+        thumbnail = get_thumbnailer(bb.image).get_thumbnail({'size': (50, 50)})
+        self.assertTrue(thumbnail.name.startswith('thumbnails/%s' % bb.image.name))
+
+    def test_plain_saves_sharded(self):
+        first = default_storage.save('same.jpg', ContentFile(b'a'))
+        second = default_storage.save('same.jpg', ContentFile(b'b'))
+        self.assertNotEqual(first, second)
+        self.assertTrue(is_sharded(first))
+        self.assertEqual(default_storage.open(first).read(), b'a')
+
+    def test_shard_media_command(self):
+        data, legacy = image_bytes('blue'), image_bytes('green')
+        with open(default_storage.location + '/1700000000.123.jpg', 'wb') as file:
+            file.write(legacy)
+        flat = '%s.jpg' % content_hash(ContentFile(data))
+        with open(default_storage.location + '/' + flat, 'wb') as file:
+            file.write(data)
+        first, second = self.create_bb(), self.create_bb()
+        Bb.objects.filter(pk = first.pk).update(image = '1700000000.123.jpg')
+        Bb.objects.filter(pk = second.pk).update(image = flat)
+        AdditionalImage.objects.create(bb = first, image = flat)
+        out = StringIO()
+        call_command('shard_media', '--dry-run', stdout = out)
+        self.assertIn('Images to move: 2', out.getvalue())
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute = True), \
+             CaptureQueriesContext(connection) as ctx:
+            call_command('shard_media', stdout = out)
+        updates = [query['sql'] for query in ctx.captured_queries
+                   if query['sql'].startswith('UPDATE "main_bb" SET "image"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('Moved 2 images, missing 0, failed 0', out.getvalue())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertTrue(is_sharded(first.image.name))
+        self.assertEqual(first.image.read(), legacy)
+        self.assertEqual(second.image.name, shard(flat))
+        self.assertEqual(AdditionalImage.objects.get().image.name, shard(flat))
+        self.assertFalse(default_storage.exists('1700000000.123.jpg'))
+        self.assertFalse(default_storage.exists(flat))
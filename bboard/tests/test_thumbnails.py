@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
+from PIL import Image
+
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, AdditionalImage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_bytes():
+    buffer = BytesIO()
+    Image.new('RGB', (800, 600), 'red').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT = MEDIA_ROOT, THUMBNAIL_WORKERS = 0,
+                   SIMILAR_BBS_IN_BACKGROUND = False)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser', password = 'Test1111')
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors = True)
+        super().tearDownClass()
+
+    def existing(self, name):
+        thumbnailer = get_thumbnailer(name)
+        return [alias for alias, options in aliases.all('main.Bb.image').items()
+                if thumbnailer.get_existing_thumbnail(dict(options, ALIAS = alias))]
+
+    def test_generated_on_upload(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            bb = Bb.objects.create(title = 'car', author = self.user, rubric = self.rubric,
+                                   image = SimpleUploadedFile('car.jpg', image_bytes()))
+            AdditionalImage.objects.create(bb = bb, image = SimpleUploadedFile('car2.jpg', image_bytes()))
+        self.assertEqual(sorted(self.existing(bb.image.name)), ['default', 'detail', 'recent'])
+        self.assertEqual(len(self.existing(bb.additionalimage_set.get().image.name)), 3)
+
+    def test_not_regenerated_on_edit(self):
+        with self.captureOnCommitCallbacks(execute = True):
+            bb = Bb.objects.create(title = 'car', author = self.user, rubric = self.rubric,
+                                   image = SimpleUploadedFile('car.jpg', image_bytes()))
+        with self.captureOnCommitCallbacks() as callbacks:
+            bb.price = 100
+            bb.save()
+        self.assertEqual(callbacks, [])
+
+    def test_command(self):
+        name = default_storage.save('old.jpg', ContentFile(image_bytes()))
+        Bb.objects.create(title = 'car', author = self.user, rubric = self.rubric, image = name)
+        Bb.objects.create(title = 'lost', author = self.user, rubric = self.rubric, image = 'lost.jpg')
+        self.assertEqual(self.existing(name), [])
+        out = StringIO()
+        call_command('generate_thumbnails', workers = 0, stdout = out)
+        self.assertIn('Images: 1, thumbnails created: 3', out.getvalue())
+        self.assertEqual(len(self.existing(name)), 3)
+        out = StringIO()
+        call_command('generate_thumbnails', workers = 0, stdout = out)
+        self.assertIn('thumbnails created: 0', out.getvalue())
@@ -1,6 +1,8 @@
-from django.test import TestCase
-from main.views import save_recent_bb
-from main.models import SubRubric, SuperRubric, AdvUser, Bb
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from main.deletion import delete_bbs
+from main.recent import save_recent
+from main.models import SubRubric, SuperRubric, AdvUser, Bb, RecentBbs
 
 class SaveRecentTest(TestCase):
     def test_save_recent_bbs(self):
@@ -10,9 +12,78 @@ class SaveRecentTest(TestCase):
         bb2 = Bb.objects.create(title = 'bb2', author = testuser1, rubric = testrubric1)
         bb3 = Bb.objects.create(title = 'bb3', author = testuser1, rubric = testrubric1)
         bb4 = Bb.objects.create(title = 'bb4', author = testuser1, rubric = testrubric1)
-        save_recent_bb(user=testuser1, bb=bb1)
-        save_recent_bb(user=testuser1, bb=bb2)
-        save_recent_bb(user=testuser1, bb=bb3)
-        save_recent_bb(user=testuser1, bb=bb4)
+        save_recent(testuser1, [bb1.pk])
+        save_recent(testuser1, [bb3.pk, bb2.pk, bb1.pk])
+        save_recent(testuser1, [bb4.pk, bb3.pk, bb2.pk])
         self.assertEqual( [ bb.bb for bb in testuser1.recentbbs_set.all() ], [bb4, bb3, bb2] )
+        save_recent(testuser1, [bb2.pk, bb4.pk, bb3.pk])
+        self.assertEqual( [ bb.bb for bb in testuser1.recentbbs_set.all() ], [bb2, bb4, bb3] )
 
+
+class RecentViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser1', password = 'Test1111')
+        self.bbs = [Bb.objects.create(title = 'bb%d' % i, author = self.user, rubric = self.rubric)
+                    for i in range(5)]
+
+    def view(self, bb):
+        resp = self.client.get(reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk,
+                                                                'pk': bb.pk}))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_ring_buffer_in_session(self):
+        self.client.login(username = 'testuser1', password = 'Test1111')
+        for bb in self.bbs:
+            self.view(bb)
+        self.view(self.bbs[2])
+        self.assertEqual(self.client.session['recent_bbs'],
+                         [self.bbs[2].pk, self.bbs[4].pk, self.bbs[3].pk])
+        self.assertFalse(RecentBbs.objects.exists())
+        resp = self.client.get(reverse('main:index'))
+        self.assertEqual(resp.context['recent_bbs'],
+                         [self.bbs[2], self.bbs[4], self.bbs[3]])
+
+    def test_persisted_on_logout_and_restored(self):
+        self.client.login(username = 'testuser1', password = 'Test1111')
+        self.view(self.bbs[0])
+        self.view(self.bbs[1])
+        self.client.get(reverse('main:logout'))
+        self.assertEqual([r.bb for r in self.user.recentbbs_set.all()],
+                         [self.bbs[1], self.bbs[0]])
+        self.client.login(username = 'testuser1', password = 'Test1111')
+        resp = self.client.get(reverse('main:index'))
+        self.assertEqual(resp.context['recent_bbs'], [self.bbs[1], self.bbs[0]])
+
+    @override_settings(RECENT_BBS_PERSIST_INTERVAL = 0)
+    def test_periodic_persistence(self):
+        self.client.login(username = 'testuser1', password = 'Test1111')
+        self.view(self.bbs[0])
+        self.assertEqual([r.bb for r in self.user.recentbbs_set.all()], [self.bbs[0]])
+
+    def test_anonymous_not_tracked(self):
+        self.view(self.bbs[0])
+        self.assertNotIn('recent_bbs', self.client.session)
+
+
+@override_settings(SIMILAR_BBS_IN_BACKGROUND = False, FILE_CLEANUP_IN_BACKGROUND = False)
+class DeletedRecentTest(TransactionTestCase):
+    def setUp(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        self.user = AdvUser.objects.create_user(username = 'testuser1', password = 'Test1111')
+        self.bbs = [Bb.objects.create(title = 'bb%d' % i, author = self.user, rubric = self.rubric)
+                    for i in range(2)]
+
+    def test_deleted_bb_dropped_on_logout(self):
+        self.client.login(username = 'testuser1', password = 'Test1111')
+        for bb in self.bbs:
+            resp = self.client.get(reverse('main:detail', kwargs = {'rubric_pk': self.rubric.pk,
+                                                                    'pk': bb.pk}))
+            self.assertEqual(resp.status_code, 200)
+        delete_bbs([self.bbs[1].pk])
+        resp = self.client.get(reverse('main:logout'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r.bb for r in self.user.recentbbs_set.all()], [self.bbs[0]])
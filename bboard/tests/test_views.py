@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from io import StringIO
 import pathlib
 from pathlib import Path 
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -6,7 +8,10 @@ from main.models import SubRubric, SuperRubric, AdvUser, Bb
 from main.forms import SearchForm
 from django.urls import reverse
 from main.utilities import get_timestamp_path
+from main.counters import counter_buffer
+from main.pagination import KeysetPage
 
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
 class IndexViewTest(TestCase):
 
     @classmethod
@@ -313,6 +318,7 @@ class DeleteUserViewTest(TestCase):
         self.assertEqual(resp.status_code, 200)
 
 
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
 class ByRubricViewTest(TestCase):
     @classmethod
     def setUpTestData(self):
@@ -390,6 +396,7 @@ class ByRubricViewTest(TestCase):
         self.assertEqual(len(resp.context['bbs']), 1)
 
 
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
 class DetailViewTest(TestCase):
     @classmethod
     def setUpTestData(self):
@@ -435,13 +442,17 @@ class DetailViewTest(TestCase):
         self.assertTrue(bb not in resp.context['bbs'])
 
     def test_views_counter(self):
+        counter_buffer.reset()
         bb = Bb.objects.get(title = 'car')
         self.assertEqual(bb.views, 0)
         resp = self.client.get(reverse('main:detail', kwargs = {'rubric_pk': bb.rubric.id, 'pk': bb.id}))
         self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['bb'].views, 1)
+        call_command('flush_counters', stdout = StringIO())
         self.assertEqual(Bb.objects.get(id=bb.id).views, 1)
 
 
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
 class ProfileBbDetailTest(TestCase):
     @classmethod
     def setUpTestData(self):
@@ -681,6 +692,7 @@ class ForeignUserTest(TestCase):
                 tmp = bb
     
 
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
 class BySuperRubricTest(TestCase):
     @classmethod
     def setUpTestData(self):
@@ -731,3 +743,65 @@ class BySuperRubricTest(TestCase):
         for bb in bbs:
             self.assertTrue(bb.rubric in (self.testrubric1,
                                                       self.testrubric2) )
+
+
+@override_settings(PAGE_CACHE_TIMEOUT = 0)
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(self):
+        superrub = SuperRubric.objects.create(name = 'sup')
+        self.rubric = SubRubric.objects.create(name = 'cars', super_rubric = superrub)
+        testuser = AdvUser.objects.create_user(username = 'Alex', password = 'Test1111')
+        for bb_num in range(7):
+            Bb.objects.create(title = 'car' + str(bb_num), author = testuser,
+                              rubric = self.rubric)
+
+    def collect_pages(self, url, params = None):
+        seen = []
+        params = dict(params or {})
+        while True:
+            resp = self.client.get(url, params)
+            self.assertEqual(resp.status_code, 200)
+            seen += list(resp.context['bbs'])
+            page = resp.context['page']
+            if not page.has_next:
+                return seen
+            params['after'] = page.next_cursor
+
+    @override_settings(BBS_PAGE_SIZE = 3)
+    def test_index_pages_cover_all_bbs(self):
+        seen = self.collect_pages(reverse('main:index'))
+        self.assertEqual([bb.pk for bb in seen],
+                         list(Bb.objects.order_by('-created_at', '-pk')
+                              .values_list('pk', flat = True)))
+
+    @override_settings(BBS_PAGE_SIZE = 3)
+    def test_by_rubric_pages(self):
+        seen = self.collect_pages(reverse('main:by_rubric', kwargs = {'pk': self.rubric.pk}))
+        self.assertEqual(len(seen), 7)
+
+    @override_settings(BBS_PAGE_SIZE = 3)
+    def test_search_load_more(self):
+        seen = self.collect_pages(reverse('main:index'),
+                                  {'keyword': 'car', 'rubric': self.rubric.pk})
+        self.assertEqual(len(seen), 7)
+
+    @override_settings(BBS_PAGE_SIZE = 7)
+    def test_exact_page_has_no_next(self):
+        resp = self.client.get(reverse('main:index'))
+        self.assertFalse(resp.context['page'].has_next)
+
+    def test_next_page_check_shares_page_query(self):
+        page = KeysetPage(Bb.objects.all(), page_size = 3)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(list(page)), 3)
+            self.assertTrue(page.has_next)
+        page = KeysetPage(Bb.objects.all(), page.next_cursor, page_size = 4)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(page), 4)
+            self.assertFalse(page.has_next)
+
+    def test_bad_cursor_starts_over(self):
+        resp = self.client.get(reverse('main:index'), {'after': '!!!'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context['page'].is_first)
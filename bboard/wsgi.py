@@ -27,3 +27,7 @@ os.environ.setdefault(
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
 application = get_wsgi_application()
+
+from main.counters import counter_buffer
+
+counter_buffer.start()
@@ -1,14 +1,49 @@
 from django.contrib import admin
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.text import Truncator
 from .models import AdvUser, SuperRubric, SubRubric, Bb, AdditionalImage, Comment
 import datetime
-from .utilities import send_activation_notification
+from .mailqueue import ACTIVATION, enqueue
 from .forms import SubRubricForm
+from .deletion import delete_bbs, delete_users
+from .comments import comment_snapshot, moderate_comments
+from .pagination import EstimatedCountPaginator
+from .search import matching_ids
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    exact_search = ()
+    numeric_search = ()
+
+    def search_q(self, term):
+        q = Q()
+        for lookup in self.exact_search:
+            q |= Q(**{lookup: term})
+        if term.isdigit():
+            for lookup in self.numeric_search:
+                q |= Q(**{lookup: int(term)})
+        return q
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        q = self.search_q(term)
+        return (queryset.filter(q) if q else queryset.none()), False
+
+
+def short_content(obj):
+    return Truncator(obj.content).chars(60)
+short_content.short_description = 'Содержание'
 
 
 def send_activation_notifications(modeladmin, request, queryset):
-    for rec in queryset:
-        send_activation_notification(rec)
-    modeladmin.message_user(requset, 'Письма с требованиями отправлены')
+    enqueue(ACTIVATION, queryset.values_list('pk', flat=True))
+    modeladmin.message_user(request, 'Письма с требованиями поставлены в очередь')
 send_activation_notifications.short_description = \
     'Отправка писем с требованиями активации'
 
@@ -37,9 +72,10 @@ class NotificatedFilter(admin.SimpleListFilter):
                                    date_joined__date__lt=d)
 
 
-class AdvUserAdmin(admin.ModelAdmin):
+class AdvUserAdmin(LargeTableAdmin):
     list_display = ('__str__', 'is_activated', 'date_joined')
-    search_fields = ('username', 'email', 'first_name', 'last_name')
+    search_fields = exact_search = ('username', 'email')
+    numeric_search = ('pk',)
     list_filter = (NotificatedFilter,)
     fields = (('username', 'email'), ('first_name', 'last_name'),
               ('send_messages', 'is_active', 'is_activated'),
@@ -49,6 +85,12 @@ class AdvUserAdmin(admin.ModelAdmin):
     readonly_fields = ('last_login', 'date_joined')
     actions = (send_activation_notifications,)
 
+    def delete_model(self, request, obj):
+        delete_users([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_users(queryset.values_list('pk', flat=True))
+
 
 class SubRubricInline(admin.TabularInline):
     model = SubRubric
@@ -60,6 +102,7 @@ class SuperRubricAdmin(admin.ModelAdmin):
 
 class SubRubricAdmin(admin.ModelAdmin):
     form = SubRubricForm
+    search_fields = ('name',)
 
 
 class AdditionalImageInline(admin.TabularInline):
@@ -67,20 +110,60 @@ class AdditionalImageInline(admin.TabularInline):
     extra = 0
 
 
-class CommentsInline(admin.TabularInline):
-    model = Comment
-    extra = 0
-
-class BbAdmin(admin.ModelAdmin):
-    list_display = ('rubric', 'title', 'content', 'author', 'created_at')
+class BbAdmin(LargeTableAdmin):
+    list_display = ('rubric', 'title', short_content, 'author', 'created_at')
+    list_select_related = ('rubric__super_rubric', 'author')
+    list_filter = ('is_active',)
+    date_hierarchy = 'created_at'
+    search_fields = exact_search = ('author__username',)
+    numeric_search = ('pk',)
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('rubric',)
     fields = (('rubric', 'author'), 'title', 'content', 'price',
-              'contacts', 'image', 'is_active', 'phone_number')
-    inlines = (AdditionalImageInline, CommentsInline)
-
-
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('bb', 'content', 'author', 'created_at', 'is_active')
+              'contacts', 'image', 'is_active', 'phone_number', 'comments')
+    readonly_fields = ('comments',)
+    inlines = (AdditionalImageInline,)
+
+    def comments(self, obj):
+        if obj.pk is None:
+            return '-'
+        url = '%s?bb__id__exact=%d' % (
+            reverse('admin:main_comment_changelist'), obj.pk)
+        return format_html('<a href="{}">{}</a>', url,
+                           comment_snapshot(obj.pk)['count'])
+    comments.short_description = 'Комментарии'
+
+    def search_q(self, term):
+        q = super().search_q(term)
+        ids = matching_ids(term)
+        return q | Q(pk__in=ids) if ids is not None else q
+
+    def delete_model(self, request, obj):
+        delete_bbs([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_bbs(queryset.values_list('pk', flat=True))
+
+
+def show_comments(modeladmin, request, queryset):
+    updated = moderate_comments(queryset, True)
+    modeladmin.message_user(request, 'Показано комментариев: %d' % updated)
+show_comments.short_description = 'Показать выбранные комментарии'
+
+def hide_comments(modeladmin, request, queryset):
+    updated = moderate_comments(queryset, False)
+    modeladmin.message_user(request, 'Скрыто комментариев: %d' % updated)
+hide_comments.short_description = 'Скрыть выбранные комментарии'
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('bb', short_content, 'author', 'created_at', 'is_active')
+    list_select_related = ('bb__rubric',)
     fields = ('bb', 'content', 'author', 'is_active')
+    list_filter = ('is_active',)
+    date_hierarchy = 'created_at'
+    search_fields = numeric_search = ('pk', 'bb')
+    raw_id_fields = ('bb',)
+    actions = (show_comments, hide_comments)
 
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Bb, BbAdmin)
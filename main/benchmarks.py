@@ -0,0 +1,203 @@
+import math
+import random
+import time
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client
+from PIL import Image
+
+from .models import AdvUser, SuperRubric, SubRubric, Bb, Comment
+from .profiling import RequestStats
+from .search import index_bbs
+from .similar import rebuild_rubric
+
+WORDS = ('машина', 'велосипед', 'диван', 'телефон', 'ноутбук', 'квартира',
+         'куртка', 'холодильник', 'стол', 'гитара', 'камера', 'коляска',
+         'шкаф', 'кресло', 'самокат', 'часы', 'книга', 'лодка', 'палатка',
+         'монитор', 'красный', 'новый', 'старый', 'быстрый', 'большой',
+         'удобный', 'срочно', 'недорого', 'отличный', 'торг')
+PASSWORD = 'Bench1111'
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for i in range(words))
+
+
+def _image(rng, number):
+    buffer = BytesIO()
+    color = tuple(rng.randrange(256) for i in range(3))
+    Image.new('RGB', (640, 480), color).save(buffer, 'JPEG')
+    return default_storage.save('bench/%d.jpg' % number,
+                                ContentFile(buffer.getvalue()))
+
+
+def seed(ads=100000, users=10000, super_rubrics=5, sub_rubrics=8, likes=3,
+         comments=2, images=20, batch_size=5000, seed=0, log=None):
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    rubric_ids = []
+    for i in range(super_rubrics):
+        parent = SuperRubric.objects.create(name='Раздел %d' % i, order=i)
+        for j in range(sub_rubrics):
+            rubric_ids.append(SubRubric.objects.create(
+                name='Рубрика %d.%d' % (i, j), order=j,
+                super_rubric=parent).pk)
+    log('Created %d rubrics' % len(rubric_ids))
+
+    password = make_password(PASSWORD)
+    first_user = _next_pk(AdvUser)
+    user_ids = list(range(first_user, first_user + users))
+    AdvUser.objects.bulk_create(
+        (AdvUser(pk=pk, username='bench%d' % pk, password=password,
+                 email='bench%d@example.com' % pk) for pk in user_ids),
+        batch_size=batch_size)
+    log('Created %d users' % users)
+
+    image_names = [_image(rng, i) for i in range(images)]
+    first_bb = _next_pk(Bb)
+    counts = {'ads': 0, 'likes': 0, 'comments': 0}
+    for start in range(first_bb, first_bb + ads, batch_size):
+        bbs, bb_likes, bb_comments = [], [], []
+        for pk in range(start, min(start + batch_size, first_bb + ads)):
+            likers = rng.sample(user_ids,
+                                min(users, rng.randint(0, 2 * likes)))
+            bb_likes += [Bb.likes.through(bb_id=pk, advuser_id=user)
+                         for user in likers]
+            bb_comments += [Comment(bb_id=pk, author='bench',
+                                    content=_text(rng, 8))
+                            for i in range(rng.randint(0, 2 * comments))]
+            image = ''
+            if image_names and rng.random() < 0.5:
+                image = rng.choice(image_names)
+            bbs.append(Bb(pk=pk, rubric_id=rng.choice(rubric_ids),
+                          author_id=rng.choice(user_ids),
+                          title=_text(rng, 3)[:40], content=_text(rng, 30),
+                          price=rng.randrange(100, 100000),
+                          contacts='+7 999 123-45-67',
+                          image=image,
+                          is_active=rng.random() < 0.95,
+                          likes_count=len(likers)))
+        with transaction.atomic():
+            Bb.objects.bulk_create(bbs)
+            Bb.likes.through.objects.bulk_create(bb_likes)
+            Comment.objects.bulk_create(bb_comments)
+            index_bbs(bbs)
+        counts['ads'] += len(bbs)
+        counts['likes'] += len(bb_likes)
+        counts['comments'] += len(bb_comments)
+        log('Created %d ads' % counts['ads'])
+    counts['signatures'] = sum(rebuild_rubric(rubric_id, batch_size)
+                               for rubric_id in rubric_ids)
+    log('Computed similar ads for %d signatures' % counts['signatures'])
+    return dict(counts, users=users, rubrics=len(rubric_ids),
+                images=len(image_names))
+
+
+def percentile(timings, fraction):
+    return timings[max(0, math.ceil(fraction * len(timings)) - 1)]
+
+
+class Sample:
+    def __init__(self, rng):
+        rows = list(Bb.objects.filter(is_active=True).order_by('pk')
+                              .values_list('pk', 'rubric_id'))
+        self.rng = rng
+        self.bbs = rng.sample(rows, min(len(rows), 1000))
+        self.rubrics = sorted({rubric for pk, rubric in rows})
+
+    def bb(self):
+        return self.rng.choice(self.bbs)
+
+    def rubric(self):
+        return self.rng.choice(self.rubrics)
+
+    def word(self):
+        return self.rng.choice(WORDS)
+
+
+def _like(client, sample):
+    return client.post('/like_bb/', {'action': 'post',
+                                     'bb_id': sample.bb()[0]})
+
+
+SCENARIOS = {
+    'index': lambda client, sample: client.get('/'),
+    'by_rubric': lambda client, sample: client.get(
+        '/%d/' % sample.rubric()),
+    'by_rubric_search': lambda client, sample: client.get(
+        '/%d/' % sample.rubric(), {'keyword': sample.word()}),
+    'detail': lambda client, sample: client.get(
+        '/%d/%d/' % sample.bb()[::-1]),
+    'like': _like,
+    'api_bbs': lambda client, sample: client.get('/api/bbs/'),
+    'api_bbs_by_rubric': lambda client, sample: client.get(
+        '/api/bbs/', {'rubric': sample.rubric()}),
+    'api_detail': lambda client, sample: client.get(
+        '/api/bbs/%d/' % sample.bb()[0]),
+    'api_comments': lambda client, sample: client.get(
+        '/api/bbs/%d/comments/' % sample.bb()[0]),
+}
+AUTHENTICATED = {'like'}
+
+
+def run_scenario(name, client, sample, requests=200, warmup=10):
+    request = SCENARIOS[name]
+    for i in range(warmup):
+        request(client, sample)
+    timings, errors, queries = [], 0, 0
+    started = time.perf_counter()
+    for i in range(requests):
+        stats = RequestStats()
+        with connection.execute_wrapper(stats):
+            start = time.perf_counter()
+            response = request(client, sample)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries += stats.queries
+        if response.status_code >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {'requests': requests, 'errors': errors,
+            'throughput_rps': round(requests / elapsed, 2),
+            'mean_ms': round(sum(timings) / requests, 3),
+            'p50_ms': round(percentile(timings, 0.5), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries_per_request': round(queries / requests, 2)}
+
+
+def run_benchmarks(names=None, requests=200, warmup=10, seed=0, log=None):
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+    sample = Sample(rng)
+    anonymous = Client()
+    user = Client()
+    user.force_login(AdvUser.objects.filter(username__startswith='bench')
+                                    .order_by('pk').first())
+    results = {}
+    for name in names or SCENARIOS:
+        client = user if name in AUTHENTICATED else anonymous
+        results[name] = run_scenario(name, client, sample, requests, warmup)
+        log('%-20s %8.1f req/s  p50 %7.2f ms  p95 %7.2f ms  p99 %7.2f ms' % (
+            name, results[name]['throughput_rps'], results[name]['p50_ms'],
+            results[name]['p95_ms'], results[name]['p99_ms']))
+    return results
+
+
+def compare(results, baseline):
+    changes = {}
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and previous['p95_ms']:
+            changes[name] = (current['p95_ms'] - previous['p95_ms']) / \
+                            previous['p95_ms'] * 100
+    return changes
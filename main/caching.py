@@ -0,0 +1,135 @@
+import hashlib
+import re
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, quote_etag
+
+from .models import SurrogateKey
+
+PAGE_PREFIX = 'page:'
+VALIDATORS = ('ETag', 'Last-Modified')
+CSRF_INPUT_RE = re.compile(
+    r'(<input type="hidden" name="csrfmiddlewaretoken" value=")[^"]*(")')
+MAX_LOCAL_VERSIONS = 10000
+
+_local_versions = {}
+_local_lock = threading.Lock()
+
+
+def _remember(versions):
+    expires = time.monotonic() + \
+              getattr(settings, 'SURROGATE_VERSION_TIMEOUT', 1)
+    with _local_lock:
+        if len(_local_versions) > MAX_LOCAL_VERSIONS:
+            _local_versions.clear()
+        _local_versions.update((key, (version, expires))
+                               for key, version in versions.items())
+
+
+def forget_versions(keys=None):
+    with _local_lock:
+        if keys is None:
+            _local_versions.clear()
+        for key in keys or ():
+            _local_versions.pop(key, None)
+
+
+def _versions(keys, fresh=False):
+    now = time.monotonic()
+    with _local_lock:
+        versions = {} if fresh else \
+                   {key: _local_versions[key][0] for key in keys
+                    if key in _local_versions and
+                    _local_versions[key][1] > now}
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        stored = dict(SurrogateKey.objects.filter(key__in=missing)
+                                          .values_list('key', 'version'))
+        fetched = {key: stored.get(key, '') for key in missing}
+        _remember(fetched)
+        versions.update(fetched)
+    return [versions[key] for key in keys]
+
+
+def current_version(key, fresh=True):
+    return _versions([key], fresh)[0]
+
+
+def purge(*keys):
+    keys = set(keys)
+    if not keys:
+        return
+    version = uuid.uuid4().hex
+    updated = SurrogateKey.objects.filter(key__in=keys).update(version=version)
+    if updated < len(keys):
+        SurrogateKey.objects.bulk_create(
+            [SurrogateKey(key=key, version=version) for key in keys],
+            ignore_conflicts=True)
+    forget_versions(keys)
+
+
+def purge_bb(bb):
+    purge('bbs', 'bb:%d' % bb.pk, 'rubric:%d' % bb.rubric_id)
+
+
+def page_version(request, keys, fresh=False):
+    raw = '%s|%s' % (request.get_full_path(),
+                     '|'.join(_versions(keys, fresh)))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def cacheable(request):
+    return request.method in ('GET', 'HEAD') and \
+           not request.user.is_authenticated and \
+           not len(get_messages(request))
+
+
+def _with_fresh_token(request, content):
+    token = get_token(request)
+    return CSRF_INPUT_RE.sub(lambda match: match.group(1) + token +
+                             match.group(2), content)
+
+
+def anonymous_cache(surrogate_keys, on_hit=None):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 5)
+            if not timeout or not cacheable(request):
+                return view(request, *args, **kwargs)
+            version = page_version(request, surrogate_keys(*args, **kwargs))
+            key = PAGE_PREFIX + version
+            cached = cache.get(key)
+            if cached is not None:
+                if on_hit is not None:
+                    on_hit(request, *args, **kwargs)
+                content, content_type, validators = cached
+                content = _with_fresh_token(request, content.decode())
+                response = HttpResponse(content, content_type=content_type)
+                for header, value in validators.items():
+                    response[header] = value
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                if not response.has_header('ETag'):
+                    response['ETag'] = quote_etag(version)
+                validators = {header: response[header] for header in VALIDATORS
+                              if response.has_header(header)}
+                cache.set(key, (response.content, response['Content-Type'],
+                                validators), timeout)
+            last_modified = parse_http_date_safe(response.get('Last-Modified'))
+            return get_conditional_response(request, etag=response['ETag'],
+                                            last_modified=last_modified,
+                                            response=response)
+        return wrapper
+    return decorator
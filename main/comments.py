@@ -0,0 +1,53 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import current_version, purge
+from .models import Comment
+
+SNAPSHOT_PREFIX = 'comments:'
+COMMENT_FIELDS = ('id', 'bb', 'author', 'content', 'created_at')
+
+
+def page_size():
+    return getattr(settings, 'COMMENTS_PAGE_SIZE', 20)
+
+
+def active_comments(bb_pk):
+    return Comment.objects.filter(is_active=True, bb=bb_pk) \
+                          .only(*COMMENT_FIELDS) \
+                          .order_by('-created_at', '-pk')
+
+
+def comments_key(bb_pk):
+    return 'comments:%d' % int(bb_pk)
+
+
+def comment_snapshot(bb_pk):
+    key = '%s%s:%s' % (SNAPSHOT_PREFIX, bb_pk,
+                       current_version(comments_key(bb_pk), fresh=False))
+    snapshot = cache.get(key)
+    if snapshot is None:
+        comments = active_comments(bb_pk)
+        snapshot = {'version': uuid.uuid4().hex, 'count': comments.count(),
+                    'latest': list(comments[:page_size()])}
+        snapshot['newest'] = snapshot['latest'][0].created_at \
+                             if snapshot['latest'] else None
+        cache.set(key, snapshot,
+                  getattr(settings, 'COMMENTS_CACHE_TIMEOUT', 60 * 60))
+    return snapshot
+
+
+def invalidate_comments(*bb_pks):
+    purge(*(comments_key(pk) for pk in bb_pks))
+
+
+def moderate_comments(queryset, is_active):
+    bb_pks = list(queryset.values_list('bb_id', flat=True).distinct())
+    updated = Comment.objects.filter(pk__in=queryset.values('pk')) \
+                             .exclude(is_active=is_active) \
+                             .update(is_active=is_active)
+    transaction.on_commit(lambda: invalidate_comments(*bb_pks))
+    return updated
@@ -0,0 +1,28 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .live import group_name
+from .models import Bb
+
+
+class BbConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        self.bb_pk = self.scope['url_route']['kwargs']['pk']
+        if not await self.bb_exists():
+            await self.close()
+            return
+        self.group = group_name(self.bb_pk)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, 'group'):
+            await self.channel_layer.group_discard(self.group,
+                                                   self.channel_name)
+
+    async def bb_update(self, event):
+        await self.send_json(event['data'])
+
+    @database_sync_to_async
+    def bb_exists(self):
+        return Bb.objects.filter(pk=self.bb_pk, is_active=True).exists()
@@ -0,0 +1,142 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+from .caching import current_version, purge
+from .models import Bb, PageHit
+
+FLUSH_REQUEST_KEY = 'counters:flush_request'
+
+counters_flushed = Signal()
+
+logger = logging.getLogger(__name__)
+
+
+def _by_increment(counter):
+    groups = defaultdict(list)
+    for key, n in counter.items():
+        groups[n].append(key)
+    return groups.items()
+
+
+class CounterBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.views = Counter()
+        self.size = 0
+        self.last_flush = time.monotonic()
+        self.flush_request = None
+        self.thread = None
+
+    def record_hit(self, url):
+        with self.lock:
+            self.hits[url] += 1
+            self.size += 1
+            pending = self.hits[url]
+        self.maybe_flush()
+        return pending
+
+    def record_view(self, pk):
+        with self.lock:
+            self.views[pk] += 1
+            self.size += 1
+            pending = self.views[pk]
+        self.maybe_flush()
+        return pending
+
+    def reset(self):
+        with self.lock:
+            self.hits.clear()
+            self.views.clear()
+            self.size = 0
+            self.last_flush = time.monotonic()
+
+    def pending_hits(self, url):
+        with self.lock:
+            return self.hits.get(url, 0)
+
+    def pending_views(self, pk):
+        with self.lock:
+            return self.views.get(pk, 0)
+
+    def _due(self):
+        interval = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 10)
+        return time.monotonic() - self.last_flush >= interval
+
+    def maybe_flush(self):
+        threshold = getattr(settings, 'COUNTER_FLUSH_THRESHOLD', 100)
+        if self.size >= threshold or self._due():
+            self.flush()
+
+    def _flush_requested(self):
+        flush_request = current_version(FLUSH_REQUEST_KEY)
+        if flush_request == self.flush_request:
+            return False
+        requested = self.flush_request is not None
+        self.flush_request = flush_request
+        return requested
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True,
+                                           name='counters')
+        self.thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(1)
+            try:
+                if self._flush_requested() or (self.size and self._due()):
+                    self.flush()
+            except Exception:
+                logger.exception('Periodic counter flush failed')
+            finally:
+                connections.close_all()
+
+    def flush(self):
+        with self.lock:
+            hits, self.hits = self.hits, Counter()
+            views, self.views = self.views, Counter()
+            self.size = 0
+            self.last_flush = time.monotonic()
+        if not hits and not views:
+            return 0
+        try:
+            with transaction.atomic():
+                if hits:
+                    PageHit.objects.bulk_create(
+                        [PageHit(url=url) for url in hits],
+                        ignore_conflicts=True)
+                for n, urls in _by_increment(hits):
+                    PageHit.objects.filter(url__in=urls) \
+                                   .update(count=F('count') + n)
+                for n, pks in _by_increment(views):
+                    Bb.objects.filter(pk__in=pks).update(views=F('views') + n)
+        except DatabaseError:
+            logger.exception('Could not flush view counters')
+            with self.lock:
+                self.hits.update(hits)
+                self.views.update(views)
+                self.size += sum(hits.values()) + sum(views.values())
+            return 0
+        if views:
+            counters_flushed.send(sender=CounterBuffer, views=views)
+        return sum(hits.values()) + sum(views.values())
+
+
+def request_flush():
+    purge(FLUSH_REQUEST_KEY)
+
+
+counter_buffer = CounterBuffer()
@@ -0,0 +1,83 @@
+import os
+
+from django.conf import settings
+
+REPORTED_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size',
+                    'busy_timeout', 'temp_store', 'foreign_keys', 'page_size',
+                    'page_count', 'freelist_count', 'wal_autocheckpoint')
+
+
+def production_profile():
+    return getattr(settings, 'SQLITE_PRODUCTION_PROFILE', False)
+
+
+def configured_pragmas():
+    return getattr(settings, 'SQLITE_PRAGMAS', {}) if production_profile() \
+           else {}
+
+
+def apply_sqlite_pragmas(connection):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = configured_pragmas()
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+def sqlite_pragmas(connection):
+    values = {}
+    with connection.cursor() as cursor:
+        for name in REPORTED_PRAGMAS:
+            cursor.execute('PRAGMA %s' % name)
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
+
+
+def wal_size(connection):
+    path = '%s-wal' % connection.settings_dict['NAME']
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def checkpoint(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return cursor.fetchone()
+
+
+def estimated_rows(connection, table):
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                       "AND name = 'sqlite_stat1'")
+        if cursor.fetchone() is not None:
+            cursor.execute('SELECT MAX(CAST(stat AS INTEGER)) '
+                           'FROM sqlite_stat1 WHERE tbl = %s', [table])
+            row = cursor.fetchone()
+            if row[0] is not None:
+                return row[0]
+        cursor.execute('SELECT MAX(rowid) FROM %s' %
+                       connection.ops.quote_name(table))
+        return cursor.fetchone()[0] or 0
+
+
+
+def reserve_ids(connection, table, count):
+    # Claims ids from the AUTOINCREMENT sequence of the current transaction.
+    # The first statement is a write, so concurrent inserts wait for the lock
+    # instead of racing for the same ids, and ids of deleted rows stay used.
+    quoted = connection.ops.quote_name(table)
+    with connection.cursor() as cursor:
+        cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, '
+                       '(SELECT COALESCE(MAX(rowid), 0) FROM %s)) + %%s '
+                       'WHERE name = %%s' % quoted, [count, table])
+        if not cursor.rowcount:
+            cursor.execute('INSERT INTO sqlite_sequence (name, seq) '
+                           'SELECT %%s, COALESCE(MAX(rowid), 0) + %%s '
+                           'FROM %s' % quoted, [table, count])
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s',
+                       [table])
+        last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
@@ -0,0 +1,199 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from easy_thumbnails.files import get_thumbnailer
+
+from .caching import purge
+from .likes import Like, actual_likes
+from .models import AdvUser, Bb, AdditionalImage, Comment, RecentBbs, \
+                    BbSignature, SignatureBand, SimilarBb, DeletedFile
+from .search import unindex_bbs
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_timer = None
+_timer_lock = threading.Lock()
+
+
+def _chunks(pks, size):
+    pks = sorted(pks)
+    for start in range(0, len(pks), size):
+        yield pks[start:start + size]
+
+
+# QuerySet._raw_delete() is private API, checked against Django 3.2: it
+# runs a single DELETE without collecting related rows or sending signals.
+# Revisit it when upgrading Django.
+def _raw_delete(queryset, deleted):
+    count = queryset._raw_delete(queryset.db)
+    deleted[queryset.model._meta.label] += count
+    return count
+
+
+def bb_related(pks):
+    return (AdditionalImage.objects.filter(bb__in=pks),
+            Comment.objects.filter(bb__in=pks),
+            Like.objects.filter(bb__in=pks),
+            RecentBbs.objects.filter(bb__in=pks),
+            SignatureBand.objects.filter(bb__in=pks),
+            BbSignature.objects.filter(bb__in=pks),
+            SimilarBb.objects.filter(Q(bb__in=pks) | Q(similar__in=pks)))
+
+
+def _delete_bb_chunk(pks, deleted):
+    with transaction.atomic():
+        rows = list(Bb.objects.filter(pk__in=pks)
+                              .values_list('pk', 'rubric_id', 'image'))
+        files = [image for pk, rubric_id, image in rows if image]
+        files += AdditionalImage.objects.filter(bb__in=pks).exclude(image='') \
+                                        .values_list('image', flat=True)
+        for queryset in bb_related(pks):
+            _raw_delete(queryset, deleted)
+        unindex_bbs(pks)
+        count = _raw_delete(Bb.objects.filter(pk__in=pks), deleted)
+        queue_files(files)
+    purge('bbs', *{'rubric:%d' % rubric_id for pk, rubric_id, image in rows},
+          *('bb:%d' % pk for pk, rubric_id, image in rows))
+    return count
+
+
+def _delete_bbs(pks, chunk_size, deleted):
+    return sum(_delete_bb_chunk(chunk, deleted)
+               for chunk in _chunks(pks, chunk_size))
+
+
+def delete_bbs(pks, chunk_size=500):
+    return _delete_bbs(pks, chunk_size, Counter())
+
+
+def delete_users(pks, chunk_size=500):
+    pks = list(pks)
+    deleted = Counter()
+    _delete_bbs(Bb.objects.filter(author__in=pks).values_list('pk', flat=True),
+                chunk_size, deleted)
+    with transaction.atomic():
+        liked = list(Like.objects.filter(advuser__in=pks)
+                                 .values_list('bb_id', flat=True).distinct())
+        _raw_delete(Like.objects.filter(advuser__in=pks), deleted)
+        _raw_delete(RecentBbs.objects.filter(user__in=pks), deleted)
+        for chunk in _chunks(liked, chunk_size):
+            Bb.objects.filter(pk__in=chunk).update(likes_count=actual_likes())
+        deleted.update(AdvUser.objects.filter(pk__in=pks).delete()[1])
+    if liked:
+        purge(*('bb:%d' % pk for pk in liked))
+    deleted = {label: count for label, count in deleted.items() if count}
+    return sum(deleted.values()), deleted
+
+
+def queue_files(names):
+    names = set(names)
+    if not names:
+        return
+    DeletedFile.objects.bulk_create(DeletedFile(name=name) for name in names)
+    transaction.on_commit(enqueue_cleanup)
+
+
+def _referenced(names):
+    return set(Bb.objects.filter(image__in=names)
+                         .values_list('image', flat=True)) | \
+           set(AdditionalImage.objects.filter(image__in=names)
+                                      .values_list('image', flat=True))
+
+
+def delete_thumbnails(name):
+    thumbnailer = get_thumbnailer(name)
+    source = thumbnailer.get_source_cache()
+    if source is not None:
+        for thumbnail in source.thumbnails.all():
+            thumbnailer.thumbnail_storage.delete(thumbnail.name)
+        source.delete()
+
+
+def _grace():
+    return getattr(settings, 'FILE_CLEANUP_GRACE', 60 * 10)
+
+
+def next_cleanup_delay():
+    oldest = DeletedFile.objects.order_by('created_at') \
+                                .values_list('created_at', flat=True).first()
+    if oldest is None:
+        return None
+    due = oldest + timedelta(seconds=_grace())
+    return max(0, (due - timezone.now()).total_seconds())
+
+
+def delete_files(chunk_size=200):
+    deleted = 0
+    queued_before = timezone.now() - timedelta(seconds=_grace())
+    while True:
+        rows = list(DeletedFile.objects.filter(created_at__lte=queued_before)
+                               .order_by('pk')
+                               .values_list('pk', 'name')[:chunk_size])
+        if not rows:
+            return deleted
+        for pk, name in rows:
+            if _referenced([name]):
+                continue
+            try:
+                delete_thumbnails(name)
+                default_storage.delete(name)
+                deleted += 1
+            except Exception:
+                logger.exception('Could not delete %s', name)
+        DeletedFile.objects.filter(pk__in=[pk for pk, name in rows]).delete()
+
+
+def _thread_job():
+    try:
+        deleted = delete_files()
+        delay = next_cleanup_delay()
+        if delay is not None:
+            _schedule(delay)
+        return deleted
+    except Exception:
+        logger.exception('File cleanup failed')
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix='cleanup')
+        return _executor
+
+
+def _timer_job():
+    global _timer
+    with _timer_lock:
+        _timer = None
+    _get_executor().submit(_thread_job)
+
+
+def _schedule(delay):
+    global _timer
+    with _timer_lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(delay, _timer_job)
+        _timer.daemon = True
+        _timer.start()
+
+
+def enqueue_cleanup():
+    if not getattr(settings, 'FILE_CLEANUP_IN_BACKGROUND', True):
+        return delete_files()
+    # Queued files only become due after the grace period
+    _schedule(_grace())
@@ -0,0 +1,104 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Bb, Comment
+
+EXPORTS = {
+    'bbs': (Bb, ('id', 'rubric', 'rubric__name', 'author', 'title', 'content',
+                 'price', 'contacts', 'phone_number', 'image', 'is_active',
+                 'views', 'likes_count', 'created_at', 'updated_at')),
+    'comments': (Comment, ('id', 'bb', 'author', 'content', 'is_active',
+                           'created_at')),
+}
+FORMATS = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+BUFFER_SIZE = 64 * 1024
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return str(o)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def export_rows(kind, chunk_size=2000):
+    model, fields = EXPORTS[kind]
+    rows = model.objects.order_by('pk').values_list(*fields)
+    return fields, rows.iterator(chunk_size=chunk_size)
+
+
+def render_jsonl(fields, rows):
+    encoder = ExportEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def render_csv(fields, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+RENDERERS = {'jsonl': render_jsonl, 'csv': render_csv}
+
+
+def _buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _quality(params):
+    for param in params:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                return float(value)
+            except ValueError:
+                return 0
+    return 1
+
+
+def accepts_gzip(accept_encoding):
+    qualities = {}
+    for coding in accept_encoding.split(','):
+        name, *params = coding.split(';')
+        name = name.strip().lower()
+        if name:
+            qualities[name] = _quality(params)
+    for name in ('gzip', 'x-gzip', '*'):
+        if name in qualities:
+            return qualities[name] > 0
+    return False
+
+
+def export_stream(kind, fmt, compress=False, chunk_size=2000):
+    fields, rows = export_rows(kind, chunk_size)
+    chunks = _buffered(RENDERERS[fmt](fields, rows))
+    return _gzipped(chunks) if compress else chunks
@@ -4,6 +4,7 @@ from django.contrib.auth import password_validation
 from django.forms import inlineformset_factory
 from .apps import user_registered
 from .models import AdvUser, SuperRubric, SubRubric, Bb, AdditionalImage, Comment
+from .rubrics import CachedRubricChoiceField
 from captcha.fields import CaptchaField
 from phonenumber_field.formfields import PhoneNumberField
 
@@ -67,7 +68,7 @@ class SubRubricForm(forms.ModelForm):
 
 
 class SearchForm(forms.Form):
-    rubric = forms.ModelChoiceField(queryset=SubRubric.objects.all(), empty_label=None, label='')
+    rubric = CachedRubricChoiceField(queryset=SubRubric.objects.all(), empty_label=None, label='')
     keyword = forms.CharField(required=True, max_length=20, label='')
     class Meta:
         widgets = {'keyword': forms.TextInput(attrs={'class': 'form-control'}),
@@ -0,0 +1,77 @@
+import hashlib
+import re
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import ImageField, ImageFieldFile
+from PIL import Image, ImageOps
+
+from .storage import shard
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+NORMALIZED_RE = re.compile(r'^[0-9a-f]{64}\.(?:jpg|webp)$')
+SPOOL_SIZE = 1024 * 1024
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_normalized(name):
+    return bool(NORMALIZED_RE.match(name.rsplit('/', 1)[-1]))
+
+
+def normalize_image(source, output):
+    max_size = getattr(settings, 'IMAGE_MAX_SIZE', (1920, 1920))
+    source.seek(0)
+    with Image.open(source) as image:
+        image.draft('RGB', max_size)
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or \
+                    (image.mode == 'P' and 'transparency' in image.info)
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        quality = getattr(settings, 'IMAGE_QUALITY', 85)
+        fmt = 'WEBP' if has_alpha else getattr(settings, 'IMAGE_FORMAT', 'JPEG')
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        image.info = {}
+        if fmt == 'WEBP':
+            image.save(output, 'WEBP', quality=quality, method=4)
+        else:
+            image.save(output, 'JPEG', quality=quality, optimize=True,
+                       progressive=True)
+        return fmt
+
+
+def store_image(content, storage=None):
+    storage = storage or default_storage
+    if not hasattr(content, 'chunks'):
+        content = File(content)
+    digest = content_hash(content)
+    for ext in EXTENSIONS.values():
+        name = shard('%s.%s' % (digest, ext))
+        if storage.exists(name):
+            return name
+    with SpooledTemporaryFile(max_size=SPOOL_SIZE) as output:
+        fmt = normalize_image(content, output)
+        output.seek(0)
+        return storage.save(shard('%s.%s' % (digest, EXTENSIONS[fmt])),
+                            File(output))
+
+
+class NormalizedImageFieldFile(ImageFieldFile):
+    def save(self, name, content, save=True):
+        self.name = store_image(content, self.storage)
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+    save.alters_data = True
+
+
+class NormalizedImageField(ImageField):
+    attr_class = NormalizedImageFieldFile
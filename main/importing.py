@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from .caching import purge
+from .db import reserve_ids
+from .models import AdvUser, SubRubric, Bb, AdditionalImage
+from .search import index_bbs
+from .similar import rebuild_rubric
+from .utilities import get_unique_path
+
+BB_FIELDS = ('title', 'content', 'price', 'contacts', 'phone_number')
+
+Batch = namedtuple('Batch', 'number rows created seconds')
+
+
+def read_rows(stream, fmt):
+    if fmt == 'csv':
+        for line, row in enumerate(csv.DictReader(stream), start=2):
+            images = row.get('images') or ''
+            row['images'] = [image for image in images.split(';') if image]
+            yield line, row
+    else:
+        for line, text in enumerate(stream, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as error:
+                    yield line, error
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BbImporter:
+    def __init__(self, images_dir='', workers=4, batch_size=500,
+                 default_author=None):
+        self.images_dir = images_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.errors = []
+        self.rubrics = {}
+        for pk, name in SubRubric.objects.values_list('pk', 'name'):
+            self.rubrics[str(pk)] = pk
+            self.rubrics[name.casefold()] = pk
+        self.authors = {}
+        self.touched_rubrics = set()
+
+    def run(self, rows):
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for number, batch in enumerate(_batches(rows, self.batch_size), 1):
+                start = time.monotonic()
+                created = self.import_batch(batch, pool)
+                yield Batch(number, len(batch), created,
+                            time.monotonic() - start)
+        if self.touched_rubrics:
+            purge('bbs', *('rubric:%d' % pk for pk in self.touched_rubrics))
+            for rubric_id in self.touched_rubrics:
+                rebuild_rubric(rubric_id)
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+    def _load_authors(self, batch):
+        names = {str(row.get('author') or self.default_author or '')
+                 for line, row in batch if isinstance(row, dict)}
+        names -= set(self.authors)
+        if names:
+            self.authors.update(AdvUser.objects.filter(username__in=names)
+                                       .values_list('username', 'pk'))
+
+    def build(self, line, row):
+        if not isinstance(row, dict):
+            self.error(line, 'Malformed row: %s' % row)
+            return None
+        rubric = self.rubrics.get(str(row.get('rubric', '')).casefold())
+        if rubric is None:
+            self.error(line, 'Unknown rubric %r' % row.get('rubric'))
+            return None
+        author = self.authors.get(str(row.get('author') or
+                                      self.default_author or ''))
+        if author is None:
+            self.error(line, 'Unknown author %r' % row.get('author'))
+            return None
+        bb = Bb(rubric_id=rubric, author_id=author,
+                **{field: row[field] for field in BB_FIELDS
+                   if row.get(field) not in (None, '')})
+        try:
+            bb.clean_fields(exclude=('rubric', 'author', 'image'))
+        except ValidationError as error:
+            self.error(line, '; '.join(
+                '%s: %s' % (field, ' '.join(messages))
+                for field, messages in error.message_dict.items()))
+            return None
+        return bb
+
+    def copy_image(self, source):
+        path = os.path.join(self.images_dir, source)
+        with open(path, 'rb') as image:
+            return default_storage.save(
+                get_unique_path(None, os.path.basename(path)), File(image))
+
+    def _copy_images(self, rows, pool):
+        futures = [(line, bb, [pool.submit(self.copy_image, source)
+                               for source in sources])
+                   for line, bb, sources in rows]
+        copied = []
+        for line, bb, jobs in futures:
+            names, failed = [], None
+            for job in jobs:
+                try:
+                    names.append(job.result())
+                except OSError as error:
+                    failed = error
+            if failed is not None:
+                for name in names:
+                    default_storage.delete(name)
+                self.error(line, 'Could not copy image: %s' % failed)
+                continue
+            copied.append((bb, names))
+        return copied
+
+    def import_batch(self, batch, pool):
+        self._load_authors(batch)
+        rows = []
+        for line, row in batch:
+            bb = self.build(line, row)
+            if bb is not None:
+                sources = ([row['image']] if row.get('image') else []) + \
+                          list(row.get('images') or [])
+                rows.append((line, bb, sources))
+        copied = self._copy_images(rows, pool)
+        images = []
+        for bb, names in copied:
+            if names:
+                bb.image = names[0]
+        bbs = [bb for bb, names in copied]
+        with transaction.atomic():
+            if bbs and not connection.features.can_return_rows_from_bulk_insert:
+                ids = reserve_ids(connection, Bb._meta.db_table, len(bbs))
+                for pk, bb in zip(ids, bbs):
+                    bb.pk = pk
+            Bb.objects.bulk_create(bbs)
+            for bb, names in copied:
+                images += [AdditionalImage(bb_id=bb.pk, image=name)
+                           for name in names[1:]]
+            AdditionalImage.objects.bulk_create(images)
+            index_bbs(bbs)
+        self.touched_rubrics.update(bb.rubric_id for bb in bbs)
+        return len(bbs)
@@ -0,0 +1,57 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .caching import purge
+from .models import Bb
+
+Like = Bb.likes.through
+
+
+def toggle_like(bb_pk, user_pk):
+    with transaction.atomic():
+        removed, _ = Like.objects.filter(bb_id=bb_pk, advuser_id=user_pk).delete()
+        if removed:
+            delta = -removed
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(bb_id=bb_pk, advuser_id=user_pk)
+                delta = 1
+            except IntegrityError:
+                delta = 0
+        bbs = Bb.objects.filter(pk=bb_pk)
+        if not bbs.update(likes_count=F('likes_count') + delta):
+            raise Bb.DoesNotExist
+        likes_count = bbs.values_list('likes_count', flat=True).get()
+        purge('bb:%d' % bb_pk)
+    return not removed, likes_count
+
+
+def actual_likes():
+    return Coalesce(Subquery(Like.objects.filter(bb_id=OuterRef('pk'))
+                                         .values('bb_id')
+                                         .annotate(total=Count('pk'))
+                                         .values('total')), 0)
+
+
+def drifted_likes():
+    return Bb.objects.annotate(actual=actual_likes()) \
+                     .exclude(likes_count=F('actual'))
+
+
+def reconcile_likes(chunk_size=10000):
+    fixed = 0
+    last_pk = 0
+    while True:
+        pks = list(Bb.objects.filter(pk__gt=last_pk).order_by('pk')
+                             .values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return fixed
+        with transaction.atomic():
+            chunk = drifted_likes().filter(pk__gte=pks[0], pk__lte=pks[-1])
+            drifted = list(chunk.values_list('pk', flat=True))
+            if drifted:
+                fixed += Bb.objects.filter(pk__in=drifted) \
+                                   .update(likes_count=actual_likes())
+        last_pk = pks[-1]
@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def group_name(bb_pk):
+    return 'bb_%d' % bb_pk
+
+
+def send_update(bb_pk, data):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(group_name(bb_pk),
+                                        {'type': 'bb.update', 'data': data})
+    except Exception:
+        logger.exception('Could not publish update of Bb %d', bb_pk)
+
+
+class LiveUpdates:
+    def __init__(self, send=send_update):
+        self.send = send
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_sent = {}
+        self.timers = {}
+
+    def reset(self):
+        with self.lock:
+            for timer in self.timers.values():
+                timer.cancel()
+            self.timers.clear()
+            self.pending.clear()
+            self.last_sent.clear()
+
+    def publish(self, bb_pk, **data):
+        interval = getattr(settings, 'LIVE_UPDATES_INTERVAL', 1)
+        now = time.monotonic()
+        payload = None
+        with self.lock:
+            entry = self.pending.setdefault(bb_pk, {})
+            comments = data.pop('comments', [])
+            entry.update(data)
+            if comments:
+                entry.setdefault('comments', []).extend(comments)
+            delay = self.last_sent.get(bb_pk, now - interval) + interval - now
+            if delay <= 0:
+                payload = self.pending.pop(bb_pk)
+                self.last_sent[bb_pk] = now
+                self._prune(now - interval)
+            elif bb_pk not in self.timers:
+                timer = threading.Timer(delay, self.flush, [bb_pk])
+                timer.daemon = True
+                self.timers[bb_pk] = timer
+                timer.start()
+        if payload:
+            self.send(bb_pk, payload)
+
+    def flush(self, bb_pk):
+        with self.lock:
+            self.timers.pop(bb_pk, None)
+            payload = self.pending.pop(bb_pk, None)
+            self.last_sent[bb_pk] = time.monotonic()
+        if payload:
+            self.send(bb_pk, payload)
+
+    def _prune(self, before):
+        for bb_pk in [bb_pk for bb_pk, sent in self.last_sent.items()
+                      if sent < before and bb_pk not in self.timers]:
+            del self.last_sent[bb_pk]
+
+
+live_updates = LiveUpdates()
@@ -0,0 +1,114 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AdvUser, Comment, EmailJob
+from .utilities import activation_letter, new_comment_letter
+
+ACTIVATION = 'activation'
+NEW_COMMENT = 'new_comment'
+
+LETTERS = {
+    ACTIVATION: (AdvUser.objects.all(), activation_letter),
+    NEW_COMMENT: (Comment.objects.select_related('bb__author'),
+                  new_comment_letter),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, 'EMAIL_QUEUE_' + name, default)
+
+
+def enqueue(kind, pks):
+    now = timezone.now()
+    return EmailJob.objects.bulk_create(
+        EmailJob(kind=kind, object_id=pk, run_at=now) for pk in pks)
+
+
+def retry_delay(attempts):
+    delay = _setting('RETRY_DELAY', 60) * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, _setting('MAX_RETRY_DELAY', 60 * 60)))
+
+
+def release_stale():
+    stale = timezone.now() - timedelta(
+        seconds=_setting('LOCK_TIMEOUT', 60 * 10))
+    return EmailJob.objects.filter(status=EmailJob.RUNNING,
+                                   locked_at__lt=stale) \
+                           .update(status=EmailJob.PENDING, locked_at=None)
+
+
+def claim(batch_size):
+    now = timezone.now()
+    pks = list(EmailJob.objects.filter(status=EmailJob.PENDING,
+                                       run_at__lte=now)
+                               .order_by('run_at', 'pk')
+                               .values_list('pk', flat=True)[:batch_size])
+    EmailJob.objects.filter(pk__in=pks, status=EmailJob.PENDING) \
+                    .update(status=EmailJob.RUNNING, locked_at=now,
+                            attempts=F('attempts') + 1)
+    return list(EmailJob.objects.filter(pk__in=pks, status=EmailJob.RUNNING,
+                                        locked_at=now).order_by('pk'))
+
+
+def _instances(jobs):
+    objects = {}
+    for kind in {job.kind for job in jobs}:
+        objects[kind] = LETTERS[kind][0].in_bulk(
+            [job.object_id for job in jobs if job.kind == kind])
+    for job in jobs:
+        yield job, objects[job.kind].get(job.object_id)
+
+
+def _fail(job, error):
+    job.last_error = str(error)
+    job.locked_at = None
+    if job.attempts >= _setting('MAX_ATTEMPTS', 5):
+        job.status = EmailJob.FAILED
+    else:
+        job.status = EmailJob.PENDING
+        job.run_at = timezone.now() + retry_delay(job.attempts)
+    job.save(update_fields=('status', 'run_at', 'locked_at', 'last_error'))
+    return job.status
+
+
+def run_batch(batch_size=None):
+    jobs = claim(batch_size or _setting('BATCH_SIZE', 50))
+    results = Counter()
+    if not jobs:
+        return results
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        logger.exception('Could not connect to the mail server')
+        for job in jobs:
+            results[_fail(job, error)] += 1
+        return results
+    sent = []
+    try:
+        for job, instance in _instances(jobs):
+            try:
+                message = instance and LETTERS[job.kind][1](instance)
+                if message and any(message.to):
+                    connection.send_messages([message])
+            except Exception as error:
+                logger.warning('Email job %d failed: %s', job.pk, error)
+                results[_fail(job, error)] += 1
+            else:
+                sent.append(job.pk)
+    finally:
+        connection.close()
+    if sent:
+        EmailJob.objects.filter(pk__in=sent) \
+                        .update(status=EmailJob.SENT, locked_at=None,
+                                sent_at=timezone.now(), last_error='')
+        results[EmailJob.SENT] = len(sent)
+    return results
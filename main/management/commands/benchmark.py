@@ -0,0 +1,95 @@
+import json
+import os
+import platform
+import tempfile
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from django.utils import timezone
+
+from main.benchmarks import SCENARIOS, compare, run_benchmarks, seed
+
+
+class Command(BaseCommand):
+    help = 'Seeds a throwaway database with synthetic data and measures ' \
+           'the latency of the hot views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ads', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--likes', type=int, default=3,
+                            help='Average likes per ad')
+        parser.add_argument('--comments', type=int, default=2,
+                            help='Average comments per ad')
+        parser.add_argument('--images', type=int, default=20,
+                            help='Distinct images shared by the ads')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--scenario', action='append',
+                            choices=sorted(SCENARIOS),
+                            help='Only run this scenario, can be repeated')
+        parser.add_argument('--warm', action='store_true',
+                            help='Serve repeated anonymous pages from the '
+                                 'page cache')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--baseline',
+                            help='Earlier result file to compare p95 against')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as stream:
+                    baseline = json.load(stream)['scenarios']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError('Cannot read baseline: %s' % error)
+        overrides = {'PROFILING': False}
+        if not options['warm']:
+            overrides['PAGE_CACHE_TIMEOUT'] = 0
+        workdir = tempfile.TemporaryDirectory()
+        media = os.path.join(workdir.name, 'media')
+        # An in-memory database would hide the I/O cost of the real one
+        connection.settings_dict['TEST']['NAME'] = \
+            os.path.join(workdir.name, 'benchmark.sqlite3')
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0,
+                                                      autoclobber=True)
+        try:
+            with override_settings(MEDIA_ROOT=media, **overrides):
+                start = time.monotonic()
+                dataset = seed(options['ads'], options['users'],
+                               likes=options['likes'],
+                               comments=options['comments'],
+                               images=options['images'], seed=options['seed'],
+                               log=self.stdout.write)
+                seconds = time.monotonic() - start
+                self.stdout.write('Seeded in %.1fs' % seconds)
+                results = run_benchmarks(options['scenario'],
+                                         options['requests'],
+                                         options['warmup'], options['seed'],
+                                         log=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            workdir.cleanup()
+        report = {'created_at': timezone.now().isoformat(),
+                  'python': platform.python_version(),
+                  'django': django.get_version(),
+                  'options': {name: options[name] for name in (
+                      'requests', 'warmup', 'seed', 'warm')},
+                  'dataset': dataset, 'seed_seconds': round(seconds, 2),
+                  'scenarios': results}
+        with open(options['output'], 'w') as stream:
+            json.dump(report, stream, indent=2, ensure_ascii=False)
+        if baseline is not None:
+            for name, change in compare(results, baseline).items():
+                style = self.style.ERROR if change > 10 else self.style.SUCCESS
+                self.stdout.write(style('%-20s p95 %+.1f%%' % (name, change)))
+        self.stdout.write(self.style.SUCCESS(
+            'Wrote results to %s' % options['output']))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from main.deletion import delete_files
+from main.models import DeletedFile
+
+
+class Command(BaseCommand):
+    help = 'Deletes files and thumbnails queued for removal once their grace ' \
+           'period is over'
+
+    def handle(self, *args, **options):
+        pending = DeletedFile.objects.count()
+        deleted = delete_files()
+        waiting = DeletedFile.objects.count()
+        self.stdout.write(self.style.SUCCESS(
+            'Processed %d queued files, deleted %d, waiting %d' %
+            (pending - waiting, deleted, waiting)))
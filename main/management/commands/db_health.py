@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from main.db import checkpoint, configured_pragmas, production_profile, \
+                    sqlite_pragmas, wal_size
+
+
+class Command(BaseCommand):
+    help = 'Reports the effective SQLite pragmas and the WAL file size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--checkpoint', action='store_true',
+                            help='Checkpoint and truncate the WAL file')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Database "%s" is not SQLite' %
+                               options['database'])
+        pragmas = sqlite_pragmas(connection)
+        self.stdout.write('%-20s %s' % ('production_profile',
+                                        'on' if production_profile() else 'off'))
+        for name, value in pragmas.items():
+            configured = configured_pragmas().get(name)
+            line = '%-20s %s' % (name, value)
+            if configured is not None:
+                line += ' (configured: %s)' % configured
+            self.stdout.write(line)
+        self.stdout.write('%-20s %s' % ('conn_max_age',
+                                        connection.settings_dict['CONN_MAX_AGE']))
+        self.stdout.write('%-20s %d bytes' % ('database_size',
+                          pragmas['page_count'] * pragmas['page_size']))
+        self.stdout.write('%-20s %d bytes' % ('wal_size', wal_size(connection)))
+        if options['checkpoint']:
+            busy, log, checkpointed = checkpoint(connection)
+            self.stdout.write(self.style.SUCCESS(
+                'Checkpointed %d of %d WAL frames' % (checkpointed, log)))
+            self.stdout.write('%-20s %d bytes' % ('wal_size',
+                                                  wal_size(connection)))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from main.query_plans import QUERIES, explain, full_scans, temp_sorts
+
+
+class Command(BaseCommand):
+    help = 'Runs EXPLAIN QUERY PLAN for the registered view queries ' \
+           'and flags full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', metavar='name',
+                            help='Only explain these queries')
+        parser.add_argument('--strict', action='store_true',
+                            help='Fail if any query scans a whole table')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN output is only parsed '
+                               'for SQLite')
+        names = options['names'] or list(QUERIES)
+        unknown = set(names) - set(QUERIES)
+        if unknown:
+            raise CommandError('Unknown queries: %s' %
+                               ', '.join(sorted(unknown)))
+        flagged = []
+        for name in names:
+            plan = explain(name)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            scans = full_scans(plan)
+            if scans:
+                flagged.append(name)
+                self.stdout.write(self.style.ERROR(
+                    'Full scan of %s' % ', '.join(scans)))
+            for sort in temp_sorts(plan):
+                self.stdout.write(self.style.WARNING(
+                    'Temporary B-tree for %s' % sort))
+        if flagged and options['strict']:
+            raise CommandError('Full table scans in: %s' % ', '.join(flagged))
+        self.stdout.write(self.style.SUCCESS(
+            'Explained %d queries, %d with full scans' %
+            (len(names), len(flagged))))
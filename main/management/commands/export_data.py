@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from main.exporting import EXPORTS, FORMATS, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Streams ads or comments as JSON Lines or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', help='Output file, stdout by default')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = export_stream(options['kind'], options['format'],
+                               options['gzip'], options['chunk_size'])
+        if options['output']:
+            output = open(options['output'], 'wb')
+        else:
+            output = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(
+                'Wrote %d bytes to %s' % (written, options['output'])))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.counters import counter_buffer, request_flush
+
+
+class Command(BaseCommand):
+    help = ('Flushes buffered page hit and view counters. Running workers '
+            'pick up the flush request through the database within a second.')
+
+    def handle(self, *args, **options):
+        request_flush()
+        count = counter_buffer.flush()
+        self.stdout.write(self.style.SUCCESS(
+            'Flush requested, %d local increments written' % count))
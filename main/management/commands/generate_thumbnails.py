@@ -0,0 +1,23 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.thumbnails import generate_missing
+
+
+class Command(BaseCommand):
+    help = 'Generates missing thumbnails of all aliases for uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Worker processes, 0 to run in-process')
+        parser.add_argument('--chunk-size', type=int, default=16)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        images, created = generate_missing(options['workers'],
+                                           options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Images: %d, thumbnails created: %d in %.2fs' %
+            (images, created, time.monotonic() - start)))
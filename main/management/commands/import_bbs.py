@@ -0,0 +1,58 @@
+import io
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.importing import BbImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports ads from a CSV or JSON Lines file in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file, - for stdin')
+        parser.add_argument('--format', choices=('csv', 'jsonl'),
+                            help='Input format, guessed from the extension '
+                                 'by default')
+        parser.add_argument('--images-dir', default='',
+                            help='Directory image paths are relative to')
+        parser.add_argument('--author',
+                            help='Username for rows without an author')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Parallel image copy workers')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or \
+              ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if path == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+        elif os.path.exists(path):
+            stream = open(path, encoding='utf-8', newline='')
+        else:
+            raise CommandError('File "%s" does not exist' % path)
+        importer = BbImporter(options['images_dir'], options['workers'],
+                              options['batch_size'], options['author'])
+        start = time.monotonic()
+        rows = created = 0
+        with stream:
+            for batch in importer.run(read_rows(stream, fmt)):
+                rows += batch.rows
+                created += batch.created
+                self.stdout.write('Batch %d: %d rows, %d created in %.2fs '
+                                  '(%.0f rows/s)' % (
+                                      batch.number, batch.rows, batch.created,
+                                      batch.seconds,
+                                      batch.rows / max(batch.seconds, 1e-6)))
+        for line, message in importer.errors:
+            self.stderr.write('Line %d: %s' % (line, message))
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS(
+            'Imported %d of %d rows in %.2fs (%.0f rows/s)' % (
+                created, rows, elapsed, rows / max(elapsed, 1e-6))))
+        if created:
+            self.stdout.write('Run generate_thumbnails to render thumbnails '
+                              'of the imported images')
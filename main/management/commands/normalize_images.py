@@ -0,0 +1,38 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from main.images import is_normalized, store_image
+from main.media import chunks, image_names, replace_images
+
+
+class Command(BaseCommand):
+    help = 'Re-encodes and dedupes images uploaded before normalization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the images to be processed')
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        names = [name for name in image_names() if not is_normalized(name)]
+        if options['dry_run']:
+            self.stdout.write('Images to normalize: %d' % len(names))
+            return
+        converted, missing, failed = {}, 0, 0
+        for chunk in chunks(names, options['chunk_size']):
+            renames = {}
+            for name in chunk:
+                if not default_storage.exists(name):
+                    missing += 1
+                    continue
+                try:
+                    with default_storage.open(name) as source:
+                        renames[name] = store_image(source)
+                except Exception as error:
+                    failed += 1
+                    self.stderr.write('Could not normalize %s: %s' %
+                                      (name, error))
+            converted.update(replace_images(renames))
+        self.stdout.write(self.style.SUCCESS(
+            'Normalized %d images into %d files, missing %d, failed %d' %
+            (len(converted), len(set(converted.values())), missing, failed)))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from main.search import fts5_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index over Bb titles and contents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = rebuild_index(chunk_size=options['chunk_size'])
+        backend = 'FTS5' if fts5_enabled() else 'python'
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed %d ads (%s backend)' % (count, backend)))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.models import SubRubric
+from main.similar import rebuild_rubric
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the precomputed similar ads for every rubric'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rubric', type=int, action='append',
+                            help='Only rebuild the given rubric id')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rubrics = options['rubric'] or \
+                  SubRubric.objects.values_list('pk', flat=True)
+        for rubric_id in rubrics:
+            start = time.monotonic()
+            count = rebuild_rubric(rubric_id, chunk_size=options['chunk_size'])
+            self.stdout.write('Rubric %d: %d ads in %.2fs' %
+                              (rubric_id, count, time.monotonic() - start))
+        self.stdout.write(self.style.SUCCESS('Similar ads rebuilt'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from main.likes import drifted_likes, reconcile_likes
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Bb.likes_count from the likes table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many ads have drifted')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = drifted_likes().count()
+            self.stdout.write('%d ads have a drifted like counter' % count)
+            return
+        count = reconcile_likes(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Fixed like counters of %d ads' % count))
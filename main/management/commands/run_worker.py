@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.mailqueue import release_stale, run_batch
+
+
+class Command(BaseCommand):
+    help = 'Sends queued email notifications'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help='Jobs sent over one SMTP connection')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the jobs that are due and exit')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                released = release_stale()
+                if released:
+                    self.stdout.write('Released %d stale jobs' % released)
+                results = run_batch(options['batch_size'])
+                if results:
+                    self.stdout.write(self.style.SUCCESS(', '.join(
+                        '%s: %d' % item for item in sorted(results.items()))))
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,32 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from main.media import chunks, image_names, shard_stored
+from main.storage import is_sharded
+
+
+class Command(BaseCommand):
+    help = 'Moves images stored in the flat media layout into shard directories'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the images to be moved')
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        names = [name for name in image_names() if not is_sharded(name)]
+        if options['dry_run']:
+            self.stdout.write('Images to move: %d' % len(names))
+            return
+        moved, missing, failed = 0, 0, 0
+        for chunk in chunks(names, options['chunk_size']):
+            present = [name for name in chunk if default_storage.exists(name)]
+            missing += len(chunk) - len(present)
+            try:
+                moved += len(shard_stored(present))
+            except Exception as error:
+                failed += len(present)
+                self.stderr.write('Could not move %d images starting at %s: %s'
+                                  % (len(present), chunk[0], error))
+        self.stdout.write(self.style.SUCCESS(
+            'Moved %d images, missing %d, failed %d' % (moved, missing, failed)))
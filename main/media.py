@@ -0,0 +1,68 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+from django.utils import timezone
+
+from .caching import purge
+from .deletion import queue_files
+from .images import is_normalized
+from .models import Bb, AdditionalImage
+from .storage import copy_file, shard, unique_name
+from .thumbnails import IMAGE_FIELDS, enqueue_thumbnails
+
+
+def image_names():
+    names = set()
+    for model, target in IMAGE_FIELDS:
+        names.update(model.objects.exclude(image='')
+                                  .values_list('image', flat=True).distinct())
+    return sorted(names)
+
+
+def chunks(names, size):
+    for start in range(0, len(names), size):
+        yield names[start:start + size]
+
+
+def replace_images(renames):
+    if not renames:
+        return renames
+    names = list(renames)
+    rename = Case(*(When(image=name, then=Value(new_name))
+                    for name, new_name in renames.items()),
+                  output_field=CharField())
+    with transaction.atomic():
+        bbs = list(Bb.objects.filter(image__in=names)
+                             .values_list('pk', 'rubric_id', 'image'))
+        ais = list(AdditionalImage.objects.filter(image__in=names)
+                                  .values_list('bb_id', 'image'))
+        Bb.objects.filter(image__in=names).update(image=rename,
+                                                  updated_at=timezone.now())
+        AdditionalImage.objects.filter(image__in=names).update(image=rename)
+        queue_files(names)
+    purge('bbs', *{'rubric:%d' % rubric_id for pk, rubric_id, name in bbs},
+          *{'bb:%d' % pk for pk, rubric_id, name in bbs},
+          *{'bb:%d' % pk for pk, name in ais})
+    used = ({renames[name] for pk, rubric_id, name in bbs},
+            {renames[name] for pk, name in ais})
+    for (model, target), new_names in zip(IMAGE_FIELDS, used):
+        for new_name in new_names:
+            enqueue_thumbnails(new_name, target)
+    return renames
+
+
+def sharded_name(name):
+    if is_normalized(name):
+        return shard(name.rsplit('/', 1)[-1])
+    return unique_name(name)
+
+
+def shard_stored(names, storage=None):
+    storage = storage or default_storage
+    renames = {}
+    for name in names:
+        new_name = sharded_name(name)
+        if not storage.exists(new_name):
+            copy_file(storage, name, new_name)
+        renames[name] = new_name
+    return replace_images(renames)
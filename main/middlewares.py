@@ -1,26 +1,29 @@
-from .models import SubRubric
-from .models import SuperRubric
+from django.utils.functional import SimpleLazyObject
 from .forms import SearchForm
+from .rubrics import get_rubric_tree
+from .recent import load_recent_bbs
 
 def bboard_context_processor(request):
     context = {}
-    context['rubrics'] = SubRubric.objects.all()
+    context['rubrics'] = SimpleLazyObject(lambda: get_rubric_tree().subrubrics)
+    context['recent_bbs'] = SimpleLazyObject(lambda: load_recent_bbs(request))
     context['keyword'] = ''
     context['all'] = ''
     if 'keyword' in request.GET:
         keyword = request.GET['keyword']
         if keyword:
-            context['keyword'] = '?keyword' + keyword
+            context['keyword'] = '?keyword=' + keyword
             context['all'] = context['keyword']
-    if 'page' in request.GET:
-        page = request.GET['page']
-        if page != '1':
+    if 'after' in request.GET:
+        after = request.GET['after']
+        if after:
             if context['all']:
-                context['all'] += '&page=' + page
+                context['all'] += '&after=' + after
             else:
-                context['all'] = '?page' + page
+                context['all'] = '?after=' + after
     return context
 
 def add_superrubrics(request):
-    return {'superrubrics': SuperRubric.objects.all().exclude(name='Все'),
+    return {'superrubrics': SimpleLazyObject(
+                lambda: get_rubric_tree().superrubrics),
             'form':SearchForm()}
\ No newline at end of file
@@ -0,0 +1,129 @@
+import re
+
+from django.db import migrations
+
+# Frozen copy of main.search as of this migration, so later changes to the
+# stemmer don't alter the historical backfill.
+FTS_TABLE = 'main_bb_fts'
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Russian Snowball stemmer
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+REFLEXIVE = ('ся', 'сь')
+ADJECTIVE = ('ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые',
+             'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их',
+             'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но',
+          'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+VERB_2 = ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило',
+          'ыло', 'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей',
+          'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю')
+NOUN = ('иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+        'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах',
+        'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы',
+        'ь', 'ю', 'я')
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _regions(word):
+    rv = r1 = r2 = len(word)
+    for i, ch in enumerate(word):
+        if ch in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r1, r2
+
+
+def _strip(word, start, endings, preceded=False):
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            if preceded:
+                pos = len(word) - len(ending) - 1
+                if pos < start or word[pos] not in 'ая':
+                    continue
+            return word[:-len(ending)]
+    return None
+
+
+def stem(word):
+    rv, r1, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+    stemmed = (_strip(word, rv, PERFECTIVE_GERUND_1, preceded=True) or
+               _strip(word, rv, PERFECTIVE_GERUND_2))
+    if stemmed is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stemmed = _strip(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = (_strip(stemmed, rv, PARTICIPLE_1, preceded=True) or
+                       _strip(stemmed, rv, PARTICIPLE_2) or stemmed)
+        else:
+            stemmed = (_strip(word, rv, VERB_1, preceded=True) or
+                       _strip(word, rv, VERB_2) or
+                       _strip(word, rv, NOUN))
+    word = stemmed if stemmed is not None else word
+    word = _strip(word, rv, ('и',)) or word
+    word = _strip(word, r2, DERIVATIONAL) or word
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн'):
+            word = word[:-1]
+        return word
+    return _strip(word, rv, ('ь',)) or word
+
+
+def normalize(text):
+    text = text.casefold().replace('ё', 'е')
+    return [stem(token) for token in WORD_RE.findall(text)]
+
+
+def create_fts_table(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if ('ENABLE_FTS5',) not in cursor.fetchall():
+            return
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS %s USING "
+                       "fts5(title, content, tokenize='unicode61 "
+                       "remove_diacritics 0')" % FTS_TABLE)
+        Bb = apps.get_model('main', 'Bb')
+        rows = [(pk, ' '.join(normalize(title)), ' '.join(normalize(content)))
+                for pk, title, content
+                in Bb.objects.values_list('pk', 'title', 'content')]
+        cursor.executemany('INSERT INTO %s (rowid, title, content) '
+                           'VALUES (%%s, %%s, %%s)' % FTS_TABLE, rows)
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % FTS_TABLE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0015_alter_bb_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
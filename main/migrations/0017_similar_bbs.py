@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 20:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0016_bb_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BbSignature',
+            fields=[
+                ('bb', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='main.bb')),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarBb',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.SmallIntegerField()),
+                ('bb', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_set', to='main.bb')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='main.bb')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'unique_together': {('bb', 'similar')},
+            },
+        ),
+    ]
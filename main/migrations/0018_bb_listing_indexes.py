@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0017_similar_bbs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bb',
+            index=models.Index(fields=['rubric', '-created_at', '-id'], name='main_bb_rubric_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bb',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='main_bb_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bb',
+            index=models.Index(fields=['price'], name='main_bb_price_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 20:36
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    Bb = apps.get_model('main', 'Bb')
+    Bb.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0018_bb_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bb',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
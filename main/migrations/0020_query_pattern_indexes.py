@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-18 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0019_bb_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bb',
+            name='main_bb_rubric_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bb',
+            index=models.Index(condition=models.Q(is_active=True), fields=['rubric', '-created_at', '-id'], name='main_bb_active_rubric_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bb',
+            index=models.Index(condition=models.Q(is_active=True), fields=['-created_at', '-id'], name='main_bb_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(is_active=True), fields=['bb', 'created_at'], name='main_comment_active_bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recentbbs',
+            index=models.Index(fields=['user', '-attended_at'], name='main_recentbbs_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rubric',
+            index=models.Index(fields=['super_rubric', 'order', 'name'], name='main_rubric_super_order_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_emailjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advuser',
+            index=models.Index(fields=['email'], name='main_advuser_email_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 20:59
+
+from django.db import migrations
+import main.images
+import main.utilities
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='additionalimage',
+            name='image',
+            field=main.images.NormalizedImageField(blank=True, upload_to=main.utilities.get_timestamp_path, verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='bb',
+            name='image',
+            field=main.images.NormalizedImageField(blank=True, upload_to=main.utilities.get_timestamp_path, verbose_name='Изображение'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 21:03
+
+from django.db import migrations
+import main.images
+import main.utilities
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_normalized_images'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='additionalimage',
+            name='image',
+            field=main.images.NormalizedImageField(blank=True, upload_to=main.utilities.get_unique_path, verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='bb',
+            name='image',
+            field=main.images.NormalizedImageField(blank=True, upload_to=main.utilities.get_unique_path, verbose_name='Изображение'),
+        ),
+    ]
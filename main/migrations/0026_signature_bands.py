@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 21:12
+
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BANDS = 16
+BAND_BYTES = 16
+
+
+def fill_bands(apps, schema_editor):
+    BbSignature = apps.get_model('main', 'BbSignature')
+    SignatureBand = apps.get_model('main', 'SignatureBand')
+    bands = []
+    for pk, rubric_id, minhash in BbSignature.objects.values_list(
+            'bb_id', 'bb__rubric_id', 'minhash').iterator():
+        minhash = bytes(minhash)
+        for band in range(BANDS):
+            key = b'%d:%d:' % (rubric_id, band) + \
+                  minhash[band * BAND_BYTES:(band + 1) * BAND_BYTES]
+            bands.append(SignatureBand(bb_id=pk, bucket=int.from_bytes(
+                hashlib.blake2b(key, digest_size=8).digest(), 'big',
+                signed=True)))
+    SignatureBand.objects.bulk_create(bands, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0025_unique_image_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignatureBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField()),
+                ('bb', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signature_bands', to='main.bb')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='signatureband',
+            index=models.Index(fields=['bucket', 'bb'], name='main_signatureband_bucket_idx'),
+        ),
+        migrations.RunPython(fill_bands, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2 on 2026-10-18 21:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0026_signature_bands'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurrogateKey',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('version', models.CharField(max_length=32)),
+            ],
+        ),
+    ]
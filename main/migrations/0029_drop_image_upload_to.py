@@ -0,0 +1,24 @@
+# Generated by Django 3.2 on 2026-10-18 21:25
+
+from django.db import migrations
+import main.images
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0028_image_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='additionalimage',
+            name='image',
+            field=main.images.NormalizedImageField(blank=True, db_index=True, upload_to='', verbose_name='Изображение'),
+        ),
+        migrations.AlterField(
+            model_name='bb',
+            name='image',
+            field=main.images.NormalizedImageField(blank=True, db_index=True, upload_to='', verbose_name='Изображение'),
+        ),
+    ]
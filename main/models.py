@@ -1,8 +1,9 @@
 from django.db import models
 from django.db.models.signals import post_save
 from django.contrib.auth.models import AbstractUser
+from django_cleanup import cleanup
 from phonenumber_field.modelfields import PhoneNumberField
-from .utilities import get_timestamp_path
+from .images import NormalizedImageField
 
 class AdvUser(AbstractUser):
     is_activated = models.BooleanField(default=True, db_index=True,
@@ -10,16 +11,17 @@ class AdvUser(AbstractUser):
     send_messages = models.BooleanField(default=True,
                                         verbose_name='Разрешить сообщения')
 
-    def delete(self, *args, **kwargs):
-        for bb in self.bb_set.all():
-            bb.delete()
-        super().delete(*args, **kwargs)
+    def delete(self, using=None, keep_parents=False):
+        from .deletion import delete_users
+        return delete_users([self.pk])
 
     def get_absolute_url(self):
         return f'user/{self.id}'
 
     class Meta(AbstractUser.Meta):
-        pass
+        indexes = [
+            models.Index(fields=['email'], name='main_advuser_email_idx'),
+        ]
 
 
 class Rubric(models.Model):
@@ -32,6 +34,10 @@ class Rubric(models.Model):
         return f'{self.id}'
     class Meta:
         ordering = ['order', 'name']
+        indexes = [
+            models.Index(fields=['super_rubric', 'order', 'name'],
+                         name='main_rubric_super_order_idx'),
+        ]
 
 class SuperRubricManager(models.Manager):
     def get_queryset(self):
@@ -52,7 +58,8 @@ class SuperRubric(Rubric):
 
 class SubRubricManager(models.Manager):
     def get_queryset(self):
-        return super().get_queryset().filter(super_rubric__isnull=False)
+        return super().get_queryset().filter(super_rubric__isnull=False) \
+                                     .select_related('super_rubric')
 
 
 class SubRubric(Rubric):
@@ -69,6 +76,30 @@ class SubRubric(Rubric):
         verbose_name = 'Подрубрика'
         verbose_name_plural = 'Подрубрики'
 
+LISTING_FIELDS = ('id', 'rubric', 'title', 'price', 'image', 'author',
+                  'is_active', 'created_at', 'views', 'likes_count',
+                  'rubric__id', 'rubric__name', 'rubric__order',
+                  'rubric__super_rubric', 'rubric__super_rubric__id',
+                  'rubric__super_rubric__name', 'author__id',
+                  'author__username', 'author__first_name',
+                  'author__last_name')
+
+
+class BbQuerySet(models.QuerySet):
+    def with_relations(self):
+        return self.select_related('rubric', 'rubric__super_rubric', 'author')
+
+    def for_listing(self, *fields):
+        return self.with_relations().only(*LISTING_FIELDS, *fields)
+
+    def for_detail(self):
+        images = models.Prefetch('additionalimage_set',
+                                 queryset=AdditionalImage.objects.only(
+                                     'id', 'bb', 'image'))
+        return self.with_relations().prefetch_related(images)
+
+
+@cleanup.ignore
 class Bb(models.Model):
     rubric = models.ForeignKey(SubRubric, on_delete = models.PROTECT,
                                verbose_name = 'Рубрика')
@@ -76,8 +107,8 @@ class Bb(models.Model):
     content = models.TextField(verbose_name = 'Описание')
     price = models.IntegerField(default = 0, verbose_name = 'Цена')
     contacts = models.TextField(verbose_name = 'Контакты')
-    image = models.ImageField(blank=True, upload_to = get_timestamp_path,
-                              verbose_name = 'Изображение')
+    image = NormalizedImageField(blank=True, db_index=True,
+                                 verbose_name = 'Изображение')
     phone_number = PhoneNumberField(blank=True, verbose_name='Номер телефона')
     author = models.ForeignKey(AdvUser, on_delete=models.CASCADE,
                                verbose_name = 'Автор объявления')
@@ -85,10 +116,14 @@ class Bb(models.Model):
                                     verbose_name = 'Выводить в списке?')
     created_at = models.DateTimeField(auto_now_add=True, db_index=True,
                                   verbose_name = 'Опубликовано')
+    updated_at = models.DateTimeField(auto_now=True,
+                                      verbose_name = 'Изменено')
     views = models.IntegerField(default = 0, verbose_name = 'Просмотры')
     likes = models.ManyToManyField(AdvUser, related_name='bb_post')
     likes_count = models.BigIntegerField(default='0')
 
+    objects = BbQuerySet.as_manager()
+
     def total_likes(self):
        return self.likes.count()
 
@@ -107,12 +142,24 @@ class Bb(models.Model):
         verbose_name = 'Объявление'
         verbose_name_plural = 'Объявления'
         ordering = ['-created_at']
-
-
+        indexes = [
+            models.Index(fields=['rubric', '-created_at', '-id'],
+                         name='main_bb_active_rubric_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['-created_at', '-id'],
+                         name='main_bb_active_created_idx',
+                         condition=models.Q(is_active=True)),
+            models.Index(fields=['author', '-created_at', '-id'],
+                         name='main_bb_author_created_idx'),
+            models.Index(fields=['price'], name='main_bb_price_idx'),
+        ]
+
+
+@cleanup.ignore
 class AdditionalImage(models.Model):
     bb = models.ForeignKey(Bb, on_delete=models.CASCADE)
-    image = models.ImageField(blank=True, upload_to=get_timestamp_path,
-                              verbose_name='Изображение')
+    image = NormalizedImageField(blank=True, db_index=True,
+                                 verbose_name='Изображение')
 
     class Meta:
         verbose_name = 'Дополнительная иллюстрация'
@@ -133,6 +180,11 @@ class Comment(models.Model):
         verbose_name_plural = 'Комментарии'
         verbose_name = 'Комментарий'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['bb', 'created_at'],
+                         name='main_comment_active_bb_idx',
+                         condition=models.Q(is_active=True)),
+        ]
 
 
 #def post_save_dispatcher(sender, **kwargs):
@@ -152,4 +204,74 @@ class RecentBbs(models.Model):
     attended_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        ordering = ['-attended_at']
\ No newline at end of file
+        ordering = ['-attended_at']
+        indexes = [
+            models.Index(fields=['user', '-attended_at'],
+                         name='main_recentbbs_user_idx'),
+        ]
+
+
+class BbSignature(models.Model):
+    bb = models.OneToOneField(Bb, on_delete=models.CASCADE, primary_key=True)
+    minhash = models.BinaryField()
+
+
+class SignatureBand(models.Model):
+    bb = models.ForeignKey(Bb, on_delete=models.CASCADE,
+                           related_name='signature_bands')
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['bucket', 'bb'],
+                         name='main_signatureband_bucket_idx'),
+        ]
+
+
+class SimilarBb(models.Model):
+    bb = models.ForeignKey(Bb, on_delete=models.CASCADE,
+                           related_name='similar_set')
+    similar = models.ForeignKey(Bb, on_delete=models.CASCADE,
+                                related_name='similar_to')
+    score = models.FloatField()
+    rank = models.SmallIntegerField()
+
+    class Meta:
+        ordering = ['rank']
+        unique_together = ('bb', 'similar')
+
+
+class SurrogateKey(models.Model):
+    key = models.CharField(max_length=100, primary_key=True)
+    version = models.CharField(max_length=32)
+
+
+class DeletedFile(models.Model):
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class EmailJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = ((PENDING, 'В очереди'), (RUNNING, 'Отправляется'),
+                (SENT, 'Отправлено'), (FAILED, 'Ошибка'))
+
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'],
+                         name='main_emailjob_status_run_idx'),
+        ]
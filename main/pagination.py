@@ -0,0 +1,106 @@
+import base64
+import binascii
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .db import estimated_rows
+
+
+def encode_cursor(created_at, pk):
+    raw = '%s|%d' % (created_at.isoformat(), pk)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk = raw.decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def after(created_at, pk):
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+
+
+class KeysetPage:
+    def __init__(self, queryset, cursor=None, page_size=None, params=None,
+                 url=''):
+        self.page_size = page_size or settings.BBS_PAGE_SIZE
+        self.params = params or {}
+        self.url = url
+        self.queryset = queryset.order_by('-created_at', '-pk')
+        position = decode_cursor(cursor)
+        self.is_first = position is None
+        rows = self.queryset
+        if position is not None:
+            rows = rows.filter(after(*position))
+        # One extra row tells whether there is a next page
+        self.page_query = rows[:self.page_size + 1]
+
+    @cached_property
+    def rows(self):
+        return list(self.page_query)
+
+    @cached_property
+    def object_list(self):
+        # Hands the fetched rows to a page-sized queryset so the template and
+        # the next page check share one query. QuerySet._result_cache is
+        # private API, checked against Django 3.2.
+        page = self.page_query[:self.page_size]
+        page._result_cache = self.rows[:self.page_size]
+        page._prefetch_done = True
+        return page
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if len(self.rows) <= self.page_size:
+            return None
+        last = self.rows[self.page_size - 1]
+        return encode_cursor(last.created_at, last.pk)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def next_query(self):
+        return urlencode(dict(self.params, after=self.next_cursor))
+
+    @property
+    def first_query(self):
+        return urlencode(self.params)
+
+
+def paginate(request, queryset, params=None, url=''):
+    return KeysetPage(queryset, request.GET.get('after'), params=params,
+                      url=url)
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_rows(connections[queryset.db],
+                                      queryset.model._meta.db_table)
+            if estimate is not None and estimate > self.exact_limit:
+                return estimate
+        return queryset[:self.exact_limit].count()
@@ -0,0 +1,188 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql += time.perf_counter() - start
+
+    def server_timing(self):
+        return 'db;dur=%.1f;desc="%d queries", tpl;dur=%.1f, total;dur=%.1f' % \
+               (self.sql * 1000, self.queries, self.template * 1000,
+                self.total * 1000)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[bisect_left(BUCKETS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, fraction):
+        rank = fraction * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (None,), self.counts):
+            seen += n
+            if n and seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        buckets = {'le_%d' % bound: n for bound, n in zip(BUCKETS, self.counts)}
+        buckets['inf'] = self.counts[-1]
+        return {'count': self.count, 'mean': self.sum / self.count,
+                'max': self.max, 'p50': self.percentile(0.5),
+                'p95': self.percentile(0.95), 'buckets': buckets}
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.wall = Histogram()
+        self.sql = Histogram()
+        self.template = Histogram()
+
+    def add(self, stats):
+        self.requests += 1
+        self.queries += stats.queries
+        self.max_queries = max(self.max_queries, stats.queries)
+        self.wall.add(stats.total * 1000)
+        self.sql.add(stats.sql * 1000)
+        self.template.add(stats.template * 1000)
+
+    def as_dict(self):
+        return {'requests': self.requests,
+                'queries': {'mean': self.queries / self.requests,
+                            'max': self.max_queries},
+                'wall_ms': self.wall.as_dict(), 'sql_ms': self.sql.as_dict(),
+                'template_ms': self.template.as_dict()}
+
+
+class Profiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, stats):
+        with self.lock:
+            self.views.setdefault(view, ViewStats()).add(stats)
+
+    def report(self):
+        with self.lock:
+            return {view: stats.as_dict()
+                    for view, stats in sorted(self.views.items())}
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+profiler = Profiler()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '<unresolved>'
+
+
+def dump_profile(profile, view, ms):
+    directory = getattr(settings, 'PROFILING_DUMP_DIR', None)
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, '%s-%d-%dms.prof' % (
+        view.replace(':', '.'), time.time() * 1000, ms))
+    profile.dump_stats(path)
+    return path
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        profile = None
+        if random.random() < getattr(settings, 'PROFILING_SAMPLE_RATE', 0):
+            profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                if profile is not None:
+                    profile.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profile is not None:
+                        profile.disable()
+        finally:
+            _current.reset(token)
+        stats.total = time.perf_counter() - start
+        view = view_name(request)
+        profiler.record(view, stats)
+        response['Server-Timing'] = stats.server_timing()
+        threshold = getattr(settings, 'PROFILING_SLOW_THRESHOLD', 500)
+        if profile is not None and stats.total * 1000 >= threshold:
+            dump_profile(profile, view, stats.total * 1000)
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
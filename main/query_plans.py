@@ -0,0 +1,129 @@
+import re
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.serializers import LIST_FIELDS, BbFilterSerializer
+from api.views import bb_rows
+from .comments import active_comments, page_size
+from .models import SubRubric, SuperRubric, Bb
+from .pagination import KeysetPage, encode_cursor
+from .recent import stored_recent_ids
+from .similar import similar_bbs
+from .views import (listing_bbs, rubric_bbs, superrubric_bbs, profile_bbs,
+                    user_bbs)
+
+FULL_SCAN_RE = re.compile(
+    r'\bSCAN (?:TABLE )?(?!CONSTANT ROW\b)(\w+)\b'
+    r'(?! USING (?:COVERING )?INDEX)')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE FOR (.+)')
+
+QUERIES = {}
+
+
+def register(name):
+    def decorator(build):
+        QUERIES[name] = build
+        return build
+    return decorator
+
+
+def _first_page(queryset):
+    return KeysetPage(queryset).page_query
+
+
+def _next_page(queryset):
+    return KeysetPage(queryset, encode_cursor(timezone.now(), 1)).page_query
+
+
+def _api_page(**params):
+    filters = BbFilterSerializer(data=params)
+    filters.is_valid(raise_exception=True)
+    return bb_rows(filters, LIST_FIELDS)[:settings.API_PAGE_SIZE + 1]
+
+
+@register('index')
+def index_query():
+    return _first_page(listing_bbs())
+
+
+@register('index_next_page')
+def index_next_page_query():
+    return _next_page(listing_bbs())
+
+
+@register('by_rubric')
+def by_rubric_query():
+    return _first_page(rubric_bbs(1))
+
+
+@register('by_rubric_next_page')
+def by_rubric_next_page_query():
+    return _next_page(rubric_bbs(1))
+
+
+@register('by_superrubric')
+def by_superrubric_query():
+    return _first_page(superrubric_bbs(1))
+
+
+@register('detail')
+def detail_query():
+    return Bb.objects.for_detail().filter(pk=1)
+
+
+@register('similar')
+def similar_query():
+    return similar_bbs(Bb(pk=1, rubric_id=1))
+
+
+@register('profile')
+def profile_query():
+    return profile_bbs(1)
+
+
+@register('foreign_user')
+def foreign_user_query():
+    return user_bbs(1)
+
+
+@register('recent')
+def recent_query():
+    return stored_recent_ids(1)
+
+
+@register('comments')
+def comments_query():
+    return active_comments(1)[:page_size() + 1]
+
+
+@register('api_bbs')
+def api_bbs_query():
+    return _api_page()
+
+
+@register('api_bbs_by_author')
+def api_bbs_by_author_query():
+    return _api_page(author=1)
+
+
+@register('subrubrics')
+def subrubrics_query():
+    return SubRubric.objects.all()
+
+
+@register('superrubrics')
+def superrubrics_query():
+    return SuperRubric.objects.all()
+
+
+def explain(name):
+    return QUERIES[name]().explain()
+
+
+def full_scans(plan):
+    return FULL_SCAN_RE.findall(plan)
+
+
+def temp_sorts(plan):
+    return TEMP_SORT_RE.findall(plan)
@@ -0,0 +1,80 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, When, Value
+from django.utils import timezone
+
+from .models import Bb, RecentBbs
+
+SESSION_KEY = 'recent_bbs'
+SAVED_KEY = 'recent_bbs_saved'
+SAVED_AT_KEY = 'recent_bbs_saved_at'
+
+
+def stored_recent_ids(user_pk):
+    return RecentBbs.objects.filter(user=user_pk) \
+                            .order_by('-attended_at') \
+                            .values_list('bb_id', flat=True) \
+                            [:settings.RECENT_BBS_COUNT]
+
+
+def get_recent_ids(request):
+    if not request.user.is_authenticated:
+        return []
+    if SESSION_KEY not in request.session:
+        pks = list(stored_recent_ids(request.user.pk))
+        request.session[SESSION_KEY] = pks
+        request.session[SAVED_KEY] = pks
+        request.session[SAVED_AT_KEY] = time.time()
+    return request.session[SESSION_KEY]
+
+
+def remember_bb(request, pk):
+    if not request.user.is_authenticated:
+        return
+    pks = get_recent_ids(request)
+    if pks[:1] == [pk]:
+        return
+    pks = [pk] + [other for other in pks if other != pk]
+    request.session[SESSION_KEY] = pks[:settings.RECENT_BBS_COUNT]
+    saved_at = request.session.get(SAVED_AT_KEY, 0)
+    if time.time() - saved_at >= settings.RECENT_BBS_PERSIST_INTERVAL:
+        persist_recent(request)
+
+
+def save_recent(user, pks):
+    now = timezone.now()
+    with transaction.atomic():
+        alive = set(Bb.objects.filter(pk__in=pks).values_list('pk', flat=True))
+        pks = [pk for pk in pks if pk in alive]
+        recent = RecentBbs.objects.filter(user=user)
+        recent.exclude(bb_id__in=pks).delete()
+        existing = set(recent.values_list('bb_id', flat=True))
+        RecentBbs.objects.bulk_create([RecentBbs(user=user, bb_id=pk)
+                                       for pk in pks if pk not in existing])
+        if pks:
+            recent.update(attended_at=Case(
+                *[When(bb_id=pk, then=Value(now - timedelta(microseconds=i)))
+                  for i, pk in enumerate(pks)]))
+    return pks
+
+
+def persist_recent(request):
+    if not request.user.is_authenticated or SESSION_KEY not in request.session:
+        return
+    pks = request.session[SESSION_KEY]
+    if pks != request.session.get(SAVED_KEY):
+        pks = save_recent(request.user, pks)
+        request.session[SESSION_KEY] = pks
+        request.session[SAVED_KEY] = pks
+    request.session[SAVED_AT_KEY] = time.time()
+
+
+def load_recent_bbs(request):
+    pks = get_recent_ids(request)
+    if not pks:
+        return []
+    bbs = {bb.pk: bb for bb in Bb.objects.filter(pk__in=pks).for_listing()}
+    return [bbs[pk] for pk in pks if pk in bbs]
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import BbConsumer
+
+websocket_urlpatterns = [
+    path('ws/bbs/<int:pk>/', BbConsumer.as_asgi()),
+]
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.forms.models import ModelChoiceField, ModelChoiceIterator
+
+from .caching import current_version, purge
+from .models import SubRubric, SuperRubric
+
+RUBRIC_TREE_KEY = 'rubrics:tree:%s'
+RUBRIC_SURROGATE_KEY = 'rubrics'
+HIDDEN_SUPERRUBRIC = 'Все'
+
+
+class RubricTree:
+    def __init__(self):
+        self.subrubrics = list(SubRubric.objects.all())
+        self.superrubrics = [sup for sup in SuperRubric.objects.all()
+                             if sup.name != HIDDEN_SUPERRUBRIC]
+        self.children = {}
+        for rubric in self.subrubrics:
+            self.children.setdefault(rubric.super_rubric_id, []).append(rubric)
+
+
+def get_rubric_tree():
+    key = RUBRIC_TREE_KEY % current_version(RUBRIC_SURROGATE_KEY, fresh=False)
+    tree = cache.get(key)
+    if tree is None:
+        tree = RubricTree()
+        cache.set(key, tree, getattr(settings, 'RUBRIC_TREE_TIMEOUT', None))
+    return tree
+
+
+def invalidate_rubric_tree():
+    purge(RUBRIC_SURROGATE_KEY)
+
+
+class CachedRubricIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for rubric in get_rubric_tree().subrubrics:
+            yield self.choice(rubric)
+
+    def __len__(self):
+        return len(get_rubric_tree().subrubrics) + \
+               (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or \
+               bool(get_rubric_tree().subrubrics)
+
+
+class CachedRubricChoiceField(ModelChoiceField):
+    iterator = CachedRubricIterator
@@ -0,0 +1,283 @@
+import re
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .caching import current_version, purge
+from .models import Bb
+
+FTS_TABLE = 'main_bb_fts'
+INDEX_KEY = 'search:index'
+ANY_RUBRIC = 'Любая категория'
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Russian Snowball stemmer
+VOWELS = 'аеиоуыэюя'
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+REFLEXIVE = ('ся', 'сь')
+ADJECTIVE = ('ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые',
+             'ое', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их',
+             'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но',
+          'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н')
+VERB_2 = ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило',
+          'ыло', 'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь', 'ей',
+          'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю')
+NOUN = ('иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+        'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах',
+        'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы',
+        'ь', 'ю', 'я')
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _regions(word):
+    rv = r1 = r2 = len(word)
+    for i, ch in enumerate(word):
+        if ch in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r1, r2
+
+
+def _strip(word, start, endings, preceded=False):
+    for ending in sorted(endings, key=len, reverse=True):
+        if word.endswith(ending) and len(word) - len(ending) >= start:
+            if preceded:
+                pos = len(word) - len(ending) - 1
+                if pos < start or word[pos] not in 'ая':
+                    continue
+            return word[:-len(ending)]
+    return None
+
+
+def stem(word):
+    rv, r1, r2 = _regions(word)
+    if rv >= len(word):
+        return word
+    stemmed = (_strip(word, rv, PERFECTIVE_GERUND_1, preceded=True) or
+               _strip(word, rv, PERFECTIVE_GERUND_2))
+    if stemmed is None:
+        word = _strip(word, rv, REFLEXIVE) or word
+        stemmed = _strip(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = (_strip(stemmed, rv, PARTICIPLE_1, preceded=True) or
+                       _strip(stemmed, rv, PARTICIPLE_2) or stemmed)
+        else:
+            stemmed = (_strip(word, rv, VERB_1, preceded=True) or
+                       _strip(word, rv, VERB_2) or
+                       _strip(word, rv, NOUN))
+    word = stemmed if stemmed is not None else word
+    word = _strip(word, rv, ('и',)) or word
+    word = _strip(word, r2, DERIVATIONAL) or word
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        return word[:-1]
+    superlative = _strip(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+        if word.endswith('нн'):
+            word = word[:-1]
+        return word
+    return _strip(word, rv, ('ь',)) or word
+
+
+def normalize(text):
+    text = text.casefold().replace('ё', 'е')
+    return [stem(token) for token in WORD_RE.findall(text)]
+
+
+class InvertedIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = {}
+        self.terms = []
+        self.documents = {}
+        self.version = None
+
+    def add(self, pk, text):
+        stems = set(normalize(text))
+        with self.lock:
+            self._remove(pk)
+            self.documents[pk] = stems
+            for term in stems:
+                if term not in self.postings:
+                    self.postings[term] = set()
+                    self.terms.insert(bisect_left(self.terms, term), term)
+                self.postings[term].add(pk)
+
+    def remove(self, pk):
+        with self.lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        for term in self.documents.pop(pk, ()):
+            postings = self.postings[term]
+            postings.discard(pk)
+            if not postings:
+                del self.postings[term]
+                del self.terms[bisect_left(self.terms, term)]
+
+    def _prefixed(self, prefix):
+        found = set()
+        i = bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            found |= self.postings[self.terms[i]]
+            i += 1
+        return found
+
+    def search(self, stems):
+        with self.lock:
+            result = None
+            for term in stems:
+                found = self._prefixed(term)
+                result = found if result is None else result & found
+                if not result:
+                    break
+            return result or set()
+
+
+_python_index = None
+_python_index_lock = threading.Lock()
+_fts5_tables = {}
+
+
+def get_python_index():
+    global _python_index
+    version = current_version(INDEX_KEY, fresh=False)
+    with _python_index_lock:
+        if _python_index is None or _python_index.version != version:
+            index = InvertedIndex()
+            index.version = version
+            for pk, title, content in Bb.objects.values_list(
+                    'pk', 'title', 'content').iterator():
+                index.add(pk, '%s %s' % (title, content))
+            _python_index = index
+        return _python_index
+
+
+def reset_python_index():
+    global _python_index
+    with _python_index_lock:
+        _python_index = None
+
+
+def _python_index_changed():
+    if not fts5_enabled():
+        purge(INDEX_KEY)
+
+
+def fts5_enabled():
+    backend = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if backend == 'python' or connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts5_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                           "AND name = %s", [FTS_TABLE])
+            _fts5_tables[connection.alias] = cursor.fetchone() is not None
+    return _fts5_tables[connection.alias]
+
+
+def _fts_row(title, content):
+    return ' '.join(normalize(title)), ' '.join(normalize(content))
+
+
+def index_bb(bb):
+    if fts5_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE,
+                           [bb.pk])
+            cursor.execute('INSERT INTO %s (rowid, title, content) '
+                           'VALUES (%%s, %%s, %%s)' % FTS_TABLE,
+                           [bb.pk, *_fts_row(bb.title, bb.content)])
+    _python_index_changed()
+
+
+def index_bbs(bbs):
+    if fts5_enabled():
+        with connection.cursor() as cursor:
+            _insert_fts_rows(cursor, [(bb.pk, *_fts_row(bb.title, bb.content))
+                                      for bb in bbs])
+    _python_index_changed()
+
+
+def unindex_bb(pk):
+    if fts5_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE rowid = %%s' % FTS_TABLE,
+                           [pk])
+    _python_index_changed()
+
+
+def unindex_bbs(pks):
+    if fts5_enabled() and pks:
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s WHERE rowid IN (%s)' % (
+                FTS_TABLE, ', '.join(['%s'] * len(pks))), list(pks))
+    if pks:
+        _python_index_changed()
+
+
+def rebuild_index(chunk_size=2000):
+    count = 0
+    if fts5_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM %s' % FTS_TABLE)
+            rows = []
+            for pk, title, content in Bb.objects.values_list(
+                    'pk', 'title', 'content').iterator(chunk_size=chunk_size):
+                rows.append((pk, *_fts_row(title, content)))
+                if len(rows) >= chunk_size:
+                    count += _insert_fts_rows(cursor, rows)
+                    rows = []
+            count += _insert_fts_rows(cursor, rows)
+        reset_python_index()
+        return count
+    _python_index_changed()
+    return len(get_python_index().documents)
+
+
+def _insert_fts_rows(cursor, rows):
+    if rows:
+        cursor.executemany('INSERT INTO %s (rowid, title, content) '
+                           'VALUES (%%s, %%s, %%s)' % FTS_TABLE, rows)
+    return len(rows)
+
+
+def _match_expression(stems):
+    return ' '.join('"%s"*' % term.replace('"', '""') for term in stems)
+
+
+def matching_ids(keyword):
+    stems = normalize(keyword)
+    if not stems:
+        return None
+    if fts5_enabled():
+        return RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s'
+                      % (FTS_TABLE, FTS_TABLE), [_match_expression(stems)])
+    return get_python_index().search(stems)
+
+
+def search_bbs(keyword, rubric=None):
+    ids = matching_ids(keyword)
+    if ids is None:
+        return Bb.objects.none()
+    bbs = Bb.objects.filter(pk__in=ids, is_active=True)
+    if rubric is not None and rubric.name != ANY_RUBRIC:
+        bbs = bbs.filter(rubric=rubric)
+    return bbs
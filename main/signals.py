@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
+from easy_thumbnails.signal_handlers import find_uncommitted_filefields, \
+                                            signal_committed_filefields
+from easy_thumbnails.signals import saved_file
+
+from .apps import user_registered
+from .models import Bb, AdditionalImage, Comment, Rubric, SuperRubric, SubRubric
+from .caching import purge, purge_bb
+from .comments import invalidate_comments
+from .counters import counters_flushed
+from .db import apply_sqlite_pragmas
+from .deletion import queue_files
+from .live import live_updates
+from .mailqueue import ACTIVATION, NEW_COMMENT, enqueue
+from .search import index_bb, unindex_bb
+from .rubrics import invalidate_rubric_tree
+from .recent import persist_recent
+from .similar import enqueue_similar
+from .thumbnails import schedule_thumbnails
+
+
+def bb_pre_save_dispatcher(sender, **kwargs):
+    bb = kwargs['instance']
+    if bb.pk is not None:
+        old = Bb.objects.filter(pk=bb.pk) \
+                        .values_list('rubric_id', 'image', 'title', 'content',
+                                     'is_active').first()
+        if old is not None:
+            if old[0] != bb.rubric_id:
+                purge('rubric:%d' % old[0])
+            bb._old_image = old[1]
+            bb._similar_changed = old[:1] + old[2:] != \
+                (bb.rubric_id, bb.title, bb.content, bb.is_active)
+
+def bb_post_save_dispatcher(sender, **kwargs):
+    bb = kwargs['instance']
+    index_bb(bb)
+    if getattr(bb, '_similar_changed', True):
+        transaction.on_commit(lambda: enqueue_similar(bb.pk))
+    purge_bb(bb)
+
+def bb_post_delete_dispatcher(sender, **kwargs):
+    unindex_bb(kwargs['instance'].pk)
+    purge_bb(kwargs['instance'])
+
+pre_save.connect(bb_pre_save_dispatcher, sender=Bb)
+post_save.connect(bb_post_save_dispatcher, sender=Bb)
+post_delete.connect(bb_post_delete_dispatcher, sender=Bb)
+
+def additional_image_changed_dispatcher(sender, **kwargs):
+    bb_id = kwargs['instance'].bb_id
+    Bb.objects.filter(pk=bb_id).update(updated_at=timezone.now())
+    purge('bb:%d' % bb_id)
+
+post_save.connect(additional_image_changed_dispatcher, sender=AdditionalImage)
+post_delete.connect(additional_image_changed_dispatcher,
+                    sender=AdditionalImage)
+
+def image_saved_dispatcher(sender, **kwargs):
+    schedule_thumbnails(kwargs['fieldfile'])
+
+def additional_image_pre_save_dispatcher(sender, **kwargs):
+    ai = kwargs['instance']
+    if ai.pk is not None:
+        ai._old_image = AdditionalImage.objects.filter(pk=ai.pk) \
+                                       .values_list('image', flat=True).first()
+
+pre_save.connect(additional_image_pre_save_dispatcher, sender=AdditionalImage)
+
+def image_replaced_dispatcher(sender, **kwargs):
+    old_image = getattr(kwargs['instance'], '_old_image', None)
+    if old_image and old_image != kwargs['instance'].image.name:
+        queue_files([old_image])
+
+def image_deleted_dispatcher(sender, **kwargs):
+    if kwargs['instance'].image:
+        queue_files([kwargs['instance'].image.name])
+
+for model in (Bb, AdditionalImage):
+    pre_save.connect(find_uncommitted_filefields, sender=model)
+    post_save.connect(signal_committed_filefields, sender=model)
+    saved_file.connect(image_saved_dispatcher, sender=model)
+    post_save.connect(image_replaced_dispatcher, sender=model)
+    post_delete.connect(image_deleted_dispatcher, sender=model)
+
+def rubric_changed_dispatcher(sender, **kwargs):
+    invalidate_rubric_tree()
+
+for model in (Rubric, SuperRubric, SubRubric):
+    post_save.connect(rubric_changed_dispatcher, sender=model)
+    post_delete.connect(rubric_changed_dispatcher, sender=model)
+
+def user_logged_out_dispatcher(sender, **kwargs):
+    if kwargs['request'] is not None:
+        persist_recent(kwargs['request'])
+
+user_logged_out.connect(user_logged_out_dispatcher)
+
+def counters_flushed_dispatcher(sender, **kwargs):
+    for pk, views in Bb.objects.filter(pk__in=kwargs['views']) \
+                               .values_list('pk', 'views'):
+        live_updates.publish(pk, views=views)
+
+counters_flushed.connect(counters_flushed_dispatcher)
+
+def comment_post_save_dispatcher(sender, **kwargs):
+    comment = kwargs['instance']
+    transaction.on_commit(lambda: invalidate_comments(comment.bb_id))
+    if kwargs['created'] and comment.is_active:
+        data = {'author': comment.author, 'content': comment.content,
+                'created_at': comment.created_at.isoformat()}
+        transaction.on_commit(
+            lambda: live_updates.publish(comment.bb_id, comments=[data]))
+        if getattr(settings, 'EMAIL_NEW_COMMENT_NOTIFICATIONS', False) and \
+                Bb.objects.filter(pk=comment.bb_id,
+                                  author__send_messages=True).exists():
+            enqueue(NEW_COMMENT, [comment.pk])
+
+post_save.connect(comment_post_save_dispatcher, sender=Comment)
+
+def comment_post_delete_dispatcher(sender, **kwargs):
+    bb_id = kwargs['instance'].bb_id
+    transaction.on_commit(lambda: invalidate_comments(bb_id))
+
+post_delete.connect(comment_post_delete_dispatcher, sender=Comment)
+
+def user_registered_dispatcher(sender, **kwargs):
+    if getattr(settings, 'EMAIL_ACTIVATION_LETTERS', False):
+        enqueue(ACTIVATION, [kwargs['instance'].pk])
+
+user_registered.connect(user_registered_dispatcher)
+
+def connection_created_dispatcher(sender, **kwargs):
+    apply_sqlite_pragmas(kwargs['connection'])
+
+connection_created.connect(connection_created_dispatcher)
@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import threading
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+
+from .models import Bb, BbSignature, SignatureBand, SimilarBb
+from .search import normalize
+
+PERMUTATIONS = 64
+BANDS = 16
+MAX_BUCKET = 200
+PRIME = (1 << 31) - 1
+
+_random = np.random.RandomState(20210531)
+_A = _random.randint(1, PRIME, size=PERMUTATIONS).astype(np.uint64)
+_B = _random.randint(0, PRIME, size=PERMUTATIONS).astype(np.uint64)
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shingles(title, content):
+    title_stems = normalize(title)
+    return set(normalize(content)) | set(title_stems) | \
+           {'t:' + stem for stem in title_stems}
+
+
+def signature(title, content):
+    tokens = shingles(title, content)
+    if not tokens:
+        return np.full(PERMUTATIONS, PRIME, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens),
+                         dtype=np.uint64, count=len(tokens))
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_keys(rubric_id, sig):
+    data = sig.tobytes()
+    size = len(data) // BANDS
+    return [int.from_bytes(hashlib.blake2b(
+                b'%d:%d:' % (rubric_id, band) +
+                data[band * size:(band + 1) * size], digest_size=8).digest(),
+                'big', signed=True)
+            for band in range(BANDS)]
+
+
+def _count():
+    return getattr(settings, 'SIMILAR_BBS_COUNT', 9)
+
+
+def _min_score():
+    return getattr(settings, 'SIMILAR_BBS_MIN_SCORE', 0.1)
+
+
+def _top(pks, scores, exclude):
+    order = np.argsort(-scores, kind='stable')
+    top = []
+    for i in order:
+        if scores[i] < _min_score() or len(top) == _count():
+            break
+        if pks[i] != exclude:
+            top.append((int(pks[i]), float(scores[i])))
+    return top
+
+
+def _rows(bb_pk, top):
+    return [SimilarBb(bb_id=bb_pk, similar_id=pk, score=score, rank=rank)
+            for rank, (pk, score) in enumerate(top)]
+
+
+def rubric_signatures(rubric_id, exclude=None):
+    rows = BbSignature.objects.filter(bb__rubric=rubric_id, bb__is_active=True)
+    if exclude is not None:
+        rows = rows.exclude(bb=exclude)
+    pks, sigs = [], []
+    for pk, minhash in rows.values_list('bb_id', 'minhash').iterator():
+        pks.append(pk)
+        sigs.append(np.frombuffer(minhash, dtype=np.uint32))
+    if not sigs:
+        return np.empty(0, dtype=np.int64), \
+               np.empty((0, PERMUTATIONS), dtype=np.uint32)
+    return np.array(pks, dtype=np.int64), np.vstack(sigs)
+
+
+def candidate_signatures(rubric_id, sig, exclude):
+    keys = band_keys(rubric_id, sig)
+    crowded = SignatureBand.objects.filter(bucket__in=keys) \
+                                   .values('bucket') \
+                                   .annotate(size=Count('pk')) \
+                                   .filter(size__gt=MAX_BUCKET) \
+                                   .values_list('bucket', flat=True)
+    keys = set(keys) - set(crowded)
+    rows = BbSignature.objects.filter(
+        bb__in=SignatureBand.objects.filter(bucket__in=keys)
+                                    .values('bb_id'),
+        bb__rubric=rubric_id, bb__is_active=True).exclude(bb=exclude)
+    pks, sigs = [], []
+    for pk, minhash in rows.values_list('bb_id', 'minhash'):
+        pks.append(pk)
+        sigs.append(np.frombuffer(minhash, dtype=np.uint32))
+    if not sigs:
+        return np.empty(0, dtype=np.int64), \
+               np.empty((0, PERMUTATIONS), dtype=np.uint32)
+    return np.array(pks, dtype=np.int64), np.vstack(sigs)
+
+
+def store_signature(bb):
+    sig = signature(bb.title, bb.content)
+    stored = BbSignature.objects.filter(bb=bb).values_list('minhash', flat=True) \
+                                .first()
+    if stored is None or bytes(stored) != sig.tobytes():
+        BbSignature.objects.update_or_create(
+            bb=bb, defaults={'minhash': sig.tobytes()})
+    keys = band_keys(bb.rubric_id, sig)
+    if set(bb.signature_bands.values_list('bucket', flat=True)) != set(keys):
+        bb.signature_bands.all().delete()
+        SignatureBand.objects.bulk_create(
+            SignatureBand(bb=bb, bucket=key) for key in keys)
+    return sig
+
+
+def refresh_similar(bb_pk):
+    bb = Bb.objects.filter(pk=bb_pk) \
+                   .only('pk', 'rubric', 'title', 'content', 'is_active') \
+                   .first()
+    if bb is None:
+        return
+    with transaction.atomic():
+        if not bb.is_active:
+            SimilarBb.objects.filter(bb=bb).delete()
+            SimilarBb.objects.filter(similar=bb).delete()
+            return
+        sig = store_signature(bb)
+        pks, sigs = candidate_signatures(bb.rubric_id, sig, bb.pk)
+        scores = (sigs == sig).mean(axis=1) if len(pks) else np.empty(0)
+        top = _top(pks, scores, bb.pk)
+        SimilarBb.objects.filter(bb=bb).delete()
+        SimilarBb.objects.bulk_create(_rows(bb.pk, top))
+        _update_neighbours(bb.pk, pks, scores, top)
+
+
+def _update_neighbours(bb_pk, pks, scores, top):
+    score_of = dict(zip(pks.tolist(), scores.tolist()))
+    listers = set(SimilarBb.objects.filter(similar=bb_pk)
+                                   .values_list('bb_id', flat=True))
+    affected = listers | {pk for pk, score in top}
+    lists = defaultdict(list)
+    for owner, pk, score in SimilarBb.objects.filter(bb__in=affected) \
+            .exclude(similar=bb_pk).values_list('bb_id', 'similar_id', 'score'):
+        lists[owner].append((pk, score))
+    rows = []
+    for owner in affected:
+        entries = lists[owner]
+        score = score_of.get(owner, 0)
+        if score >= _min_score():
+            entries.append((bb_pk, score))
+        entries.sort(key=lambda entry: -entry[1])
+        rows += _rows(owner, entries[:_count()])
+    SimilarBb.objects.filter(bb__in=affected).delete()
+    SimilarBb.objects.bulk_create(rows)
+
+
+def _candidates(sigs):
+    rows = PERMUTATIONS // BANDS
+    candidates = [set() for i in range(len(sigs))]
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        keys = np.ascontiguousarray(sigs[:, band * rows:(band + 1) * rows])
+        for i, key in enumerate(keys):
+            buckets[key.tobytes()].append(i)
+        for members in buckets.values():
+            if 1 < len(members) <= MAX_BUCKET:
+                for i in members:
+                    candidates[i].update(members)
+    return candidates
+
+
+def rebuild_rubric(rubric_id, chunk_size=1000):
+    missing = Bb.objects.filter(rubric=rubric_id, is_active=True,
+                                bbsignature__isnull=True)
+    for bb in missing.only('pk', 'title', 'content').iterator(chunk_size):
+        BbSignature.objects.create(
+            bb=bb, minhash=signature(bb.title, bb.content).tobytes())
+    pks, sigs = rubric_signatures(rubric_id)
+    bands = [SignatureBand(bb_id=int(pk), bucket=key)
+             for pk, sig in zip(pks, sigs)
+             for key in band_keys(rubric_id, sig)]
+    rows = []
+    for i, members in enumerate(_candidates(sigs)):
+        members.discard(i)
+        members = np.fromiter(members, dtype=np.int64, count=len(members))
+        scores = (sigs[members] == sigs[i]).mean(axis=1) \
+                 if len(members) else np.empty(0)
+        rows += _rows(int(pks[i]), _top(pks[members], scores, pks[i]))
+    with transaction.atomic():
+        SignatureBand.objects.filter(bb__rubric=rubric_id).delete()
+        SignatureBand.objects.bulk_create(bands, batch_size=chunk_size)
+        SimilarBb.objects.filter(bb__rubric=rubric_id).delete()
+        SimilarBb.objects.bulk_create(rows, batch_size=chunk_size)
+    return len(pks)
+
+
+def _thread_job(bb_pk):
+    try:
+        return refresh_similar(bb_pk)
+    except Exception:
+        logger.exception('Could not refresh similar ads for %d', bb_pk)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1,
+                                           thread_name_prefix='similar')
+        return _executor
+
+
+def enqueue_similar(bb_pk):
+    if not getattr(settings, 'SIMILAR_BBS_IN_BACKGROUND', True):
+        return refresh_similar(bb_pk)
+    _get_executor().submit(_thread_job, bb_pk)
+
+
+def similar_bbs(bb):
+    return Bb.objects.filter(similar_to__bb=bb, is_active=True,
+                             rubric=bb.rubric_id) \
+                     .for_listing().order_by('similar_to__rank')
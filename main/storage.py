@@ -0,0 +1,48 @@
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+SHARD_KEY_RE = re.compile(r'^[0-9a-f]{4}')
+
+
+def shard(name):
+    dirname, basename = posixpath.split(name)
+    key = basename if SHARD_KEY_RE.match(basename) else \
+          hashlib.md5(basename.encode()).hexdigest()
+    prefix = posixpath.join(key[:2], key[2:4])
+    if dirname == prefix or dirname.endswith('/' + prefix):
+        return name
+    return posixpath.join(dirname, prefix, basename)
+
+
+def is_sharded(name):
+    return shard(name) == name
+
+
+def unique_name(filename):
+    return shard(uuid.uuid4().hex + posixpath.splitext(filename)[1].lower())
+
+
+def copy_file(storage, name, new_name):
+    try:
+        source, target = storage.path(name), storage.path(new_name)
+    except NotImplementedError:
+        with storage.open(name) as content:
+            return storage.save(new_name, File(content))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+    return new_name
+
+
+class ShardedFileSystemStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        return super().get_available_name(shard(name), max_length)
@@ -0,0 +1,93 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.files import get_thumbnailer
+
+from .models import Bb, AdditionalImage
+
+IMAGE_FIELDS = ((Bb, 'main.Bb.image'),
+                (AdditionalImage, 'main.AdditionalImage.image'))
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def generate_thumbnails(name, target=None):
+    thumbnailer = get_thumbnailer(name)
+    created = 0
+    for alias, options in aliases.all(target).items():
+        options = dict(options, ALIAS=alias)
+        if thumbnailer.get_existing_thumbnail(options) is None:
+            thumbnailer.get_thumbnail(options)
+            created += 1
+    return created
+
+
+def _safe_generate(job):
+    try:
+        return generate_thumbnails(*job)
+    except Exception:
+        logger.exception('Could not generate thumbnails for %s', job[0])
+        return 0
+
+
+def _thread_job(job):
+    try:
+        return _safe_generate(job)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def enqueue_thumbnails(name, target=None):
+    if not getattr(settings, 'THUMBNAIL_WORKERS', 2):
+        return _safe_generate((name, target))
+    _get_executor().submit(_thread_job, (name, target))
+
+
+def schedule_thumbnails(fieldfile):
+    name = fieldfile.name
+    target = '%s.%s' % (fieldfile.instance._meta.label, fieldfile.field.name)
+    transaction.on_commit(lambda: enqueue_thumbnails(name, target))
+
+
+def missing_jobs():
+    for model, target in IMAGE_FIELDS:
+        names = model.objects.exclude(image='') \
+                             .values_list('image', flat=True).distinct()
+        for name in names.iterator():
+            if default_storage.exists(name):
+                yield name, target
+
+
+def _init_process():
+    django.setup()
+    connections.close_all()
+
+
+def generate_missing(workers=None, chunk_size=16):
+    jobs = list(missing_jobs())
+    if workers == 0:
+        return len(jobs), sum(map(_safe_generate, jobs))
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_process) as pool:
+        return len(jobs), sum(pool.map(_safe_generate, jobs,
+                                       chunksize=chunk_size))
@@ -1,36 +1,41 @@
 from django.template.loader import render_to_string
 from django.core.signing import Signer
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from datetime import datetime
 from os.path import splitext
 
 from bboard.settings import ALLOWED_HOSTS
 
+from .storage import unique_name
+
 signer = Signer()
-def send_activation_notification(user):
+
+def get_host():
     if ALLOWED_HOSTS:
-        host = 'http://' + ALLOWED_HOSTS[0]
+        return 'http://' + ALLOWED_HOSTS[0]
     else:
-        host = 'http://localhost:8000'
+        return 'http://localhost:8000'
+
+def render_letter(template, context, to):
+    subject = render_to_string('email/%s_subject.txt' % template, context)
+    body_text = render_to_string('email/%s_body.txt' % template, context)
+    return EmailMessage(' '.join(subject.split()), body_text, to=[to])
+
+def activation_letter(user):
     context = {
         'user': user,
-        'host': host,
+        'host': get_host(),
         'sign': signer.sign(user.username)
     }
-    subject = render_to_string('email/activation_letter_subject.txt', context)
-    body_text = render_to_string('email/activation_letter_body.txt', context)
-    #user.email_user(subject, body_text)
+    return render_letter('activation_letter', context, user.email)
 
 def get_timestamp_path(instance, filename):
     return '%s%s' % (datetime.now().timestamp(), splitext(filename)[1])
 
-def send_new_comment_notification(comment):
-    if ALLOWED_HOSTS:
-        host = 'http://' + ALLOWED_HOSTS[0]
-    else:
-        host = 'http://localhost:8000'
+def get_unique_path(instance, filename):
+    return unique_name(filename)
+
+def new_comment_letter(comment):
     author = comment.bb.author
-    context = {'author':author, 'host':host, 'comment':comment}
-    subject = render_to_string('email/new_comment_letter_subject.txt', context)
-    body_text = render_to_string('email/new_comment_letter_body.txt', context)
-    #author.email_user(subject, body_text)
\ No newline at end of file
+    context = {'author':author, 'host':get_host(), 'comment':comment}
+    return render_letter('new_comment_letter', context, author.email)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.shortcuts import render, reverse
 from django.http import HttpResponse, Http404, HttpResponseRedirect, JsonResponse, HttpResponseNotFound
 from django.template import TemplateDoesNotExist
@@ -12,55 +13,85 @@ from django.views.generic.edit import UpdateView, CreateView, DeleteView
 from django.views.generic.base import TemplateView, ContextMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.urls import reverse_lazy
+from django.db.models import Count
 from django.shortcuts import get_object_or_404, redirect
 from django.core.signing import BadSignature
-from django.core.paginator import Paginator
-from django.db.models import Q
 from .utilities import signer
 from .forms import SearchForm, BbForm, AIFormSet
 from .decorators import counted
-
-from .models import AdvUser, Comment, RecentBbs, SubRubric, SuperRubric, Bb, PageHit
+from .caching import anonymous_cache, cacheable, page_version
+from .conditional import make_etag, not_modified, set_validators
+from .counters import counter_buffer
+from .likes import toggle_like
+from .live import live_updates
+from .recent import remember_bb
+from .search import search_bbs
+from .similar import similar_bbs
+from .pagination import paginate
+
+from .models import AdvUser, Comment, SubRubric, SuperRubric, Bb, PageHit
 from .forms import ChangeUserInfoForm, RegisterUserForm, UserCommentForm, GuestCommentForm
 
 
+def search_results(request, sf):
+    keyword = sf.cleaned_data['keyword']
+    rubric = sf.cleaned_data['rubric']
+    params = {'keyword':keyword, 'rubric':rubric.pk}
+    page = paginate(request, search_bbs(keyword, rubric).for_listing(),
+                    params=params, url=reverse('main:index'))
+    search_label = 'Объявления по запросу \"%s\"' % keyword
+    context = {'form':sf, 'page':page, 'bbs':page.object_list,
+               'search_label':search_label}
+    return render(request, 'main/index.html', context)
+
 def polygon(request):
     if request.method == 'POST':
         sf = SearchForm(request.POST)
         if sf.is_valid():
-            keyword = sf.cleaned_data['keyword']
-            rubric_id = sf.cleaned_data['rubric'].pk
-            bbs = Bb.objects.filter(title__icontains=keyword,
-                                    rubric=rubric_id)
+            bbs = search_bbs(sf.cleaned_data['keyword'],
+                             sf.cleaned_data['rubric']).for_listing()
             context = {'form':sf, 'bbs':bbs}
             return render(request, 'layout/trash.html', context)
     else:
         sf = SearchForm()
-    bbs = Bb.objects.order_by('-created_at')[:10]
+    bbs = Bb.objects.for_listing()[:10]
     context = {'form':sf, 'bbs':bbs}
     return render(request, 'layout/trash.html', context)
 
+def listing_bbs():
+    return Bb.objects.for_listing()
+
+def rubric_bbs(pk):
+    return Bb.objects.filter(is_active=True, rubric=pk).for_listing('content')
+
+def superrubric_bbs(pk):
+    return Bb.objects.filter(is_active=True, rubric__super_rubric=pk) \
+                     .for_listing()
+
+def profile_bbs(user_pk):
+    return Bb.objects.filter(author=user_pk).for_listing() \
+                     .annotate(num_likes=Count('likes')).order_by('-created_at')
+
+def user_bbs(user_pk):
+    return Bb.objects.filter(author=user_pk).for_listing()
+
+def index_keys():
+    return ['bbs', 'rubrics']
+
+@anonymous_cache(index_keys)
 def index(request):
     if request.method == 'POST':
         sf = SearchForm(request.POST)
         if sf.is_valid():
-            keyword = sf.cleaned_data['keyword']
-            rubric = sf.cleaned_data['rubric']
-            rubric_id = rubric.pk
-            if rubric.name == 'Любая категория':
-                q = Q(title__icontains=keyword.capitalize()) | Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                bbs = Bb.objects.filter(q).filter(is_active = True)
-            else:
-                 q = Q(title__icontains=keyword.capitalize()) | \
-                 Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                 bbs = Bb.objects.filter(q).filter(rubric=rubric_id).filter(is_active = True)
-            search_label = 'Объявления по запросу \"%s\"' % keyword
-            context = {'form':sf, 'bbs':bbs, 'search_label':search_label}
-            return render(request, 'main/index.html', context)
+            return search_results(request, sf)
+    elif 'keyword' in request.GET:
+        sf = SearchForm(request.GET)
+        if sf.is_valid():
+            return search_results(request, sf)
     else:
         sf = SearchForm()
-    bbs = Bb.objects.order_by('-created_at')
-    context = {'form':sf, 'bbs':bbs}
+    page = paginate(request, listing_bbs())
+    context = {'form':sf, 'page':page, 'bbs':page.object_list}
     return render(request, 'main/index.html', context)
 
 
@@ -77,13 +108,13 @@ class BBLoginView(LoginView):
 
 @login_required
 def profile(request):
-    bbs = Bb.objects.filter(author=request.user.pk)
+    bbs = profile_bbs(request.user.pk)
     context = {'bbs':bbs}
     return render(request, 'main/profile_bbs.html', context)
 
 @login_required
 def profile_liked(request):
-    bbs = Bb.objects.filter(likes=request.user.pk)
+    bbs = Bb.objects.filter(likes=request.user.pk).for_listing()
     context = {'bbs':bbs}
     return render(request, 'main/profile_liked.html', context)
 
@@ -92,7 +123,7 @@ class BBLogoutView(SuccessMessageMixin, LoginRequiredMixin, LogoutView, ContextM
     template_name = 'main/index.html'
     success_message = 'Вы успешно вышли из аккаунта'
     sf = SearchForm()
-    bbs = Bb.objects.order_by('-created_at')[:20]
+    bbs = Bb.objects.for_listing()[:20]
     extra_context = {'form':sf, 'bbs':bbs}
 
 class ChangeUserInfoView(SuccessMessageMixin, LoginRequiredMixin, UpdateView):
@@ -163,117 +194,91 @@ class DeleteUserView(LoginRequiredMixin, DeleteView):
             queryset = self.get_queryset()
         return get_object_or_404(queryset, pk=self.user_id)
 
+def by_rubric_keys(pk):
+    return ['rubric:%d' % pk, 'rubrics']
+
+@anonymous_cache(by_rubric_keys)
 def by_rubric(request, pk):
     if request.method == 'POST':
         sf = SearchForm(request.POST)
         if sf.is_valid():
-            keyword = sf.cleaned_data['keyword']
-            rubric = sf.cleaned_data['rubric']
-            rubric_id = rubric.pk
-            if rubric.name == 'Любая категория':
-                q = Q(title__icontains=keyword.capitalize()) | Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                bbs = Bb.objects.filter(q).filter(is_active = True)
-            else:
-                 q = Q(title__icontains=keyword.capitalize()) | \
-                 Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                 bbs = Bb.objects.filter(q).filter(rubric=rubric_id).filter(is_active = True)
-            search_label = 'Объявления по запросу \"%s\"' % keyword
-            context = {'form':sf, 'bbs':bbs, 'search_label':search_label}
-            return render(request, 'main/index.html', context)
+            return search_results(request, sf)
     else:
         rubric = get_object_or_404(SubRubric, pk=pk)
-        bbs = Bb.objects.filter(is_active=True, rubric=pk)
+        bbs = rubric_bbs(pk)
+        params = {}
         if 'keyword' in request.GET:
             keyword = request.GET['keyword']
-            q = Q(title__icontains=keyword) | Q(content__icontains=keyword)
-            bbs = bbs.filter(q).filter(is_active = True)
+            bbs = search_bbs(keyword, rubric).for_listing('content')
+            params['keyword'] = keyword
         else:
             keyword = ''
         form = SearchForm(initial = {'keyword':keyword})
-        paginator = Paginator(bbs, 2)
-        if 'page' in request.GET:
-            page_num = request.GET['page']
-        else:
-            page_num = 1
-        page = paginator.get_page(page_num)
+        page = paginate(request, bbs, params=params)
         context = {'rubric':rubric, 'page':page, 'bbs':page.object_list,
                    'form':form}
         return render(request, 'main/by_rubric.html', context)
 
-def save_recent_bb(user, bb):
-    if not user.is_authenticated:
-        pass
-    else:
-        recent = user.recentbbs_set.all().order_by('attended_at')
-        for b in recent:
-            if b.bb == bb:
-                return None
-        if len(recent) < 3:
-            RecentBbs.objects.create(user=user, bb=bb)
-        else:
-            recent[0].delete()
-            RecentBbs.objects.create(user=user, bb=bb)
+def detail_keys(rubric_pk, pk):
+    return ['bb:%d' % pk, 'rubric:%d' % rubric_pk, 'rubrics']
+
+def record_view(request, rubric_pk, pk):
+    counter_buffer.record_view(pk)
+
+def detail_etag(request, bb, rubric_pk, views):
+    if not cacheable(request):
+        return None
+    # The page shows live counters that don't touch updated_at, so they go
+    # into the ETag too; views only by bucket to keep revalidation useful
+    bucket = getattr(settings, 'DETAIL_ETAG_VIEWS_BUCKET', 100)
+    return make_etag(bb.updated_at.isoformat(), bb.likes_count,
+                     views // bucket,
+                     page_version(request, detail_keys(rubric_pk, bb.pk),
+                                  fresh=True))
 
 @counted
+@anonymous_cache(detail_keys, on_hit=record_view)
 def detail(request, rubric_pk, pk):
-    bb = get_object_or_404(Bb, pk=pk)
-    save_recent_bb(user=request.user, bb=bb)
+    bb = get_object_or_404(Bb.objects.for_detail(), pk=pk)
+    remember_bb(request, bb.pk)
     ais = bb.additionalimage_set.all()
     if request.method == 'POST':
         sf = SearchForm(request.POST)
         if sf.is_valid():
-            keyword = sf.cleaned_data['keyword']
-            rubric = sf.cleaned_data['rubric']
-            rubric_id = rubric.pk
-            if rubric.name == 'Любая категория':
-                q = Q(title__icontains=keyword.capitalize()) | Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                bbs = Bb.objects.filter(q).filter(is_active = True)
-            else:
-                 q = Q(title__icontains=keyword.capitalize()) | \
-                 Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                 bbs = Bb.objects.filter(q).filter(rubric=rubric_id).filter(is_active = True)
-            search_label = 'Объявления по запросу \"%s\"' % keyword
-            context = {'form':sf, 'bbs':bbs, 'search_label':search_label}
-            return render(request, 'main/index.html', context)
+            return search_results(request, sf)
     else:
-        bb.views += 1
-        bb.save()
-        bbs = Bb.objects.filter(title__icontains=bb.title[0], rubric=bb.rubric).exclude(pk=bb.pk)[:9]
+        bb.views += counter_buffer.record_view(bb.pk)
+        etag = detail_etag(request, bb, rubric_pk, bb.views)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        bbs = similar_bbs(bb)
         sf = SearchForm()
         liked = False
         if bb.likes.filter(id=request.user.id).exists():
             liked = True
-        count_views = PageHit.objects.get(url=request.path).count
+        count_views = PageHit.objects.filter(url=request.path) \
+                                     .values_list('count', flat=True) \
+                                     .first() or 0
+        count_views += counter_buffer.pending_hits(request.path)
         context = {'liked':liked, 'bb':bb, 'ais':ais, 'form':sf, 'bbs':bbs, 'count_views':count_views}
-        return render(request, 'main/detail.html', context)
+        return set_validators(render(request, 'main/detail.html', context),
+                              etag)
 
 @login_required
 def profile_bb_detail(request, pk):
-    bb = get_object_or_404(Bb, pk=pk)
+    bb = get_object_or_404(Bb.objects.for_detail(), pk=pk)
     if bb.author != request.user:
         raise Http404
-    save_recent_bb(user=request.user, bb=bb)
+    remember_bb(request, bb.pk)
     ais = bb.additionalimage_set.all()
     if request.method == 'POST':
         sf = SearchForm(request.POST)
         if sf.is_valid():
-            keyword = sf.cleaned_data['keyword']
-            rubric = sf.cleaned_data['rubric']
-            rubric_id = rubric.pk
-            if rubric.name == 'Любая категория':
-                q = Q(title__icontains=keyword.capitalize()) | Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                bbs = Bb.objects.filter(q).filter(is_active = True)
-            else:
-                 q = Q(title__icontains=keyword.capitalize()) | \
-                 Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                 bbs = Bb.objects.filter(q).filter(rubric=rubric_id).filter(is_active = True)
-            search_label = 'Объявления по запросу \"%s\"' % keyword
-            context = {'form':sf, 'bbs':bbs, 'search_label':search_label}
-            return render(request, 'main/index.html', context)
+            return search_results(request, sf)
     else:
-        bb.views += 1
-        bb.save()
-        bbs = Bb.objects.filter(title__icontains=bb.title[0], rubric=bb.rubric)[:9]
+        bb.views += counter_buffer.record_view(bb.pk)
+        bbs = similar_bbs(bb)
         sf = SearchForm()
         liked = False
         if bb.likes.filter(id=request.user.id).exists():
@@ -344,48 +349,40 @@ def profile_bb_delete(request, pk):
 @login_required
 def LikeView(request):
     if request.POST.get('action') == 'post':
-        result = ''
-        id = int(request.POST.get('bb_id'))
-        bb = get_object_or_404(Bb, id=id)
-        if bb.likes.filter(id=request.user.id).exists():
-            bb.likes.remove(request.user)
-            bb.likes_count -= 1
-            result = '<i class="far fa-heart" style="color:#009cf0;"></i>\nДобавить в избранное'
-        else:
-            bb.likes.add(request.user)
-            bb.likes_count += 1
+        bb_id = int(request.POST.get('bb_id'))
+        try:
+            liked, likes_count = toggle_like(bb_id, request.user.pk)
+        except Bb.DoesNotExist:
+            raise Http404
+        live_updates.publish(bb_id, likes_count=likes_count)
+        if liked:
             result = '<i class="fas fa-heart" style="color:#009cf0;"></i>\nВ избранном'
-        bb.save()
-        return JsonResponse({'result': result, })
+        else:
+            result = '<i class="far fa-heart" style="color:#009cf0;"></i>\nДобавить в избранное'
+        return JsonResponse({'result': result, 'liked': liked,
+                             'likes_count': likes_count})
 
 def foreign_user(request, pk):
     foreignuser = get_object_or_404(AdvUser, pk=pk)
     if foreignuser == request.user:
         return profile(request)
     else:
-        bbs = Bb.objects.filter(author=foreignuser)
+        bbs = user_bbs(foreignuser.pk)
         context = {'fuser':foreignuser, 'bbs':bbs}
         return render(request, 'main/foreign_user.html', context)
 
+def by_superrubric_keys(pk):
+    return ['bbs', 'rubrics']
+
+@anonymous_cache(by_superrubric_keys)
 def by_superrubric(request, pk):
     if request.method == 'POST':
         sf = SearchForm(request.POST)
         if sf.is_valid():
-            keyword = sf.cleaned_data['keyword']
-            rubric = sf.cleaned_data['rubric']
-            rubric_id = rubric.pk
-            if rubric.name == 'Любая категория':
-                q = Q(title__icontains=keyword.capitalize()) | Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                bbs = Bb.objects.filter(q).filter(is_active = True)
-            else:
-                 q = Q(title__icontains=keyword.capitalize()) | \
-                 Q(title__icontains=(keyword[0].lower() + keyword[1:]))
-                 bbs = Bb.objects.filter(q).filter(rubric=rubric_id).filter(is_active = True)
-            search_label = 'Объявления по запросу \"%s\"' % keyword
-            context = {'form':sf, 'bbs':bbs, 'search_label':search_label}
-            return render(request, 'main/index.html', context)
+            return search_results(request, sf)
     else:
         rubric = get_object_or_404(SuperRubric, pk=pk)
-        bbs = Bb.objects.filter(is_active=True, rubric__super_rubric=pk)
-        context = {'rubric':rubric, 'bbs':bbs, 'search_label': rubric.name}
+        page = paginate(request, superrubric_bbs(pk))
+        context = {'rubric':rubric, 'page':page, 'bbs':page.object_list,
+                   'search_label': rubric.name}
         return render(request, 'main/index.html', context)